@@ -0,0 +1,74 @@
+"""
+Alembic environment
+
+Runs on the connection main.py passes in (services/database.py:
+upgrade_database) or, from the alembic CLI, on its own engine for
+DATABASE_URL. SQLite needs batch mode to alter tables.
+"""
+
+import os
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+
+from services.database import DEFAULT_DATABASE_URL
+
+config = context.config
+
+
+def target_metadata():
+    """Model metadata - only autogenerate compares against it"""
+    metadata = config.attributes.get("target_metadata")
+    if metadata is None and getattr(config.cmd_opts, "autogenerate", False):
+        # Import the models without main.py migrating on import
+        os.environ["DB_AUTO_MIGRATE"] = "false"
+        from main import Base
+        metadata = Base.metadata
+    return metadata
+
+
+def run_migrations_offline():
+    """Emit SQL instead of running it (alembic upgrade head --sql)"""
+    url = os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL)
+    context.configure(
+        url=url,
+        target_metadata=target_metadata(),
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=url.startswith("sqlite")
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata(),
+        render_as_batch=connection.dialect.name == "sqlite"
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        run_migrations(connection)
+        return
+
+    if config.config_file_name is not None:
+        fileConfig(config.config_file_name, disable_existing_loggers=False)
+    engine = create_engine(os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL))
+    try:
+        with engine.begin() as connection:
+            run_migrations(connection)
+    finally:
+        engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
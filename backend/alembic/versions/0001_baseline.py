@@ -0,0 +1,73 @@
+"""Baseline schema: users, documents, chat_messages
+
+The tables as Base.metadata.create_all() created them before migrations
+existed. Databases from that time are stamped at this revision instead of
+running it (services/database.py: upgrade_database).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("ico", sa.String(), nullable=True),
+        sa.Column("dic", sa.String(), nullable=True),
+        sa.Column("ic_dph", sa.String(), nullable=True),
+        sa.Column("business_name", sa.String(), nullable=True),
+        sa.Column("business_address", sa.String(), nullable=True),
+        sa.Column("legal_form", sa.String(), nullable=True),
+        sa.Column("phone", sa.String(), nullable=True),
+        sa.Column("business_type", sa.String(), nullable=True),
+        sa.Column("expense_type", sa.String(), nullable=True),
+        sa.Column("vat_status", sa.String(), nullable=True),
+        sa.Column("onboarding_completed", sa.Integer(), nullable=True),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_ico", "users", ["ico"], unique=True)
+
+    op.create_table(
+        "documents",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("filename", sa.String(), nullable=False),
+        sa.Column("file_path", sa.String(), nullable=False),
+        sa.Column("document_type", sa.String(), nullable=True),
+        sa.Column("extracted_data", sa.JSON(), nullable=True),
+        sa.Column("confidence", sa.Integer(), nullable=True),
+        sa.Column("uploaded_at", sa.DateTime(), nullable=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+    )
+    op.create_index("ix_documents_id", "documents", ["id"])
+
+    op.create_table(
+        "chat_messages",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("role", sa.String(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_chat_messages_id", "chat_messages", ["id"])
+
+
+def downgrade():
+    op.drop_table("chat_messages")
+    op.drop_table("documents")
+    op.drop_table("users")
@@ -0,0 +1,81 @@
+"""Document processing columns and raw OCR output table
+
+Background OCR queue state (status, attempts, last_error, processed_at),
+upload digest/size, duplicate detection keys and the document_ocr_output
+table. create_all() never altered existing tables, but databases created
+after these models changed already have some of them, so each column,
+index and table is only added when missing.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def columns():
+    return [
+        sa.Column("file_sha256", sa.String(64), nullable=True),
+        sa.Column("file_size", sa.Integer(), nullable=True),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("processed_at", sa.DateTime(), nullable=True),
+        sa.Column("perceptual_hash", sa.String(16), nullable=True),
+        sa.Column("dedup_key", sa.String(64), nullable=True),
+        sa.Column("duplicate_of_id", sa.Integer(), nullable=True),
+    ]
+
+
+INDEXED = ["file_sha256", "status", "perceptual_hash", "dedup_key", "duplicate_of_id"]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing = {column["name"] for column in inspector.get_columns("documents")}
+    existing_indexes = {index["name"] for index in inspector.get_indexes("documents")}
+    existing_fks = {tuple(fk["constrained_columns"]) for fk in inspector.get_foreign_keys("documents")}
+
+    with op.batch_alter_table("documents") as batch:
+        for column in columns():
+            if column.name not in existing:
+                batch.add_column(column)
+        if ("duplicate_of_id",) not in existing_fks:
+            batch.create_foreign_key("fk_documents_duplicate_of_id", "documents", ["duplicate_of_id"], ["id"])
+        for name in INDEXED:
+            if f"ix_documents_{name}" not in existing_indexes:
+                batch.create_index(f"ix_documents_{name}", [name])
+
+    # Documents stored before the queue existed were processed synchronously
+    op.execute("UPDATE documents SET status = 'processed' WHERE status IS NULL")
+    op.execute("UPDATE documents SET attempts = 0 WHERE attempts IS NULL")
+
+    if not inspector.has_table("document_ocr_output"):
+        op.create_table(
+            "document_ocr_output",
+            sa.Column(
+                "document_id", sa.Integer(),
+                sa.ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True
+            ),
+            sa.Column("data", sa.LargeBinary(), nullable=False),
+            sa.Column("raw_size", sa.Integer(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+        )
+
+
+def downgrade():
+    op.drop_table("document_ocr_output")
+    with op.batch_alter_table("documents") as batch:
+        for name in INDEXED:
+            batch.drop_index(f"ix_documents_{name}")
+        batch.drop_constraint("fk_documents_duplicate_of_id", type_="foreignkey")
+        for column in reversed(columns()):
+            batch.drop_column(column.name)
@@ -0,0 +1,32 @@
+"""Composite indexes for per-user queries
+
+- documents (user_id, uploaded_at): tax-year document range, document list
+- documents (user_id, document_type): chat document check, type filter
+- chat_messages (user_id, created_at): chat history in order, no sort step
+
+Check the plans with benchmarks/query_plan_check.py.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_documents_user_id_uploaded_at", "documents", ["user_id", "uploaded_at"])
+    op.create_index("ix_documents_user_id_document_type", "documents", ["user_id", "document_type"])
+    op.create_index("ix_chat_messages_user_id_created_at", "chat_messages", ["user_id", "created_at"])
+
+
+def downgrade():
+    op.drop_index("ix_chat_messages_user_id_created_at", table_name="chat_messages")
+    op.drop_index("ix_documents_user_id_document_type", table_name="documents")
+    op.drop_index("ix_documents_user_id_uploaded_at", table_name="documents")
@@ -0,0 +1,113 @@
+"""Per-user tax year totals
+
+Income/expense/VAT sums and counts per (user, year), maintained with every
+document change (services/tax_totals.py). Filled from the existing
+documents here; python -m services.tax_totals --rebuild repairs them later.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+# Frozen copy of the tax year totals rules as of this revision
+AMOUNT_COLUMNS = ("income", "expenses", "income_vat", "expense_vat")
+COUNT_COLUMNS = ("invoice_count", "receipt_count", "other_count", "duplicate_count")
+COUNTED_STATUSES = ("processed", None)
+CATEGORIES = {
+    "invoice": ("income", "income_vat", "invoice_count"),
+    "receipt": ("expenses", "expense_vat", "receipt_count"),
+}
+
+
+def _amount(data, *names):
+    nested = data.get("extracted_data")
+    for source in (data, nested if isinstance(nested, dict) else {}):
+        for name in names:
+            if source.get(name) not in (None, ""):
+                try:
+                    return Decimal(str(source[name])).quantize(Decimal("0.01"))
+                except (InvalidOperation, ValueError, TypeError):
+                    return Decimal("0")
+    return Decimal("0")
+
+
+def fill_totals(connection, documents, totals):
+    """Replace every tax_year_totals row with sums recomputed from the documents"""
+    sums = defaultdict(lambda: dict.fromkeys(AMOUNT_COLUMNS + COUNT_COLUMNS, 0))
+    rows = connection.execute(
+        sa.select(
+            documents.c.user_id, documents.c.uploaded_at, documents.c.status,
+            documents.c.document_type, documents.c.duplicate_of_id, documents.c.extracted_data
+        ).where(documents.c.user_id.is_not(None))
+    )
+    for row in rows:
+        if row.uploaded_at is None or row.status not in COUNTED_STATUSES:
+            continue
+        target = sums[(row.user_id, row.uploaded_at.year)]
+        if row.duplicate_of_id is not None:
+            target["duplicate_count"] += 1
+            continue
+        category = CATEGORIES.get(row.document_type)
+        if category is None:
+            target["other_count"] += 1
+            continue
+        amount_column, vat_column, count_column = category
+        data = row.extracted_data if isinstance(row.extracted_data, dict) else {}
+        amount, vat = _amount(data, "total_amount"), _amount(data, "total_tax", "total_vat")
+        target[amount_column] += amount
+        target[vat_column] += vat
+        target[count_column] += 1
+
+    connection.execute(totals.delete())
+    now = datetime.utcnow()
+    if sums:
+        connection.execute(totals.insert(), [
+            {**values, "user_id": user_id, "year": year, "updated_at": now}
+            for (user_id, year), values in sums.items()
+        ])
+
+
+def upgrade():
+    totals = op.create_table(
+        "tax_year_totals",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("year", sa.Integer(), primary_key=True),
+        sa.Column("income", sa.Numeric(14, 2), nullable=False),
+        sa.Column("expenses", sa.Numeric(14, 2), nullable=False),
+        sa.Column("income_vat", sa.Numeric(14, 2), nullable=False),
+        sa.Column("expense_vat", sa.Numeric(14, 2), nullable=False),
+        sa.Column("invoice_count", sa.Integer(), nullable=False),
+        sa.Column("receipt_count", sa.Integer(), nullable=False),
+        sa.Column("other_count", sa.Integer(), nullable=False),
+        sa.Column("duplicate_count", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+
+    documents = sa.table(
+        "documents",
+        sa.column("user_id", sa.Integer()),
+        sa.column("uploaded_at", sa.DateTime()),
+        sa.column("status", sa.String()),
+        sa.column("document_type", sa.String()),
+        sa.column("duplicate_of_id", sa.Integer()),
+        sa.column("extracted_data", sa.JSON()),
+    )
+    fill_totals(op.get_bind(), documents, totals)
+
+
+def downgrade():
+    op.drop_table("tax_year_totals")
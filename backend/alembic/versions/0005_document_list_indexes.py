@@ -0,0 +1,37 @@
+"""Document list indexes for keyset pagination
+
+GET /api/documents pages through (uploaded_at, id) newest first, with an
+optional type filter. Both composite indexes get id as their last column
+(and the type index uploaded_at), so a page is one ordered index range
+without a sort step; the tax year range and the chat document check use
+the leading columns as before.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_documents_user_id_uploaded_at_id", "documents", ["user_id", "uploaded_at", "id"])
+    op.create_index(
+        "ix_documents_user_id_document_type_uploaded_at_id", "documents",
+        ["user_id", "document_type", "uploaded_at", "id"]
+    )
+    op.drop_index("ix_documents_user_id_uploaded_at", table_name="documents")
+    op.drop_index("ix_documents_user_id_document_type", table_name="documents")
+
+
+def downgrade():
+    op.create_index("ix_documents_user_id_document_type", "documents", ["user_id", "document_type"])
+    op.create_index("ix_documents_user_id_uploaded_at", "documents", ["user_id", "uploaded_at"])
+    op.drop_index("ix_documents_user_id_document_type_uploaded_at_id", table_name="documents")
+    op.drop_index("ix_documents_user_id_uploaded_at_id", table_name="documents")
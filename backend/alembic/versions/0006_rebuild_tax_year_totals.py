@@ -0,0 +1,120 @@
+"""Rebuild tax year totals with credit notes subtracted
+
+Revision 0004 filled tax_year_totals while credit notes still counted as
+income. Recomputes every row from the documents with the current rule.
+ISDOC credit notes stored before their DocumentType was read are still
+marked as invoices; upload them again to correct them.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+# Frozen copy of the tax year totals rules as of this revision
+AMOUNT_COLUMNS = ("income", "expenses", "income_vat", "expense_vat")
+COUNT_COLUMNS = ("invoice_count", "receipt_count", "other_count", "duplicate_count")
+COUNTED_STATUSES = ("processed", None)
+CATEGORIES = {
+    "invoice": ("income", "income_vat", "invoice_count"),
+    "receipt": ("expenses", "expense_vat", "receipt_count"),
+}
+
+
+def _amount(data, *names):
+    nested = data.get("extracted_data")
+    for source in (data, nested if isinstance(nested, dict) else {}):
+        for name in names:
+            if source.get(name) not in (None, ""):
+                try:
+                    return Decimal(str(source[name])).quantize(Decimal("0.01"))
+                except (InvalidOperation, ValueError, TypeError):
+                    return Decimal("0")
+    return Decimal("0")
+
+
+def _field(data, name):
+    nested = data.get("extracted_data")
+    return data.get(name) or (nested.get(name) if isinstance(nested, dict) else None)
+
+
+def fill_totals(connection, documents, totals):
+    """Replace every tax_year_totals row with sums recomputed from the documents"""
+    sums = defaultdict(lambda: dict.fromkeys(AMOUNT_COLUMNS + COUNT_COLUMNS, 0))
+    rows = connection.execute(
+        sa.select(
+            documents.c.user_id, documents.c.uploaded_at, documents.c.status,
+            documents.c.document_type, documents.c.duplicate_of_id, documents.c.extracted_data
+        ).where(documents.c.user_id.is_not(None))
+    )
+    for row in rows:
+        if row.uploaded_at is None or row.status not in COUNTED_STATUSES:
+            continue
+        target = sums[(row.user_id, row.uploaded_at.year)]
+        if row.duplicate_of_id is not None:
+            target["duplicate_count"] += 1
+            continue
+        category = CATEGORIES.get(row.document_type)
+        if category is None:
+            target["other_count"] += 1
+            continue
+        amount_column, vat_column, count_column = category
+        data = row.extracted_data if isinstance(row.extracted_data, dict) else {}
+        amount, vat = _amount(data, "total_amount"), _amount(data, "total_tax", "total_vat")
+        if _field(data, "invoice_type") == "credit_note":
+            amount, vat = -abs(amount), -abs(vat)
+        target[amount_column] += amount
+        target[vat_column] += vat
+        target[count_column] += 1
+
+    connection.execute(totals.delete())
+    now = datetime.utcnow()
+    if sums:
+        connection.execute(totals.insert(), [
+            {**values, "user_id": user_id, "year": year, "updated_at": now}
+            for (user_id, year), values in sums.items()
+        ])
+
+
+def upgrade():
+    documents = sa.table(
+        "documents",
+        sa.column("user_id", sa.Integer()),
+        sa.column("uploaded_at", sa.DateTime()),
+        sa.column("status", sa.String()),
+        sa.column("document_type", sa.String()),
+        sa.column("duplicate_of_id", sa.Integer()),
+        sa.column("extracted_data", sa.JSON()),
+    )
+    totals = sa.table(
+        "tax_year_totals",
+        sa.column("user_id", sa.Integer()),
+        sa.column("year", sa.Integer()),
+        sa.column("income", sa.Numeric(14, 2)),
+        sa.column("expenses", sa.Numeric(14, 2)),
+        sa.column("income_vat", sa.Numeric(14, 2)),
+        sa.column("expense_vat", sa.Numeric(14, 2)),
+        sa.column("invoice_count", sa.Integer()),
+        sa.column("receipt_count", sa.Integer()),
+        sa.column("other_count", sa.Integer()),
+        sa.column("duplicate_count", sa.Integer()),
+        sa.column("updated_at", sa.DateTime()),
+    )
+    fill_totals(op.get_bind(), documents, totals)
+
+
+def downgrade():
+    pass  # Recomputed data only, no schema change to undo
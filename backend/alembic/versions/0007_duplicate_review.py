@@ -0,0 +1,173 @@
+"""Duplicate review columns, image-hash matches as flags only
+
+- similar_to_id: same perceptual hash only; the document still counts
+- duplicate_dismissed: the user marked the document as not a duplicate
+
+Existing duplicates whose only match with their original was the image
+hash become similar_to_id flags, and duplicates of dead-lettered
+documents move to their first live copy. Tax year totals are rebuilt.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+# Frozen copy of the tax year totals rules as of this revision
+AMOUNT_COLUMNS = ("income", "expenses", "income_vat", "expense_vat")
+COUNT_COLUMNS = ("invoice_count", "receipt_count", "other_count", "duplicate_count")
+COUNTED_STATUSES = ("processed", None)
+CATEGORIES = {
+    "invoice": ("income", "income_vat", "invoice_count"),
+    "receipt": ("expenses", "expense_vat", "receipt_count"),
+}
+
+
+def _amount(data, *names):
+    nested = data.get("extracted_data")
+    for source in (data, nested if isinstance(nested, dict) else {}):
+        for name in names:
+            if source.get(name) not in (None, ""):
+                try:
+                    return Decimal(str(source[name])).quantize(Decimal("0.01"))
+                except (InvalidOperation, ValueError, TypeError):
+                    return Decimal("0")
+    return Decimal("0")
+
+
+def _field(data, name):
+    nested = data.get("extracted_data")
+    return data.get(name) or (nested.get(name) if isinstance(nested, dict) else None)
+
+
+def fill_totals(connection, documents, totals):
+    """Replace every tax_year_totals row with sums recomputed from the documents"""
+    sums = defaultdict(lambda: dict.fromkeys(AMOUNT_COLUMNS + COUNT_COLUMNS, 0))
+    rows = connection.execute(
+        sa.select(
+            documents.c.user_id, documents.c.uploaded_at, documents.c.status,
+            documents.c.document_type, documents.c.duplicate_of_id, documents.c.extracted_data
+        ).where(documents.c.user_id.is_not(None))
+    )
+    for row in rows:
+        if row.uploaded_at is None or row.status not in COUNTED_STATUSES:
+            continue
+        target = sums[(row.user_id, row.uploaded_at.year)]
+        if row.duplicate_of_id is not None:
+            target["duplicate_count"] += 1
+            continue
+        category = CATEGORIES.get(row.document_type)
+        if category is None:
+            target["other_count"] += 1
+            continue
+        amount_column, vat_column, count_column = category
+        data = row.extracted_data if isinstance(row.extracted_data, dict) else {}
+        amount, vat = _amount(data, "total_amount"), _amount(data, "total_tax", "total_vat")
+        if _field(data, "invoice_type") == "credit_note":
+            amount, vat = -abs(amount), -abs(vat)
+        target[amount_column] += amount
+        target[vat_column] += vat
+        target[count_column] += 1
+
+    connection.execute(totals.delete())
+    now = datetime.utcnow()
+    if sums:
+        connection.execute(totals.insert(), [
+            {**values, "user_id": user_id, "year": year, "updated_at": now}
+            for (user_id, year), values in sums.items()
+        ])
+
+
+def upgrade():
+    with op.batch_alter_table("documents") as batch:
+        batch.add_column(sa.Column("similar_to_id", sa.Integer(), nullable=True))
+        batch.add_column(sa.Column("duplicate_dismissed", sa.Boolean(), nullable=True, server_default=sa.false()))
+        batch.create_foreign_key("fk_documents_similar_to_id", "documents", ["similar_to_id"], ["id"])
+        batch.create_index("ix_documents_similar_to_id", ["similar_to_id"])
+
+    connection = op.get_bind()
+    documents = sa.table(
+        "documents",
+        sa.column("id", sa.Integer()),
+        sa.column("user_id", sa.Integer()),
+        sa.column("uploaded_at", sa.DateTime()),
+        sa.column("status", sa.String()),
+        sa.column("document_type", sa.String()),
+        sa.column("file_sha256", sa.String()),
+        sa.column("dedup_key", sa.String()),
+        sa.column("duplicate_of_id", sa.Integer()),
+        sa.column("similar_to_id", sa.Integer()),
+        sa.column("extracted_data", sa.JSON()),
+    )
+    originals = documents.alias("originals")
+    duplicates = connection.execute(
+        sa.select(
+            documents.c.id, documents.c.duplicate_of_id, originals.c.status,
+            documents.c.file_sha256 == originals.c.file_sha256,
+            documents.c.dedup_key == originals.c.dedup_key
+        )
+        .join(originals, originals.c.id == documents.c.duplicate_of_id)
+        .order_by(documents.c.id)
+    ).fetchall()
+
+    copies_of_failed = {}
+    for document_id, original_id, original_status, same_file, same_fields in duplicates:
+        if original_status == "failed":
+            copies_of_failed.setdefault(original_id, []).append(document_id)
+        elif not same_file and not same_fields:
+            connection.execute(
+                documents.update().where(documents.c.id == document_id)
+                .values(duplicate_of_id=None, similar_to_id=original_id)
+            )
+
+    live = {
+        row.id for row in connection.execute(
+            sa.select(documents.c.id).where(
+                documents.c.id.in_([i for ids in copies_of_failed.values() for i in ids]),
+                sa.or_(documents.c.status.is_(None), documents.c.status != "failed")
+            )
+        )
+    } if copies_of_failed else set()
+    for original_id, copy_ids in copies_of_failed.items():
+        promoted = next((copy_id for copy_id in copy_ids if copy_id in live), None)
+        connection.execute(
+            documents.update().where(documents.c.duplicate_of_id == original_id)
+            .values(duplicate_of_id=sa.case((documents.c.id == promoted, sa.null()), else_=promoted))
+        )
+
+    totals = sa.table(
+        "tax_year_totals",
+        sa.column("user_id", sa.Integer()),
+        sa.column("year", sa.Integer()),
+        sa.column("income", sa.Numeric(14, 2)),
+        sa.column("expenses", sa.Numeric(14, 2)),
+        sa.column("income_vat", sa.Numeric(14, 2)),
+        sa.column("expense_vat", sa.Numeric(14, 2)),
+        sa.column("invoice_count", sa.Integer()),
+        sa.column("receipt_count", sa.Integer()),
+        sa.column("other_count", sa.Integer()),
+        sa.column("duplicate_count", sa.Integer()),
+        sa.column("updated_at", sa.DateTime()),
+    )
+    fill_totals(connection, documents, totals)
+
+
+def downgrade():
+    with op.batch_alter_table("documents") as batch:
+        batch.drop_index("ix_documents_similar_to_id")
+        batch.drop_constraint("fk_documents_similar_to_id", type_="foreignkey")
+        batch.drop_column("duplicate_dismissed")
+        batch.drop_column("similar_to_id")
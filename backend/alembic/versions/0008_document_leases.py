@@ -0,0 +1,33 @@
+"""Document leases for background OCR recovery
+
+A "processing" document belongs to the worker process named in claimed_by
+while claimed_at is fresh. Existing rows start without a lease, so the
+first worker to start claims and re-queues them once.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("documents") as batch:
+        batch.add_column(sa.Column("claimed_by", sa.String(), nullable=True))
+        batch.add_column(sa.Column("claimed_at", sa.DateTime(), nullable=True))
+        batch.create_index("ix_documents_claimed_by", ["claimed_by"])
+
+
+def downgrade():
+    with op.batch_alter_table("documents") as batch:
+        batch.drop_index("ix_documents_claimed_by")
+        batch.drop_column("claimed_at")
+        batch.drop_column("claimed_by")
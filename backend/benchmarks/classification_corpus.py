@@ -0,0 +1,491 @@
+"""
+Labeled sample set for the document classifier
+
+Generates OCR-like texts for each document type from several templates
+per type (Slovak, Czech and English wording, with and without the
+keywords the old heuristic looks for), optionally with OCR noise, plus
+the page size of the image the text would come from (None for PDFs with
+a text layer). Deterministic for a given seed.
+
+Each sample: {"label", "template", "text", "page_size"}. "template" lets
+the evaluation hold out whole templates, so accuracy is measured on
+wording the model has not seen.
+
+Usage (from backend/):
+    python benchmarks/classification_corpus.py --per-template 10 --output /tmp/classification.json
+"""
+
+import json
+import random
+import argparse
+import unicodedata
+from typing import Any, Callable, Dict, List
+
+COMPANIES = [
+    "ACME s.r.o.", "Tatra Consulting s.r.o.", "Dunaj Trade a.s.", "Novák IT Services s.r.o.",
+    "Green Office s.r.o.", "Mikro Soft, s.r.o.", "Stavby Horváth s.r.o.", "Print Centrum a.s.",
+]
+SHOPS = ["BILLA s.r.o.", "LIDL Slovenská republika, v.o.s.", "TESCO STORES SR, a.s.", "Kaufland Slovenská republika v.o.s.",
+         "Potraviny Jednota COOP", "SLOVNAFT, a.s.", "OMV Slovensko, s.r.o.", "DM drogerie markt s.r.o.", "Kaviareň Dobrá"]
+PEOPLE = ["Ján Kováč", "Mária Horváthová", "Peter Varga", "Eva Tóthová", "Martin Baláž", "Zuzana Nagyová"]
+STREETS = ["Hlavná 12", "Mlynské nivy 48", "Obchodná 3", "Štúrova 27", "Námestie SNP 1", "Kukučínova 9"]
+CITIES = [("811 01", "Bratislava"), ("040 01", "Košice"), ("010 01", "Žilina"), ("974 01", "Banská Bystrica"), ("949 01", "Nitra")]
+SERVICES = ["Konzultačné služby", "Vývoj softvéru", "Správa IT infraštruktúry", "Účtovné služby", "Grafický návrh",
+            "Preklad dokumentov", "Údržba webu", "Školenie zamestnancov"]
+GOODS = ["Rožok", "Chlieb tmavý", "Mlieko 1,5%", "Maslo 250g", "Jablká", "Káva zrnková", "Minerálka 1,5l",
+         "Syr eidam", "Šunka", "Jogurt biely", "Banány", "Papier A4"]
+
+
+def _amount(rng: random.Random, low: float, high: float) -> float:
+    return round(rng.uniform(low, high), 2)
+
+
+def _money(value: float) -> str:
+    return f"{value:,.2f}".replace(",", " ").replace(".", ",")
+
+
+def _date(rng: random.Random) -> str:
+    return f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.choice([2023, 2024, 2025])}"
+
+
+def _ico(rng: random.Random) -> str:
+    return str(rng.randint(10000000, 99999999))
+
+
+def _dic(rng: random.Random) -> str:
+    return str(rng.randint(2020000000, 2129999999))
+
+
+def _address(rng: random.Random) -> str:
+    zip_code, city = rng.choice(CITIES)
+    return f"{rng.choice(STREETS)}, {zip_code} {city}"
+
+
+def _invoice_items(rng: random.Random, count: int):
+    lines, total = [], 0.0
+    for _ in range(count):
+        quantity = rng.randint(1, 20)
+        price = _amount(rng, 10, 150)
+        total += quantity * price
+        lines.append(f"{rng.choice(SERVICES)} {quantity} hod {_money(price)} {_money(quantity * price)}")
+    return lines, round(total, 2)
+
+
+def _receipt_items(rng: random.Random, count: int):
+    lines, total = [], 0.0
+    for _ in range(count):
+        quantity = rng.randint(1, 4)
+        price = _amount(rng, 0.1, 6)
+        total += quantity * price
+        lines.append(f"{rng.choice(GOODS)}\n{quantity} x {_money(price)} {_money(quantity * price)} {rng.choice('AB')}")
+    return lines, round(total, 2)
+
+
+# --- invoices ---------------------------------------------------------------
+
+def invoice_sk(rng):
+    items, base = _invoice_items(rng, rng.randint(1, 5))
+    vat = round(base * 0.2, 2)
+    number = f"{rng.choice([2023, 2024])}{rng.randint(1, 999):04d}"
+    return "\n".join([
+        rng.choice(["FAKTÚRA - DAŇOVÝ DOKLAD", "Faktúra č.", "FAKTÚRA"]) + f" {number}",
+        f"Dodávateľ: {rng.choice(COMPANIES)}", _address(rng),
+        f"IČO: {_ico(rng)} DIČ: {_dic(rng)} IČ DPH: SK{_dic(rng)}",
+        f"Odberateľ: {rng.choice(PEOPLE)}", _address(rng),
+        f"Dátum vystavenia: {_date(rng)}", f"Dátum dodania: {_date(rng)}", f"Dátum splatnosti: {_date(rng)}",
+        f"Variabilný symbol: {number}", f"IBAN: SK{rng.randint(10, 99)} 1100 0000 00{rng.randint(10, 99)} {rng.randint(1000, 9999)} {rng.randint(1000, 9999)}",
+        "Označenie dodávky Množstvo J.cena Spolu", *items,
+        f"Základ dane 20 %: {_money(base)}", f"DPH 20 %: {_money(vat)}", f"Spolu k úhrade: {_money(base + vat)} EUR",
+        "Faktúru vystavil: " + rng.choice(PEOPLE),
+    ])
+
+
+def invoice_en(rng):
+    items, base = _invoice_items(rng, rng.randint(1, 4))
+    vat = round(base * 0.2, 2)
+    return "\n".join([
+        "INVOICE", f"Invoice No.: INV-{rng.randint(100, 9999)}", f"Seller: {rng.choice(COMPANIES)}", _address(rng),
+        f"VAT ID: SK{_dic(rng)}", f"Bill to: {rng.choice(PEOPLE)}", f"Issue date: {_date(rng)}", f"Due date: {_date(rng)}",
+        "Description Qty Unit price Amount", *items,
+        f"Subtotal: {_money(base)}", f"VAT 20%: {_money(vat)}", f"Total due: EUR {_money(base + vat)}",
+        "Please pay by bank transfer, quoting the invoice number.",
+    ])
+
+
+def invoice_tax_document(rng):
+    """Invoice titled only as a tax document - no 'faktúra' anywhere"""
+    items, base = _invoice_items(rng, rng.randint(1, 4))
+    vat = round(base * 0.2, 2)
+    return "\n".join([
+        "DAŇOVÝ DOKLAD", f"Číslo dokladu: {rng.randint(100000, 999999)}",
+        f"Predávajúci: {rng.choice(COMPANIES)}", f"IČO {_ico(rng)} IČ DPH SK{_dic(rng)}",
+        f"Kupujúci: {rng.choice(PEOPLE)}", _address(rng),
+        f"Dátum vyhotovenia {_date(rng)}", f"Dátum uskutočnenia zdaniteľného plnenia {_date(rng)}",
+        f"Splatnosť {_date(rng)}", "Forma úhrady: prevodným príkazom", *items,
+        f"Základ DPH {_money(base)}", f"DPH 20% {_money(vat)}", f"Suma na úhradu {_money(base + vat)} EUR",
+    ])
+
+
+def invoice_cz(rng):
+    items, base = _invoice_items(rng, rng.randint(1, 4))
+    vat = round(base * 0.21, 2)
+    return "\n".join([
+        "Faktura - daňový doklad", f"Číslo faktury: {rng.randint(2024000, 2024999)}",
+        f"Dodavatel: {rng.choice(COMPANIES)}", f"IČ: {_ico(rng)} DIČ: CZ{_ico(rng)}",
+        f"Odběratel: {rng.choice(PEOPLE)}", f"Datum vystavení: {_date(rng)}", f"Datum splatnosti: {_date(rng)}",
+        *items, f"Základ daně 21 %: {_money(base)}", f"DPH 21 %: {_money(vat)}", f"Celkem k úhradě: {_money(base + vat)} Kč",
+    ])
+
+
+def invoice_utility(rng):
+    """Utility settlement bill - an invoice without the word"""
+    base = _amount(rng, 40, 400)
+    return "\n".join([
+        rng.choice(["Vyúčtovanie dodávky elektriny", "Vyúčtovanie dodávky plynu", "Vyúčtovanie služieb"]),
+        f"za obdobie {_date(rng)} - {_date(rng)}", f"Dodávateľ: {rng.choice(['ZSE Energia, a.s.', 'SPP, a.s.', 'Orange Slovensko, a.s.'])}",
+        f"Zákaznícke číslo: {rng.randint(1000000, 9999999)}", f"Odberné miesto: {_address(rng)}",
+        f"Spotreba {rng.randint(100, 3000)} kWh", f"Cena za dodávku {_money(base)}",
+        f"DPH 20 % {_money(base * 0.2)}", f"Uhradené preddavky {_money(base * 0.8)}",
+        f"Nedoplatok k úhrade {_money(base * 0.4)} EUR", f"Dátum splatnosti {_date(rng)}", f"Variabilný symbol {rng.randint(10 ** 9, 10 ** 10 - 1)}",
+    ])
+
+
+def invoice_contract_reference(rng):
+    """Invoice that cites the underlying contract (keyword overlap with contracts)"""
+    items, base = _invoice_items(rng, rng.randint(1, 3))
+    return "\n".join([
+        f"Faktúra č. {rng.randint(1000, 9999)}/{rng.choice([2024, 2025])}",
+        f"Fakturujeme Vám na základe zmluvy o dielo č. {rng.randint(1, 99)}/{rng.choice([2023, 2024])}",
+        f"Dodávateľ: {rng.choice(COMPANIES)}, IČO: {_ico(rng)}", f"Odberateľ: {rng.choice(COMPANIES)}",
+        f"Dátum vystavenia: {_date(rng)}", f"Splatnosť: {_date(rng)}", *items,
+        f"Celkom bez DPH: {_money(base)}", f"Celkom s DPH: {_money(base * 1.2)} EUR",
+    ])
+
+
+# --- receipts ---------------------------------------------------------------
+
+def _receipt_footer(rng, total):
+    return [
+        f"SPOLU EUR {_money(total)}", f"Hotovosť {_money(total + rng.randint(0, 10))}", "Vydané",
+        f"Základ DPH A 20% {_money(total / 1.2)}", f"DPH A 20% {_money(total - total / 1.2)}",
+        f"Kód pokladnice: 88812{rng.randint(10 ** 11, 10 ** 12 - 1)}",
+        f"ID dokladu: O-{''.join(rng.choice('0123456789ABCDEF') for _ in range(32))}",
+        f"{_date(rng)} {rng.randint(6, 21):02d}:{rng.randint(0, 59):02d}",
+    ]
+
+
+def receipt_ekasa(rng):
+    items, total = _receipt_items(rng, rng.randint(2, 9))
+    shop = rng.choice(SHOPS)
+    return "\n".join([
+        shop, _address(rng), f"IČO: {_ico(rng)}", f"DIČ: {_dic(rng)}", f"IČ DPH: SK{_dic(rng)}",
+        f"Pokladničný doklad č. {rng.randint(1, 9999)}", *items, *_receipt_footer(rng, total), "Ďakujeme za nákup",
+    ])
+
+
+def receipt_paragon(rng):
+    items, total = _receipt_items(rng, rng.randint(2, 9))
+    return "\n".join([
+        rng.choice(SHOPS), _address(rng), f"IČO {_ico(rng)} DIČ {_dic(rng)}",
+        rng.choice(["PARAGON", "Doklad o predaji", "DOKLAD"]), *items, *_receipt_footer(rng, total),
+        "Tovar je možné vrátiť do 14 dní", "Tešíme sa na Vašu ďalšiu návštevu",
+    ])
+
+
+def receipt_fuel(rng):
+    """Fuel receipt offering an invoice on request (keyword overlap with invoices)"""
+    litres = _amount(rng, 10, 60)
+    price = _amount(rng, 1.4, 1.8)
+    total = round(litres * price, 2)
+    return "\n".join([
+        rng.choice(["SLOVNAFT, a.s.", "OMV Slovensko, s.r.o.", "Shell Slovakia, s.r.o."]), f"Čerpacia stanica {rng.choice(CITIES)[1]}",
+        f"IČO: {_ico(rng)}", f"Stojan {rng.randint(1, 8)}", f"{rng.choice(['Nafta', 'Natural 95', 'Diesel'])}",
+        f"{_money(litres)} l x {_money(price)} {_money(total)} A", f"Platba kartou {_money(total)}",
+        *_receipt_footer(rng, total), "Ak požadujete faktúru, predložte doklad pri pokladni",
+    ])
+
+
+def receipt_en(rng):
+    items, total = _receipt_items(rng, rng.randint(2, 7))
+    return "\n".join([
+        rng.choice(["Costa Coffee", "Starbucks", "Hudson News", "Relay"]), f"Receipt #{rng.randint(1000, 99999)}",
+        *items, f"TOTAL EUR {_money(total)}", f"CARD {_money(total)}", "VAT included", "Thank you for shopping with us",
+    ])
+
+
+def receipt_restaurant(rng):
+    items, total = _receipt_items(rng, rng.randint(2, 6))
+    return "\n".join([
+        rng.choice(["Reštaurácia U Zlatej husi", "Pizzeria Napoli", "Bistro Centrum", "Kaviareň Dobrá"]),
+        f"Účet č. {rng.randint(1, 999)} Stôl {rng.randint(1, 20)}", f"Čašník: {rng.choice(PEOPLE)}",
+        *items, *_receipt_footer(rng, total), "Ďakujeme, dovidenia",
+    ])
+
+
+def receipt_cz(rng):
+    items, total = _receipt_items(rng, rng.randint(2, 8))
+    return "\n".join([
+        rng.choice(["Albert Česká republika, s.r.o.", "Penny Market s.r.o."]), f"IČ {_ico(rng)}", "Účtenka",
+        *items, f"Celkem Kč {_money(total * 25)}", f"Hotově {_money(total * 25)}", f"FIK: {rng.randint(10 ** 7, 10 ** 8)}",
+    ])
+
+
+# --- contracts --------------------------------------------------------------
+
+def _contract_articles(rng, subject):
+    return [
+        "Čl. I Zmluvné strany",
+        f"Objednávateľ: {rng.choice(COMPANIES)}, so sídlom {_address(rng)}, IČO: {_ico(rng)}",
+        f"Zhotoviteľ: {rng.choice(COMPANIES)}, so sídlom {_address(rng)}, IČO: {_ico(rng)}",
+        "Čl. II Predmet", subject,
+        "Čl. III Cena a platobné podmienky",
+        f"Cena je stanovená dohodou zmluvných strán vo výške {_money(_amount(rng, 500, 50000))} EUR.",
+        rng.choice(["Cena bude uhradená na základe faktúry vystavenej zhotoviteľom.",
+                    "Faktúra je splatná do 14 dní odo dňa jej doručenia.",
+                    "Platba bude realizovaná bankovým prevodom."]),
+        "Čl. IV Záverečné ustanovenia",
+        "Táto zmluva nadobúda platnosť dňom podpisu oboma zmluvnými stranami.",
+        f"V {rng.choice(CITIES)[1]} dňa {_date(rng)}", "Podpis objednávateľa Podpis zhotoviteľa",
+    ]
+
+
+def contract_work(rng):
+    return "\n".join([
+        "ZMLUVA O DIELO", "uzatvorená podľa § 536 a nasl. Obchodného zákonníka",
+        *_contract_articles(rng, f"Zhotoviteľ sa zaväzuje vykonať dielo: {rng.choice(SERVICES).lower()}."),
+    ])
+
+
+def contract_agreement(rng):
+    return "\n".join([
+        rng.choice(["DOHODA O VYKONANÍ PRÁCE", "DOHODA O PRACOVNEJ ČINNOSTI"]),
+        "uzatvorená podľa § 226 Zákonníka práce", f"Zamestnávateľ: {rng.choice(COMPANIES)}",
+        f"Zamestnanec: {rng.choice(PEOPLE)}, nar. {_date(rng)}", f"Pracovná úloha: {rng.choice(SERVICES)}",
+        f"Rozsah práce: {rng.randint(10, 300)} hodín", f"Odmena: {_money(_amount(rng, 5, 20))} EUR za hodinu",
+        "Odmena je splatná v termíne výplaty miezd.", f"Dohoda sa uzatvára na dobu určitú do {_date(rng)}.",
+    ])
+
+
+def contract_en(rng):
+    return "\n".join([
+        rng.choice(["SERVICE AGREEMENT", "CONSULTING AGREEMENT", "NON-DISCLOSURE AGREEMENT"]),
+        f"This Agreement is entered into on {_date(rng)} by and between {rng.choice(COMPANIES)} (the Client)",
+        f"and {rng.choice(COMPANIES)} (the Provider).", "1. Scope of Services",
+        f"The Provider shall deliver {rng.choice(SERVICES).lower()} as described in Annex 1.",
+        "2. Fees and Payment", f"The Client shall pay EUR {_money(_amount(rng, 1000, 30000))} within 30 days.",
+        "3. Term and Termination", "Either party may terminate this Agreement with 30 days written notice.",
+        "4. Governing Law", "This Agreement is governed by the laws of the Slovak Republic.", "Signed on behalf of the parties",
+    ])
+
+
+def contract_lease(rng):
+    return "\n".join([
+        rng.choice(["NÁJOMNÁ ZMLUVA", "Zmluva o nájme nebytových priestorov"]),
+        f"Prenajímateľ: {rng.choice(PEOPLE)}", f"Nájomca: {rng.choice(COMPANIES)}",
+        f"Predmet nájmu: kancelária na adrese {_address(rng)}, výmera {rng.randint(15, 200)} m2",
+        f"Nájomné: {_money(_amount(rng, 200, 2500))} EUR mesačne, splatné vždy do 15. dňa v mesiaci",
+        f"Doba nájmu: od {_date(rng)} na dobu neurčitú", "Výpovedná lehota je tri mesiace.",
+        "Zmluvné strany vyhlasujú, že si zmluvu prečítali a súhlasia s jej obsahom.",
+    ])
+
+
+def contract_purchase(rng):
+    return "\n".join([
+        rng.choice(["KÚPNA ZMLUVA", "Mandátna zmluva", "Rámcová zmluva o spolupráci"]),
+        *_contract_articles(rng, f"Predávajúci sa zaväzuje dodať kupujúcemu {rng.choice(GOODS).lower()} v množstve {rng.randint(10, 500)} ks."),
+    ])
+
+
+# --- tax forms --------------------------------------------------------------
+
+def tax_return_b(rng):
+    return "\n".join([
+        "DAŇOVÉ PRIZNANIE", "k dani z príjmov fyzickej osoby", "typ B", f"za zdaňovacie obdobie {rng.choice([2023, 2024])}",
+        "Daňové identifikačné číslo (DIČ)", f"{_dic(rng)}", "I. ODDIEL - ÚDAJE O DAŇOVNÍKOVI",
+        f"01 - Priezvisko {rng.choice(PEOPLE).split()[1]}", "02 - Meno", "V. ODDIEL - PRÍJMY Z PODNIKANIA",
+        f"riadok 33 {_money(_amount(rng, 1000, 30000))}", "riadok 38 Základ dane", "VI. ODDIEL - VÝPOČET DANE",
+        f"riadok 116 Daň {_money(_amount(rng, 100, 5000))}", "Vyhlasujem, že všetky údaje uvedené v daňovom priznaní sú pravdivé",
+    ])
+
+
+def tax_annual_settlement(rng):
+    return "\n".join([
+        "ŽIADOSŤ o vykonanie ročného zúčtovania preddavkov na daň z príjmov zo závislej činnosti",
+        f"za rok {rng.choice([2023, 2024])}", f"Zamestnanec: {rng.choice(PEOPLE)}", f"Rodné číslo: {rng.randint(600000, 999999)}/{rng.randint(1000, 9999)}",
+        "Uplatňujem nezdaniteľnú časť základu dane na daňovníka", "Uplatňujem daňový bonus na vyživované dieťa",
+        f"Zamestnávateľ: {rng.choice(COMPANIES)}", f"Dátum: {_date(rng)}", "Podpis zamestnanca",
+    ])
+
+
+def tax_income_certificate(rng):
+    return "\n".join([
+        "POTVRDENIE o zdaniteľných príjmoch fyzickej osoby zo závislej činnosti",
+        f"podľa § 39 ods. 5 zákona č. 595/2003 Z. z. za rok {rng.choice([2023, 2024])}",
+        f"Zamestnanec: {rng.choice(PEOPLE)}", f"01 Úhrn zdaniteľných príjmov {_money(_amount(rng, 5000, 40000))}",
+        f"02 Úhrn povinného poistného {_money(_amount(rng, 500, 5000))}", f"04 Úhrn preddavkov na daň {_money(_amount(rng, 300, 4000))}",
+        f"Zamestnávateľ: {rng.choice(COMPANIES)}, DIČ {_dic(rng)}",
+    ])
+
+
+def tax_vat_return(rng):
+    return "\n".join([
+        rng.choice(["DAŇOVÉ PRIZNANIE k dani z pridanej hodnoty", "Priznanie k dani z pridanej hodnoty", "KONTROLNÝ VÝKAZ k dani z pridanej hodnoty"]),
+        f"za obdobie {rng.randint(1, 12)}/{rng.choice([2023, 2024])}", f"IČ DPH: SK{_dic(rng)}",
+        f"r. 01 Dodanie tovarov a služieb - základ dane {_money(_amount(rng, 1000, 90000))}",
+        f"r. 02 daň {_money(_amount(rng, 200, 18000))}", f"r. 31 Vlastná daňová povinnosť {_money(_amount(rng, 50, 9000))}",
+        f"Daňovník: {rng.choice(COMPANIES)}", "Typ priznania: riadne",
+    ])
+
+
+def tax_property(rng):
+    return "\n".join([
+        "Daňové priznanie k dani z nehnuteľností, k dani za psa, k dani za predajné automaty",
+        f"Obec: {rng.choice(CITIES)[1]}", f"Daňovník: {rng.choice(PEOPLE)}", "II. oddiel - Daň z pozemkov",
+        f"Výmera pozemku {rng.randint(100, 2000)} m2", f"Daň z bytov {_money(_amount(rng, 10, 300))}", f"Dátum: {_date(rng)}",
+    ])
+
+
+def tax_en(rng):
+    return "\n".join([
+        rng.choice(["Individual Income Tax Return", "Annual tax return form", "Tax Return for Individuals"]),
+        f"Tax year {rng.choice([2023, 2024])}", f"Taxpayer: {rng.choice(PEOPLE)}", f"Taxpayer identification number {_dic(rng)}",
+        f"Line 1 Wages and salaries {_money(_amount(rng, 1000, 50000))}", "Line 8 Business income",
+        f"Line 24 Total tax {_money(_amount(rng, 100, 9000))}", "Under penalties of perjury, I declare that this return is true",
+    ])
+
+
+# --- other ------------------------------------------------------------------
+
+def other_bank_statement(rng):
+    movements = []
+    for _ in range(rng.randint(3, 10)):
+        movements.append(
+            f"{_date(rng)} {rng.choice(['Platba kartou', 'Prevod', 'Úhrada faktúra ' + str(rng.randint(2024001, 2024999)), 'Inkaso'])} "
+            f"{rng.choice(['-', '+'])}{_money(_amount(rng, 5, 2000))}"
+        )
+    return "\n".join([
+        rng.choice(["VÝPIS Z ÚČTU", "Výpis z bežného účtu"]), f"č. {rng.randint(1, 12)}/{rng.choice([2023, 2024])}",
+        f"Majiteľ účtu: {rng.choice(PEOPLE)}", f"IBAN: SK{rng.randint(10, 99)} 0900 0000 00{rng.randint(10, 99)} {rng.randint(1000, 9999)} {rng.randint(1000, 9999)}",
+        f"Počiatočný zostatok {_money(_amount(rng, 0, 9000))}", *movements, f"Konečný zostatok {_money(_amount(rng, 0, 9000))}",
+    ])
+
+
+def other_health_insurance(rng):
+    return "\n".join([
+        rng.choice(["Všeobecná zdravotná poisťovňa, a.s.", "Dôvera zdravotná poisťovňa, a.s.", "Union zdravotná poisťovňa, a.s."]),
+        "POTVRDENIE o zaplatení poistného", f"Poistenec: {rng.choice(PEOPLE)}",
+        f"Poistná zmluva č. {rng.randint(10 ** 6, 10 ** 7)}" if rng.random() < 0.6 else f"Číslo poistenca {rng.randint(10 ** 9, 10 ** 10)}",
+        f"Za obdobie {rng.choice([2023, 2024])} bolo zaplatené poistné vo výške {_money(_amount(rng, 500, 3000))} EUR",
+        "Potvrdenie sa vydáva na žiadosť poistenca.", f"V {rng.choice(CITIES)[1]} {_date(rng)}",
+    ])
+
+
+def other_social_insurance(rng):
+    return "\n".join([
+        "Sociálna poisťovňa", rng.choice(["Oznámenie o výške poistného", "Potvrdenie o zaplatení poistného na sociálne poistenie"]),
+        f"Samostatne zárobkovo činná osoba: {rng.choice(PEOPLE)}", f"Vymeriavací základ {_money(_amount(rng, 700, 2000))}",
+        f"Poistné na nemocenské poistenie {_money(_amount(rng, 10, 100))}", f"Poistné na dôchodkové poistenie {_money(_amount(rng, 50, 300))}",
+        f"Platné od {_date(rng)}",
+    ])
+
+
+def other_payment_reminder(rng):
+    return "\n".join([
+        rng.choice(["UPOMIENKA", "Výzva na zaplatenie"]), f"Vážený zákazník {rng.choice(PEOPLE)},",
+        f"evidujeme neuhradenú faktúru č. {rng.randint(2024001, 2024999)} so splatnosťou {_date(rng)}",
+        f"v sume {_money(_amount(rng, 20, 2000))} EUR.", "Prosíme Vás o úhradu do 7 dní.",
+        "Ak ste platbu medzitým uhradili, považujte túto výzvu za bezpredmetnú.", f"S pozdravom {rng.choice(COMPANIES)}",
+    ])
+
+
+def other_payslip(rng):
+    return "\n".join([
+        rng.choice(["VÝPLATNÁ PÁSKA", "Výplatný lístok"]), f"za mesiac {rng.randint(1, 12)}/{rng.choice([2023, 2024])}",
+        f"Zamestnanec: {rng.choice(PEOPLE)}", f"Pracovná zmluva: {rng.choice(['na dobu neurčitú', 'na dobu určitú'])}",
+        f"Hrubá mzda {_money(_amount(rng, 900, 4000))}", f"Zdravotné poistenie {_money(_amount(rng, 30, 160))}",
+        f"Sociálne poistenie {_money(_amount(rng, 80, 380))}", f"Preddavok na daň {_money(_amount(rng, 50, 500))}",
+        f"Čistá mzda {_money(_amount(rng, 700, 3000))}",
+    ])
+
+
+def other_letter(rng):
+    return "\n".join([
+        rng.choice(COMPANIES), _address(rng), f"Vec: {rng.choice(['Zmena obchodných podmienok', 'Oznámenie o zmene sídla', 'Pozvánka na seminár', 'Potvrdenie o štúdiu'])}",
+        f"Vážená pani / Vážený pán {rng.choice(PEOPLE)},",
+        "dovoľujeme si Vás informovať o zmenách, ktoré nadobúdajú účinnosť od " + _date(rng) + ".",
+        "V prípade otázok nás kontaktujte na uvedenej adrese.", "S úctou", rng.choice(PEOPLE),
+    ])
+
+
+TEMPLATES: Dict[str, List[Callable[[random.Random], str]]] = {
+    "invoice": [invoice_sk, invoice_en, invoice_tax_document, invoice_cz, invoice_utility, invoice_contract_reference],
+    "receipt": [receipt_ekasa, receipt_paragon, receipt_fuel, receipt_en, receipt_restaurant, receipt_cz],
+    "contract": [contract_work, contract_agreement, contract_en, contract_lease, contract_purchase],
+    "tax_form": [tax_return_b, tax_annual_settlement, tax_income_certificate, tax_vat_return, tax_property, tax_en],
+    "other": [other_bank_statement, other_health_insurance, other_social_insurance, other_payment_reminder, other_payslip, other_letter],
+}
+
+_CONFUSABLE = {"l": "1", "1": "l", "O": "0", "0": "O", "e": "c", "a": "o", "i": "í", "S": "5", "B": "8"}
+
+
+def ocr_noise(text: str, rng: random.Random, rate: float = 0.02) -> str:
+    """Tesseract-like errors: dropped diacritics, confusable characters, lost characters"""
+    if rng.random() < 0.5:
+        text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    out = []
+    for char in text:
+        roll = rng.random()
+        if roll < rate and char in _CONFUSABLE:
+            out.append(_CONFUSABLE[char])
+        elif roll < rate * 1.5 and char.isalpha():
+            continue
+        else:
+            out.append(char)
+    return "".join(out)
+
+
+def _page_size(label: str, rng: random.Random):
+    roll = rng.random()
+    if roll < 0.35:
+        return None  # PDF with a text layer
+    if label == "receipt" and roll < 0.8:
+        width = rng.randint(480, 900)
+        return [width, int(width * rng.uniform(2.2, 4.5))]  # Narrow receipt scan/crop
+    if roll < 0.65:
+        return [2480, 3508]  # A4 scan
+    return [3024, 4032]  # Phone photo
+
+
+def generate(per_template: int = 10, seed: int = 7, noise_share: float = 0.4) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    samples = []
+    for label, templates in TEMPLATES.items():
+        for template in templates:
+            for _ in range(per_template):
+                text = template(rng)
+                if rng.random() < noise_share:
+                    text = ocr_noise(text, rng)
+                samples.append({
+                    "label": label,
+                    "template": template.__name__,
+                    "text": text,
+                    "page_size": _page_size(label, rng),
+                })
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--per-template", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+
+    samples = generate(args.per_template, args.seed)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(samples, f, ensure_ascii=False, indent=1)
+    print(f"Wrote {len(samples)} samples to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Document classifier training and evaluation
+
+Cross-validates the hashed n-gram classifier against the keyword
+heuristic it replaces, then trains on the whole sample set and writes the
+model that services/document_classifier.py loads.
+
+Folds hold out whole templates (see classification_corpus.py), so the
+reported accuracy is for wording the model has not seen during training.
+A labeled export of real documents can be used instead with --corpus
+(JSON list of {"label", "text", "page_size"[, "template"]}).
+
+Usage (from backend/):
+    python benchmarks/classifier_train.py [--corpus PATH] [--folds 5] [--no-save]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.document_classifier import (  # noqa: E402
+    LABELS, DEFAULT_MODEL_PATH, DocumentClassifier, document_features, keyword_classify
+)
+from classification_corpus import generate  # noqa: E402
+
+
+def assign_folds(samples, folds: int):
+    """Fold per (label, template) group, round-robin within each label"""
+    groups = defaultdict(list)
+    for index, sample in enumerate(samples):
+        groups[sample["label"]].append((sample.get("template") or f"sample-{index}", index))
+
+    fold_of = {}
+    for label, members in groups.items():
+        templates = sorted({template for template, _ in members})
+        template_fold = {template: position % folds for position, template in enumerate(templates)}
+        for template, index in members:
+            fold_of[index] = template_fold[template]
+    return fold_of
+
+
+def train_model(samples, epochs: int) -> DocumentClassifier:
+    features = [(document_features(sample["text"], sample.get("page_size")), sample["label"]) for sample in samples]
+    return DocumentClassifier.train(features, epochs=epochs)
+
+
+def accuracy(confusion) -> float:
+    total = sum(confusion.values())
+    return sum(count for (expected, got), count in confusion.items() if expected == got) / total if total else 0.0
+
+
+def print_confusion(title: str, confusion: Counter):
+    got_labels = sorted({got for _, got in confusion} | set(LABELS), key=lambda label: (label not in LABELS, label))
+    print(f"\n{title} (rows: expected, columns: predicted)")
+    print(f"{'':<10}" + "".join(f"{label:>10}" for label in got_labels))
+    for expected in LABELS:
+        print(f"{expected:<10}" + "".join(f"{confusion[(expected, got)]:>10}" for got in got_labels))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="labeled JSON samples (default: generated sample set)")
+    parser.add_argument("--per-template", type=int, default=12, help="generated samples per template")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--epochs", type=int, default=12)
+    parser.add_argument("--output", default=DEFAULT_MODEL_PATH, help="where to write the trained model")
+    parser.add_argument("--no-save", action="store_true", help="evaluate only")
+    args = parser.parse_args()
+
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as f:
+            samples = json.load(f)
+    else:
+        samples = generate(args.per_template)
+
+    print(f"Samples: {len(samples)} ({', '.join(f'{label} {count}' for label, count in sorted(Counter(s['label'] for s in samples).items()))})")
+    print(f"Cross-validation: {args.folds} folds, templates held out\n")
+
+    fold_of = assign_folds(samples, args.folds)
+    model_confusion, keyword_confusion = Counter(), Counter()
+    model_seconds = keyword_seconds = 0.0
+
+    for fold in range(args.folds):
+        train = [sample for index, sample in enumerate(samples) if fold_of[index] != fold]
+        test = [sample for index, sample in enumerate(samples) if fold_of[index] == fold]
+        if not test:
+            continue
+        model = train_model(train, args.epochs)
+
+        started = time.perf_counter()
+        predictions = model.predict_batch([(sample["text"], sample.get("page_size")) for sample in test])
+        model_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        baseline = [keyword_classify(sample["text"]) for sample in test]
+        keyword_seconds += time.perf_counter() - started
+
+        fold_model, fold_keyword = Counter(), Counter()
+        for sample, (label, _), keyword_label in zip(test, predictions, baseline):
+            fold_model[(sample["label"], label)] += 1
+            fold_keyword[(sample["label"], keyword_label)] += 1
+        model_confusion.update(fold_model)
+        keyword_confusion.update(fold_keyword)
+        print(f"fold {fold}: {len(test):>4} held out  keywords {accuracy(fold_keyword):.3f}  classifier {accuracy(fold_model):.3f}")
+
+    print(f"\n{'method':<12} {'accuracy':>9} {'us/doc':>9}")
+    print(f"{'keywords':<12} {accuracy(keyword_confusion):>9.3f} {keyword_seconds * 1e6 / len(samples):>9.1f}")
+    print(f"{'classifier':<12} {accuracy(model_confusion):>9.3f} {model_seconds * 1e6 / len(samples):>9.1f}")
+    print_confusion("Keyword heuristic", keyword_confusion)
+    print_confusion("Classifier", model_confusion)
+
+    if not args.no_save:
+        model = train_model(samples, args.epochs)
+        model.save(args.output)
+        print(f"\nTrained on all {len(samples)} samples, wrote {args.output} ({os.path.getsize(args.output) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
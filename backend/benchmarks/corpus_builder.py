@@ -0,0 +1,133 @@
+"""
+Sample document corpus for the OCR pipeline benchmark
+
+Renders the texts of corpus/field_extraction.json as the kinds of files
+users upload: phone photos (large JPEG), scans (PNG), scanned PDFs
+(image-only) and digital PDFs (text layer). Output is deterministic, so
+runs on the same machine are comparable.
+"""
+
+import json
+import os
+import random
+import shutil
+import unicodedata
+from pathlib import Path
+from typing import List
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+CORPUS_TEXTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus", "field_extraction.json")
+
+# A4 at 300 DPI - a typical flatbed scan
+PAGE_SIZE = (2480, 3508)
+# 12 MP phone photo, long edge well above what OCR needs
+PHOTO_SIZE = (3024, 4032)
+
+FONT_CANDIDATES = ("DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "Arial.ttf")
+
+
+def _font(size: int):
+    for candidate in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def render_page(text: str, size=PAGE_SIZE, font_size: int = 42, noise: bool = False, angle: float = 0.0) -> Image.Image:
+    """Text on a white page; noise/angle make it look like a photo"""
+    page = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(page)
+    font = _font(font_size)
+    y = size[1] // 12
+    for line in text.splitlines():
+        draw.text((size[0] // 12, y), line, fill=(20, 20, 20), font=font)
+        y += int(font_size * 1.6)
+
+    if noise:
+        rng = random.Random(len(text))  # Same text -> same noise
+        pixels = page.load()
+        for _ in range(size[0] * size[1] // 400):
+            x, y = rng.randrange(size[0]), rng.randrange(size[1])
+            pixels[x, y] = (rng.randrange(150, 255),) * 3
+        page = page.filter(ImageFilter.GaussianBlur(0.6))
+    if angle:
+        page = page.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor="white")
+    return page
+
+
+def write_text_pdf(text: str, destination: str):
+    """
+    Minimal single-page PDF with a real text layer (Helvetica, WinAnsi)
+
+    Characters outside Latin-1 are written without diacritics - enough for
+    the text-layer path, which only needs extractable text.
+    """
+    ascii_text = unicodedata.normalize("NFKD", text).encode("latin-1", "ignore").decode("latin-1")
+    escaped = [line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in ascii_text.splitlines()]
+    stream = "BT /F1 11 Tf 56 780 Td 14 TL\n" + "".join(f"({line}) '\n" for line in escaped) + "ET"
+
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R "
+        "/Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    output += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+
+    with open(destination, "wb") as f:
+        f.write(output)
+
+
+def build_corpus(directory: str, copies: int = 1) -> List[str]:
+    """
+    Write the corpus into directory and return the file paths
+
+    Each sample text becomes a photo (JPEG), a scan (PNG), a scanned PDF
+    and a text-layer PDF. With copies > 1 every file is repeated with a
+    different trailing comment, so each copy has its own SHA-256 and is
+    not served from the OCR cache.
+    """
+    with open(CORPUS_TEXTS, encoding="utf-8") as f:
+        samples = json.load(f)
+
+    target = Path(directory)
+    target.mkdir(parents=True, exist_ok=True)
+    paths = []
+
+    for sample in samples:
+        name, text = sample["name"], sample["text"]
+        scan = render_page(text)
+        photo = render_page(text, size=PHOTO_SIZE, font_size=56, noise=True, angle=1.5)
+        variants = {
+            "photo.jpg": lambda path: photo.save(path, "JPEG", quality=92),
+            "scan.png": lambda path: scan.convert("L").save(path, "PNG"),
+            "scan.pdf": lambda path: scan.convert("L").save(path, "PDF", resolution=300),
+            "text.pdf": lambda path: write_text_pdf(text, path),
+        }
+        for suffix, write in variants.items():
+            original = str(target / f"{name}-000-{suffix}")
+            write(original)
+            paths.append(original)
+            for copy in range(1, copies):
+                path = str(target / f"{name}-{copy:03d}-{suffix}")
+                shutil.copyfile(original, path)
+                # Trailing bytes are ignored by image/PDF readers but change the digest
+                with open(path, "ab") as f:
+                    f.write(f"\n% copy {copy}\n".encode())
+                paths.append(path)
+
+    return paths
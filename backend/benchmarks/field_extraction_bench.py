@@ -0,0 +1,128 @@
+"""
+Field extraction benchmark
+
+Runs the compiled extraction engine and the previous per-field regex
+extraction over the sample corpus, and reports throughput and how many
+expected fields each one recovers. --item-lines pads every document with
+that many line items after its first line, for multi-page invoice sizes;
+the expected fields stay the same.
+
+Usage (from backend/):
+    python benchmarks/field_extraction_bench.py [--iterations 2000] [--corpus PATH] [--item-lines 40]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.field_extraction import extract_fields, parse_amount, serialize_fields  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus", "field_extraction.json")
+
+
+def legacy_extract(text: str) -> dict:
+    """Extraction as it was before the engine: patterns compiled per call, one search per field"""
+    patterns = {
+        'invoice_number': r'(?:Invoice|Faktúra|č\.|No\.?)\s*:?\s*([A-Z0-9-]+)',
+        'date': r'(\d{1,2}[./-]\d{1,2}[./-]\d{2,4})',
+        'total': r'(?:Total|Celkom|Spolu)\s*:?\s*€?\s*([\d,]+\.?\d*)',
+        'tax': r'(?:VAT|DPH)\s*:?\s*€?\s*([\d,]+\.?\d*)'
+    }
+    extracted = {}
+    for field, pattern in patterns.items():
+        match = re.compile(pattern, re.IGNORECASE).search(text)
+        if match:
+            extracted[field] = match.group(1)
+    return extracted
+
+
+def legacy_as_fields(extracted: dict) -> dict:
+    """Map legacy output onto engine field names so both can be scored the same way"""
+    fields = {}
+    if 'invoice_number' in extracted:
+        fields['invoice_number'] = extracted['invoice_number']
+    for source, target in (('total', 'total_amount'), ('tax', 'total_vat')):
+        amount = parse_amount(extracted[source]) if source in extracted else None
+        if amount is not None:
+            fields[target] = str(amount)
+    return fields
+
+
+def with_item_lines(documents, count: int):
+    """Documents with `count` line items (names, quantities, prices) inserted after the first line"""
+    if count <= 0:
+        return documents
+    items = "\n".join(
+        f"Položka {number} tovar značky Xyz   {number % 9 + 1} ks   {number},{number % 100:02d} €"
+        for number in range(1, count + 1)
+    )
+    return [{**document, "text": document["text"].replace("\n", f"\n{items}\n", 1)} for document in documents]
+
+
+def score(documents, extract) -> tuple:
+    hits = 0
+    expected_total = 0
+    for document in documents:
+        found = extract(document["text"])
+        for field, expected in document["expected"].items():
+            expected_total += 1
+            value = found.get(field)
+            if field in ("total_amount", "total_without_vat", "total_vat") and value is not None:
+                hits += Decimal(value) == Decimal(expected)
+            else:
+                hits += value == expected
+    return hits, expected_total
+
+
+def throughput(documents, extract, iterations: int) -> float:
+    """Documents per second"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for document in documents:
+            extract(document["text"])
+    return iterations * len(documents) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000, help="passes over the corpus per extractor")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="JSON list of {name, text, expected}")
+    parser.add_argument("--item-lines", type=int, default=0, help="line items added to every document")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        documents = with_item_lines(json.load(f), args.item_lines)
+
+    extractors = {
+        "legacy": lambda text: legacy_as_fields(legacy_extract(text)),
+        "engine": lambda text: serialize_fields(extract_fields(text)),
+    }
+
+    average_length = sum(len(document["text"]) for document in documents) // len(documents)
+    print(f"Corpus: {len(documents)} documents (~{average_length} chars), {args.iterations} iterations\n")
+    print(f"{'extractor':<10} {'docs/sec':>12} {'us/doc':>10} {'fields found':>14}")
+    for name, extract in extractors.items():
+        rate = throughput(documents, extract, args.iterations)
+        hits, expected = score(documents, extract)
+        print(f"{name:<10} {rate:>12,.0f} {1e6 / rate:>10.1f} {hits:>8}/{expected:<5}")
+
+    print("\nMissed by engine:")
+    missed = False
+    for document in documents:
+        found = serialize_fields(extract_fields(document["text"]))
+        for field, expected in document["expected"].items():
+            if found.get(field) != expected:
+                missed = True
+                print(f"  {document['name']}: {field} expected {expected!r}, got {found.get(field)!r}")
+    if not missed:
+        print("  none")
+
+
+if __name__ == "__main__":
+    main()
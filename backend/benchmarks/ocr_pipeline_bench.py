@@ -0,0 +1,316 @@
+"""
+OCR pipeline benchmark
+
+Runs a fixed corpus of sample invoices/receipts (photos, scans, scanned
+and digital PDFs - see corpus_builder.py) through the document pipeline,
+with the external providers replaced by local stand-ins (provider_stubs.py).
+
+Modes:
+    service - DocumentPipeline.process_file -> OCRService.process_document,
+              no HTTP or database involved
+    upload  - POST /api/documents/upload on the real app (in-process ASGI),
+              then poll /api/documents/status until every document is done
+
+Reports per-stage latency percentiles, documents/sec and peak RSS.
+Write --json to a file and compare two runs to spot regressions.
+
+Usage (from backend/):
+    python benchmarks/ocr_pipeline_bench.py --mode service --provider mindee --latency-ms 400
+    python benchmarks/ocr_pipeline_bench.py --mode upload --provider tesseract --copies 3 --json after.json
+"""
+
+import os
+import sys
+import json
+import hashlib
+import time
+import asyncio
+import argparse
+import resource
+import tempfile
+from collections import defaultdict
+from functools import wraps
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.corpus_builder import build_corpus  # noqa: E402
+from benchmarks.provider_stubs import StubServer  # noqa: E402
+
+
+class StageTimer:
+    """Collects wall-clock durations per pipeline stage"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, stage: str, seconds: float):
+        self.samples[stage].append(seconds)
+
+    def wrap(self, owner, attribute: str, stage: str):
+        """Replace an async callable on owner (instance or module) with a timed version"""
+        original = getattr(owner, attribute)
+
+        @wraps(original)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await original(*args, **kwargs)
+            except Exception:
+                self.errors[stage] += 1
+                raise
+            finally:
+                self.record(stage, time.perf_counter() - started)
+
+        setattr(owner, attribute, timed)
+
+    @staticmethod
+    def percentile(values: List[float], pct: float) -> float:
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            stage: {
+                "count": len(values),
+                "errors": self.errors.get(stage, 0),
+                "p50_ms": round(self.percentile(values, 50) * 1000, 1),
+                "p95_ms": round(self.percentile(values, 95) * 1000, 1),
+                "p99_ms": round(self.percentile(values, 99) * 1000, 1),
+                "max_ms": round(max(values) * 1000, 1),
+            }
+            for stage, values in self.samples.items() if values
+        }
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    """Peak resident memory of this process and of finished worker processes"""
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "workers": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def configure_environment(args, stub_url: str, work_dir: str):
+    """Settings must be in place before the services / app are imported"""
+    os.environ.update({
+        "OCR_PROVIDER": args.provider,
+        "OCR_FALLBACK_PROVIDERS": args.fallback,
+        "OCR_CACHE_ENABLED": "true" if args.cache else "false",
+        "OCR_CACHE_DIR": os.path.join(work_dir, "ocr_cache"),
+        "PDF_PAGE_CACHE_DIR": os.path.join(work_dir, "page_cache"),
+        "DATABASE_URL": f"sqlite:///{os.path.join(work_dir, 'bench.db')}",
+        "MINDEE_API_URL": stub_url,
+        "VERYFI_API_URL": stub_url,
+        "KLIPPA_API_URL": stub_url,
+        # Stand-ins accept any key
+        "MINDEE_API_KEY": "bench",
+        "VERYFI_API_KEY": "bench",
+        "VERYFI_CLIENT_ID": "bench",
+        "KLIPPA_API_KEY": "bench",
+    })
+    if args.workers is not None:
+        os.environ["OCR_PROCESS_WORKERS"] = str(args.workers)
+
+
+def instrument(timer: StageTimer, pipeline, ocr_service):
+    """Time the pipeline stages without changing their behaviour"""
+    import services.document_pipeline as document_pipeline_module
+
+    if pipeline.preprocessor is not None:
+        timer.wrap(pipeline.preprocessor, "prepare", "preprocess")
+    timer.wrap(ocr_service, "run_ocr", "local_ocr")
+    timer.wrap(document_pipeline_module, "classify_document", "classify")
+    timer.wrap(ocr_service, "process_document", "extract")
+    timer.wrap(ocr_service, "_process_with_provider", "provider_call")
+
+
+async def run_service_mode(args, paths: List[str], timer: StageTimer) -> Dict[str, int]:
+    from services.ocr_service import OCRService, OCRProvider
+    from services.ocr_cache import OCRResultCache
+    from services.cpu_pool import CPUWorkerPool
+    from services.image_preprocessing import ImagePreprocessor
+    from services.pdf_service import PageImageCache
+    from services.document_pipeline import DocumentPipeline
+
+    cpu_pool = CPUWorkerPool()
+    ocr_service = OCRService(
+        provider=OCRProvider(args.provider),
+        fallback_providers=[OCRProvider(p.strip()) for p in args.fallback.split(",") if p.strip()],
+        cache=OCRResultCache() if args.cache else None,
+        cpu_pool=cpu_pool,
+        page_cache=PageImageCache()
+    )
+    pipeline = DocumentPipeline(ocr_service, preprocessor=ImagePreprocessor(cpu_pool=cpu_pool))
+    instrument(timer, pipeline, ocr_service)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    outcome = {"processed": 0, "failed": 0}
+
+    async def one(path: str):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await pipeline.process_file(path, await asyncio.to_thread(file_sha256, path))
+                outcome["processed"] += 1
+            except Exception as e:
+                outcome["failed"] += 1
+                print(f"  failed: {os.path.basename(path)}: {e}", file=sys.stderr)
+            timer.record("end_to_end", time.perf_counter() - started)
+
+    try:
+        await asyncio.gather(*(one(path) for path in paths))
+    finally:
+        await ocr_service.aclose()
+        cpu_pool.shutdown()
+    return outcome
+
+
+async def run_upload_mode(args, paths: List[str], timer: StageTimer, work_dir: str) -> Dict[str, int]:
+    import httpx
+
+    # main.py creates uploads/ and the database relative to the working directory
+    os.chdir(work_dir)
+    import main
+
+    db = main.SessionLocal()
+    try:
+        user = main.User(name="Benchmark", email="bench@example.com", hashed_password="-")
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+    finally:
+        db.close()
+    main.app.dependency_overrides[main.get_current_user] = lambda: user
+
+    instrument(timer, main.document_pipeline, main.ocr_service)
+    await main.document_queue.start()
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    outcome = {"processed": 0, "failed": 0}
+    transport = httpx.ASGITransport(app=main.app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(batch: List[str]):
+            async with semaphore:
+                started = time.perf_counter()
+                files = [("files", (os.path.basename(path), open(path, "rb"))) for path in batch]
+                try:
+                    response = await client.post("/api/documents/upload", files=files)
+                finally:
+                    for _, (_, handle) in files:
+                        handle.close()
+                timer.record("upload_request", time.perf_counter() - started)
+                response.raise_for_status()
+                ids = [f["document_id"] for f in response.json()["files"] if "document_id" in f]
+                outcome["failed"] += len(batch) - len(ids)
+
+                # What a client sees: time until the status endpoint reports the result
+                while ids:
+                    await asyncio.sleep(args.poll_interval)
+                    status_response = await client.get("/api/documents/status", params={"ids": ids})
+                    for document in status_response.json()["documents"]:
+                        if document["status"] == "processing":
+                            continue
+                        ids.remove(document["id"])
+                        outcome["processed" if document["status"] == "processed" else "failed"] += 1
+                        timer.record("end_to_end", time.perf_counter() - started)
+
+        batches = [paths[i:i + args.batch_size] for i in range(0, len(paths), args.batch_size)]
+        try:
+            await asyncio.gather(*(one(batch) for batch in batches))
+        finally:
+            await main.document_queue.stop()
+            await main.ocr_service.aclose()
+            main.cpu_pool.shutdown()
+    return outcome
+
+
+def print_report(report: Dict):
+    print(f"\nMode: {report['mode']}  provider: {report['provider']}"
+          f"{' -> ' + report['fallback'] if report['fallback'] else ''}  "
+          f"stub latency: {report['stub_latency_ms']} ms (+{report['stub_jitter_ms']} jitter)")
+    print(f"Documents: {report['documents']}  processed: {report['processed']}  failed: {report['failed']}")
+    print(f"Wall time: {report['wall_seconds']} s  throughput: {report['docs_per_second']} docs/sec")
+    print(f"Peak RSS: {report['peak_rss_mb']['self']} MB (process), "
+          f"{report['peak_rss_mb']['workers']} MB (largest finished worker)")
+    print(f"Provider stub requests: {report['stub_requests']}\n")
+
+    print(f"{'stage':<16} {'count':>6} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for stage, row in report["stages"].items():
+        print(f"{stage:<16} {row['count']:>6} {row['errors']:>7} {row['p50_ms']:>9} "
+              f"{row['p95_ms']:>9} {row['p99_ms']:>9} {row['max_ms']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("service", "upload"), default="service")
+    parser.add_argument("--provider", default="mindee", help="mindee, tesseract, veryfi or klippa")
+    parser.add_argument("--fallback", default="", help="comma-separated fallback providers")
+    parser.add_argument("--latency-ms", type=float, default=300, help="stand-in provider latency")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="extra uniform random latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stand-in calls answering 503")
+    parser.add_argument("--copies", type=int, default=1, help="distinct copies of every corpus file")
+    parser.add_argument("--concurrency", type=int, default=8, help="documents (service) or requests (upload) in flight")
+    parser.add_argument("--batch-size", type=int, default=1, help="files per upload request (upload mode)")
+    parser.add_argument("--poll-interval", type=float, default=0.05, help="status polling interval, seconds")
+    parser.add_argument("--workers", type=int, default=None, help="OCR_PROCESS_WORKERS override")
+    parser.add_argument("--cache", action="store_true", help="keep the OCR result cache enabled")
+    parser.add_argument("--json", dest="json_path", help="also write the report as JSON to this file")
+    args = parser.parse_args()
+    if args.json_path:
+        args.json_path = os.path.abspath(args.json_path)  # Upload mode changes the working directory
+
+    work_dir = tempfile.mkdtemp(prefix="taxa_bench_")
+    paths = build_corpus(os.path.join(work_dir, "corpus"), copies=args.copies)
+
+    with StubServer(args.latency_ms, args.jitter_ms, args.error_rate) as stubs:
+        configure_environment(args, stubs.url, work_dir)
+        timer = StageTimer()
+
+        started = time.perf_counter()
+        if args.mode == "service":
+            outcome = asyncio.run(run_service_mode(args, paths, timer))
+        else:
+            outcome = asyncio.run(run_upload_mode(args, paths, timer, work_dir))
+        wall = time.perf_counter() - started
+        stub_requests = stubs.requests
+
+    report = {
+        "mode": args.mode,
+        "provider": args.provider,
+        "fallback": args.fallback,
+        "stub_latency_ms": args.latency_ms,
+        "stub_jitter_ms": args.jitter_ms,
+        "documents": len(paths),
+        **outcome,
+        "wall_seconds": round(wall, 2),
+        "docs_per_second": round(len(paths) / wall, 2),
+        "peak_rss_mb": peak_rss_mb(),
+        "stub_requests": stub_requests,
+        "stages": timer.summary(),
+    }
+    print_report(report)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json_path}")
+    print(f"Work directory (corpus, caches, database): {work_dir}")
+
+
+if __name__ == "__main__":
+    main()
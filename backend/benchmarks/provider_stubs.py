@@ -0,0 +1,243 @@
+"""
+Local stand-ins for the Mindee, Veryfi and Klippa APIs and the eKasa
+receipt registry
+
+Answer on the same paths as the real services with responses of the same
+shape, after a configurable delay. Point OCRService at them with
+MINDEE_API_URL / VERYFI_API_URL / KLIPPA_API_URL, and the eKasa stage
+with EKASA_API_URL.
+
+Usage (from backend/):
+    python benchmarks/provider_stubs.py --port 8099 --latency-ms 400 --jitter-ms 200
+"""
+
+import time
+import random
+import socket
+import asyncio
+import argparse
+import threading
+from typing import Any, Dict
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Fixed sample values, so results are comparable between runs
+SAMPLE = {
+    "supplier_name": "ACME s.r.o.",
+    "supplier_address": "Hlavná 12, 811 01 Bratislava",
+    "customer_name": "Ján Kováč",
+    "invoice_number": "2024/0157",
+    "date": "2024-03-05",
+    "due_date": "2024-03-19",
+    "time": "14:33",
+    "total_amount": 1344.56,
+    "total_tax": 215.76,
+    "currency": "EUR",
+    "line_items": [
+        {"description": "Konzultácie", "quantity": 10, "unit_price": 102.88, "total_amount": 1028.80, "tax_rate": 20},
+        {"description": "Kniha", "quantity": 1, "unit_price": 100.00, "total_amount": 100.00, "tax_rate": 10},
+    ],
+}
+
+
+def mindee_response(product: str) -> Dict[str, Any]:
+    """Shape of a Mindee v1 predict response (only the fields OCRService reads)"""
+    def field(value, confidence=0.95):
+        return {"value": value, "confidence": confidence}
+
+    prediction = {
+        "supplier_name": field(SAMPLE["supplier_name"]),
+        "supplier_address": field(SAMPLE["supplier_address"]),
+        "customer_name": field(SAMPLE["customer_name"]),
+        "invoice_number": field(SAMPLE["invoice_number"]),
+        "date": field(SAMPLE["date"]),
+        "due_date": field(SAMPLE["due_date"]),
+        "time": field(SAMPLE["time"]),
+        "total_amount": field(SAMPLE["total_amount"]),
+        "total_tax": field(SAMPLE["total_tax"]),
+        "category": field("food"),
+        "payment_method": field("card"),
+        "locale": {"currency": SAMPLE["currency"], "language": "sk"},
+        "line_items": SAMPLE["line_items"],
+    }
+    return {
+        "api_request": {"status": "success", "status_code": 201},
+        "document": {
+            "name": "document.pdf",
+            "n_pages": 1,
+            "inference": {
+                "product": {"name": f"mindee/{product}"},
+                "prediction": prediction,
+                "pages": [{"id": 0, "prediction": {**prediction, "confidence": 0.93}}],
+            },
+        },
+    }
+
+
+def veryfi_response() -> Dict[str, Any]:
+    """Shape of a Veryfi v8 document response"""
+    return {
+        "id": random.randint(10 ** 7, 10 ** 8),
+        "document_type": "invoice",
+        "invoice_number": SAMPLE["invoice_number"],
+        "date": f"{SAMPLE['date']} 00:00:00",
+        "due_date": SAMPLE["due_date"],
+        "currency_code": SAMPLE["currency"],
+        "total": SAMPLE["total_amount"],
+        "tax": SAMPLE["total_tax"],
+        "subtotal": round(SAMPLE["total_amount"] - SAMPLE["total_tax"], 2),
+        "vendor": {"name": SAMPLE["supplier_name"], "address": SAMPLE["supplier_address"]},
+        "bill_to": {"name": SAMPLE["customer_name"]},
+        "line_items": [
+            {"description": item["description"], "quantity": item["quantity"], "price": item["unit_price"],
+             "total": item["total_amount"], "tax_rate": item["tax_rate"]}
+            for item in SAMPLE["line_items"]
+        ],
+        "ocr_text": "Faktúra č. 2024/0157 ...",
+    }
+
+
+def klippa_response() -> Dict[str, Any]:
+    """Shape of a Klippa parseDocument response (amounts in cents)"""
+    return {
+        "result": "success",
+        "request_id": f"stub-{random.randint(10 ** 7, 10 ** 8)}",
+        "data": {
+            "document_type": "invoice",
+            "invoice_number": SAMPLE["invoice_number"],
+            "date": f"{SAMPLE['date']}T00:00:00",
+            "currency": SAMPLE["currency"],
+            "amount": int(SAMPLE["total_amount"] * 100),
+            "vatamount": int(SAMPLE["total_tax"] * 100),
+            "merchant_name": SAMPLE["supplier_name"],
+            "merchant_address": SAMPLE["supplier_address"],
+            "lines": [{"linetype": "lineitems", "lineitems": [
+                {"title": item["description"], "quantity": item["quantity"] * 1000,
+                 "amount_each": int(item["unit_price"] * 100), "amount": int(item["total_amount"] * 100),
+                 "vat_percentage": item["tax_rate"] * 100}
+                for item in SAMPLE["line_items"]
+            ]}],
+        },
+    }
+
+
+def ekasa_response(receipt_id: str) -> Dict[str, Any]:
+    """Shape of an eKasa /receipt/find response"""
+    return {
+        "returnValue": 0,
+        "receipt": {
+            "receiptId": receipt_id,
+            "ico": "12345678",
+            "dic": "2020123456",
+            "icDph": "SK2020123456",
+            "issueDate": "05.03.2024 14:33:12",
+            "type": "PD",
+            "totalPrice": 12.90,
+            "taxBaseBasic": 6.25,
+            "vatAmountBasic": 1.25,
+            "vatRateBasic": 20,
+            "taxBaseReduced": 4.91,
+            "vatAmountReduced": 0.49,
+            "vatRateReduced": 10,
+            "items": [
+                {"name": "Káva", "itemType": "K", "quantity": 2, "vatRate": 20, "price": 7.50},
+                {"name": "Rožok", "itemType": "K", "quantity": 3, "vatRate": 10, "price": 5.40},
+            ],
+            "organization": {"name": SAMPLE["supplier_name"], "ico": "12345678", "icDph": "SK2020123456"},
+        },
+    }
+
+
+def create_stub_app(latency_ms: float = 300, jitter_ms: float = 0, error_rate: float = 0.0) -> FastAPI:
+    """
+    One app serving all three providers and the eKasa registry
+
+    Every request waits latency_ms + uniform(0, jitter_ms) and fails with
+    503 with probability error_rate (exercises retries and fallback).
+    """
+    app = FastAPI(title="OCR provider stubs")
+    app.state.requests = 0
+
+    async def respond(request: Request, body: Dict[str, Any]):
+        await request.body()  # Receive the whole upload, like the real API
+        app.state.requests += 1
+        await asyncio.sleep((latency_ms + random.uniform(0, jitter_ms)) / 1000)
+        if random.random() < error_rate:
+            return JSONResponse({"error": "stub: service unavailable"}, status_code=503)
+        return JSONResponse(body, status_code=201)
+
+    @app.post("/v1/products/mindee/{product}/{version}/predict")
+    async def mindee(product: str, version: str, request: Request):
+        return await respond(request, mindee_response(product))
+
+    @app.post("/api/v8/partner/documents")
+    async def veryfi(request: Request):
+        return await respond(request, veryfi_response())
+
+    @app.post("/api/v1/parseDocument")
+    async def klippa(request: Request):
+        return await respond(request, klippa_response())
+
+    @app.post("/mdu/api/v1/opd/receipt/find")
+    async def ekasa(request: Request):
+        body = await request.json()
+        return await respond(request, ekasa_response(body.get("receiptId") or body.get("okp", "")))
+
+    return app
+
+
+class StubServer:
+    """
+    Runs the stub app with uvicorn in a background thread
+
+        with StubServer(latency_ms=200) as stubs:
+            os.environ["MINDEE_API_URL"] = stubs.url
+    """
+
+    def __init__(self, latency_ms: float = 300, jitter_ms: float = 0, error_rate: float = 0.0, port: int = 0):
+        self.app = create_stub_app(latency_ms, jitter_ms, error_rate)
+        self.port = port or self._free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @staticmethod
+    def _free_port() -> int:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
+
+    @property
+    def requests(self) -> int:
+        return self.app.state.requests
+
+    def __enter__(self) -> "StubServer":
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("Provider stub server did not start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    app = create_stub_app(args.latency_ms, args.jitter_ms, args.error_rate)
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
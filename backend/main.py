@@ -1,17 +1,37 @@
 import os
-from datetime import datetime, timedelta
+import secrets
+from datetime import date, datetime, timedelta
 from typing import List, Optional
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File
+from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON, LargeBinary, Numeric, Index, select, delete, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session, relationship
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from pydantic import BaseModel, EmailStr, field_validator
 import openai
-from services.ocr_service import OCRService, OCRProvider, classify_document
+from services.database import (
+    DEFAULT_DATABASE_URL, PoolStats, async_database_url, configure_sqlite, engine_options, upgrade_database
+)
+from services.ocr_service import OCRService, OCRProvider
+from services.ocr_cache import OCRResultCache
+from services.cpu_pool import CPUWorkerPool
+from services.tesseract_engine import warm_up as warm_up_tesseract, engine_name as tesseract_engine_name
+from services.image_preprocessing import ImagePreprocessor
+from services.pdf_service import PageImageCache
+from services.document_pipeline import DocumentPipeline
+from services.document_queue import DocumentQueue, DocumentStatus, QueueFullError
+from services.einvoice import EInvoiceError
+from services.ekasa import EKasaService, create_backend as create_receipt_backend
+from services.ocr_output import unpack_raw_output
+from services.dedup import dedup_key, find_duplicate
+from services import tax_totals
+from services.pagination import encode_cursor, before_cursor
+from services import metrics
+from services.upload_storage import stream_upload_to_disk, UploadTooLargeError
 from services.tax_calculator import SlovakTaxCalculator
 from services.encryption_service import EncryptionService, DataAnonymizationService, SecurityAuditLogger
 from services.ico_verification import ICOVerificationService
@@ -25,13 +45,22 @@ from apscheduler.triggers.cron import CronTrigger
 import logging
 
 # Database setup
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./taxa.db")
-# For SQLite, need to add connect_args for Railway
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    engine = create_engine(DATABASE_URL)
+DATABASE_URL = os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL)
+# Pool size/overflow/timeout/recycle/pre-ping from DB_POOL_* (services/database.py);
+# SQLite connections use WAL, synchronous=NORMAL and busy_timeout
+db_pool_stats = PoolStats()
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, db_pool_stats))
+configure_sqlite(engine, DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Same database through asyncpg/aiosqlite for async def handlers;
+# objects stay readable after commit - lazy loads are not possible on an async session
+db_async_pool_stats = PoolStats()
+async_engine = create_async_engine(
+    async_database_url(DATABASE_URL),
+    **engine_options(DATABASE_URL, db_async_pool_stats, use_asyncio=True)
+)
+configure_sqlite(async_engine.sync_engine, DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 # Security
@@ -47,7 +76,29 @@ openai.api_key = OPENAI_API_KEY
 
 # OCR Service setup
 OCR_PROVIDER = os.getenv("OCR_PROVIDER", "mindee")  # mindee, tesseract, veryfi, klippa
-ocr_service = OCRService(provider=OCRProvider(OCR_PROVIDER))
+# Fallback/hedge providers after the primary, in order (e.g. "tesseract" or "veryfi,tesseract")
+OCR_FALLBACK_PROVIDERS = [p.strip() for p in os.getenv("OCR_FALLBACK_PROVIDERS", "").split(",") if p.strip()]
+# Duplicate uploads are served from a disk cache (OCR_CACHE_DIR, OCR_CACHE_MAX_MB)
+ocr_cache = OCRResultCache() if os.getenv("OCR_CACHE_ENABLED", "true").lower() == "true" else None
+# Tesseract runs in a process pool sized to cores (OCR_PROCESS_WORKERS, 0 = threads);
+# each worker loads the Tesseract models once at start (persistent engine, if installed)
+cpu_pool = CPUWorkerPool(initializer=warm_up_tesseract)
+ocr_service = OCRService(
+    provider=OCRProvider(OCR_PROVIDER),
+    fallback_providers=[OCRProvider(p) for p in OCR_FALLBACK_PROVIDERS],
+    cache=ocr_cache,
+    cpu_pool=cpu_pool,
+    page_cache=PageImageCache()  # Rendered PDF pages (PDF_PAGE_CACHE_DIR, PDF_PAGE_CACHE_MAX_MB)
+)
+
+# Concurrent document processing (limits configurable via env)
+# UPLOAD_MAX_PARALLEL_PER_REQUEST - parallel documents within one upload batch
+# UPLOAD_MAX_PARALLEL_PER_PROCESS - parallel documents across all requests in this worker
+# Images are downscaled/grayscaled (optionally deskewed) before OCR - see OCR_TARGET_DPI, OCR_DESKEW
+image_preprocessor = ImagePreprocessor(cpu_pool=cpu_pool)
+# Receipts with an eKasa QR code are looked up instead of OCRed (EKASA_LOOKUP_BACKEND, EKASA_ENABLED)
+ekasa_service = EKasaService(create_receipt_backend(ocr_service.http_client), cache=ocr_cache, cpu_pool=cpu_pool)
+document_pipeline = DocumentPipeline(ocr_service, preprocessor=image_preprocessor, ekasa=ekasa_service)
 
 # File upload directory
 UPLOAD_DIR = Path("uploads")
@@ -85,9 +136,39 @@ class Document(Base):
     document_type = Column(String)  # invoice, receipt, tax_form, etc.
     extracted_data = Column(JSON)  # OCR extracted data
     confidence = Column(Integer)  # OCR confidence score
+    file_sha256 = Column(String(64), nullable=True, index=True)  # Digest computed while streaming upload
+    file_size = Column(Integer, nullable=True)  # Bytes
+    status = Column(String, default="processed", index=True)  # processing, processed, failed
+    attempts = Column(Integer, default=0)  # OCR attempts so far
+    last_error = Column(Text, nullable=True)  # Last OCR error (kept for dead-lettered documents)
+    # Lease on a "processing" document: the worker process OCRing it (services/document_queue.py)
+    claimed_by = Column(String, nullable=True, index=True)
+    claimed_at = Column(DateTime, nullable=True)
+    processed_at = Column(DateTime, nullable=True)
     uploaded_at = Column(DateTime, default=datetime.utcnow)
+    # Duplicate index (services/dedup.py): image dHash, supplier/number/total key
+    perceptual_hash = Column(String(16), nullable=True, index=True)
+    dedup_key = Column(String(64), nullable=True, index=True)
+    duplicate_of_id = Column(Integer, ForeignKey("documents.id"), nullable=True, index=True)  # Set for likely duplicates
+    similar_to_id = Column(Integer, ForeignKey("documents.id"), nullable=True, index=True)  # Equal image hash only, still counted
+    duplicate_dismissed = Column(Boolean, default=False)  # User marked it as not a duplicate
     user_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="documents")
+    # Loaded only when accessed - list/tax/export queries never read the blob
+    ocr_output = relationship("DocumentOCROutput", uselist=False, cascade="all, delete-orphan")
+    __table_args__ = (
+        # Document list pages in (uploaded_at, id) order, with and without a type filter
+        Index("ix_documents_user_id_uploaded_at_id", "user_id", "uploaded_at", "id"),
+        Index("ix_documents_user_id_document_type_uploaded_at_id", "user_id", "document_type", "uploaded_at", "id"),
+    )
+
+class DocumentOCROutput(Base):
+    """Raw OCR text + word boxes of a document, zlib-compressed JSON (services/ocr_output.py)"""
+    __tablename__ = "document_ocr_output"
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+    raw_size = Column(Integer)  # Uncompressed bytes
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
@@ -97,9 +178,49 @@ class ChatMessage(Base):
     content = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     user = relationship("User", back_populates="messages")
+    __table_args__ = (
+        Index("ix_chat_messages_user_id_created_at", "user_id", "created_at"),  # Chat history in order
+    )
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+class TaxYearTotals(Base):
+    """Income/expense/VAT sums per user and tax year, updated with every document change (services/tax_totals.py)"""
+    __tablename__ = "tax_year_totals"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    income = Column(Numeric(14, 2), nullable=False, default=0)  # Invoices
+    expenses = Column(Numeric(14, 2), nullable=False, default=0)  # Receipts
+    income_vat = Column(Numeric(14, 2), nullable=False, default=0)
+    expense_vat = Column(Numeric(14, 2), nullable=False, default=0)
+    invoice_count = Column(Integer, nullable=False, default=0)
+    receipt_count = Column(Integer, nullable=False, default=0)
+    other_count = Column(Integer, nullable=False, default=0)  # Processed, neither invoice nor receipt
+    duplicate_count = Column(Integer, nullable=False, default=0)  # Likely duplicates, not summed
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+# Schema migrations (alembic/); set DB_AUTO_MIGRATE=false when a release step runs "alembic upgrade head"
+if os.getenv("DB_AUTO_MIGRATE", "true").lower() == "true":
+    upgrade_database(engine, Base.metadata)
+
+# Background OCR worker pool (retries with backoff, dead-letters after OCR_QUEUE_MAX_ATTEMPTS)
+# Admission control: OCR_QUEUE_MAX_PER_USER documents per user, OCR_QUEUE_MAX_DEPTH waiting overall
+document_queue = DocumentQueue(
+    document_pipeline, SessionLocal, Document,
+    ocr_output_model=DocumentOCROutput,
+    totals_model=TaxYearTotals
+)
+
+# Live service stats exported on /metrics (METRICS_TOKEN bearer token; loopback only when unset)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+metrics_registry = metrics.create_registry({
+    "ocr_queue": document_queue.stats,
+    "ocr_cache": lambda: ocr_cache.stats() if ocr_cache else {},
+    "ocr_workers": cpu_pool.stats,
+    "ocr_roi": lambda: ocr_service.roi_stats,
+    "image_preprocessing": image_preprocessor.stats,
+    "ekasa": ekasa_service.stats,
+    "db_pool": db_pool_stats.stats,
+    "db_async_pool": db_async_pool_stats.stats
+})
 
 # Pydantic models
 class UserCreate(BaseModel):
@@ -156,8 +277,29 @@ class DocumentResponse(BaseModel):
     document_type: Optional[str]
     extracted_data: Optional[dict]
     confidence: Optional[int]
+    status: Optional[str] = None
+    duplicate_of_id: Optional[int] = None
+    similar_to_id: Optional[int] = None
     uploaded_at: datetime
 
+class DocumentListItem(BaseModel):
+    """Document list entry - extracted_data stays out, GET /api/documents/{id} has it"""
+    id: int
+    filename: str
+    document_type: Optional[str]
+    confidence: Optional[int]
+    status: Optional[str] = None
+    duplicate_of_id: Optional[int] = None
+    similar_to_id: Optional[int] = None
+    uploaded_at: datetime
+    total_amount: Optional[float] = None
+    currency: Optional[str] = None
+
+class DocumentPage(BaseModel):
+    documents: List[DocumentListItem]
+    next_cursor: Optional[str] = None  # Pass as ?cursor= for the next page; None on the last page
+    total: Optional[int] = None  # Matching documents, first page only
+
 class OnboardingUpdate(BaseModel):
     phone: Optional[str] = None
     business_type: Optional[str] = None
@@ -216,6 +358,9 @@ async def startup_event():
     scheduler.start()
     logger.info("✅ Scheduler nastavený - týždenná kontrola zákonov každý pondelok o 9:00")
     
+    # Claim and re-queue documents whose OCR did not finish before the last shutdown
+    await document_queue.start()
+    
     # Voliteľne: Spustiť prvú kontrolu hneď pri štarte (pre testovanie)
     # run_weekly_update()
 
@@ -226,6 +371,12 @@ async def shutdown_event():
     """
     scheduler.shutdown()
     logger.info("🛑 Scheduler vypnutý")
+    
+    # Unfinished documents stay in "processing"; their leases are released for the next worker
+    await document_queue.stop()
+    await ocr_service.aclose()
+    cpu_pool.shutdown()
+    await async_engine.dispose()
 
 # Dependency
 def get_db():
@@ -235,6 +386,11 @@ def get_db():
     finally:
         db.close()
 
+# Async dependency for async def handlers - queries are awaited instead of blocking the event loop
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # IČO Verification Function
 async def verify_ico(ico: str) -> dict:
     """Verify IČO using Slovak Register API"""
@@ -358,23 +514,37 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def get_token_email(token: str) -> str:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
-            raise credentials_exception
+            raise credentials_exception()
     except JWTError:
-        raise credentials_exception
-    
+        raise credentials_exception()
+    return email
+
+# Plain def: FastAPI runs it in the threadpool, the sync query stays off the event loop
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    email = get_token_email(token)
     user = db.query(User).filter(User.email == email).first()
     if user is None:
-        raise credentials_exception
+        raise credentials_exception()
+    return user
+
+# For handlers on get_async_db (shares the request's async session)
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    email = get_token_email(token)
+    user = await db.scalar(select(User).where(User.email == email))
+    if user is None:
+        raise credentials_exception()
     return user
 
 # Routes
@@ -384,7 +554,33 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok", "database": "connected", "ocr_provider": OCR_PROVIDER}
+    return {
+        "status": "ok",
+        "database": "connected",
+        "ocr_provider": OCR_PROVIDER,
+        "ocr_providers": ocr_service.chain.stats_dict(),
+        "ocr_cache": ocr_cache.stats() if ocr_cache else None,
+        "ocr_workers": cpu_pool.stats(),
+        "tesseract_engine": tesseract_engine_name(),
+        "ocr_roi": ocr_service.roi_stats,
+        "image_preprocessing": image_preprocessor.stats(),
+        "ekasa": ekasa_service.stats(),
+        "document_queue": document_queue.stats(),
+        "db_pool": db_pool_stats.stats(),
+        "db_async_pool": db_async_pool_stats.stats()
+    }
+
+@app.get("/metrics")
+def get_metrics(request: Request):
+    """Prometheus scrape endpoint (queue depth, in-flight OCR, cache and worker stats)"""
+    if METRICS_TOKEN:
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not secrets.compare_digest(token, METRICS_TOKEN):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    elif request.client is None or request.client.host not in ("127.0.0.1", "::1"):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    body, content_type = metrics.render(metrics_registry)
+    return Response(content=body, media_type=content_type)
 
 # Auth endpoints
 @app.post("/api/auth/register", response_model=Token)
@@ -509,62 +705,265 @@ def update_onboarding(
     )
 
 # Documents endpoints
-@app.get("/api/documents", response_model=List[DocumentResponse])
-def get_documents(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    documents = db.query(Document).filter(Document.user_id == current_user.id).all()
-    return documents
+def _amount_or_none(value) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+@app.get("/api/documents", response_model=DocumentPage)
+def get_documents(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    document_type: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    The user's documents, newest first, one page at a time
+
+    Keyset pagination on (uploaded_at, id): each page is a range of the
+    composite index, however deep. Only the list columns are read - the
+    amount and currency come out of extracted_data in the database.
+    date_from/date_to are inclusive upload days.
+    """
+    filters = [Document.user_id == current_user.id]
+    if document_type:
+        filters.append(Document.document_type == document_type)
+    if date_from:
+        filters.append(Document.uploaded_at >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        filters.append(Document.uploaded_at < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+
+    query = db.query(
+        Document.id, Document.filename, Document.document_type, Document.confidence,
+        Document.status, Document.duplicate_of_id, Document.similar_to_id, Document.uploaded_at,
+        Document.extracted_data["total_amount"].as_string().label("total_amount"),
+        Document.extracted_data["currency"].as_string().label("currency")
+    ).filter(*filters)
+    if cursor:
+        try:
+            query = query.filter(before_cursor(Document.uploaded_at, Document.id, cursor))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # One extra row tells whether another page follows
+    rows = query.order_by(Document.uploaded_at.desc(), Document.id.desc()).limit(limit + 1).all()
+    page = rows[:limit]
+    documents = [
+        DocumentListItem(
+            **{column: getattr(row, column) for column in (
+                "id", "filename", "document_type", "confidence", "status",
+                "duplicate_of_id", "similar_to_id", "uploaded_at"
+            )},
+            total_amount=_amount_or_none(row.total_amount),
+            currency=row.currency or None
+        )
+        for row in page
+    ]
+    return DocumentPage(
+        documents=documents,
+        next_cursor=encode_cursor(page[-1].uploaded_at, page[-1].id) if len(rows) > limit else None,
+        total=None if cursor else db.query(func.count(Document.id)).filter(*filters).scalar()
+    )
 
-@app.post("/api/documents/upload")
+@app.post("/api/documents/upload", status_code=status.HTTP_202_ACCEPTED)
 async def upload_document(
     files: List[UploadFile] = File(...),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
+    # Backpressure: refuse the batch before storing anything if OCR capacity is exhausted;
+    # files beyond the per-user limit are stored and wait in the user's backlog
+    try:
+        document_queue.admit(current_user.id, len(files))
+    except QueueFullError as e:
+        if e.scope == "batch":
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS if e.scope == "user" else status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    
+    try:
+        stored_files, rejected, new_docs = await _store_uploads(files, current_user, db)
+    except Exception:
+        document_queue.release(current_user.id, len(files))
+        raise
+    
+    # Slots of rejected files and e-invoices (already processed) are not needed
+    document_queue.release(current_user.id, len(files) - len(stored_files))
+    document_queue.enqueue([
+        {
+            "document_id": new_docs[stored["index"]].id,
+            "user_id": current_user.id,
+            "path": stored["path"],
+            "sha256": stored["sha256"]
+        }
+        for stored in stored_files
+    ], admitted=True)
+    
     uploaded_files = []
+    for index, file in enumerate(files):
+        if index in rejected:
+            uploaded_files.append({
+                "filename": file.filename,
+                "error": rejected[index]
+            })
+            continue
+        
+        new_doc = new_docs[index]
+        uploaded_files.append({
+            "document_id": new_doc.id,
+            "filename": file.filename,
+            "status": new_doc.status,
+            "size": new_doc.file_size,
+            "sha256": new_doc.file_sha256,
+            "duplicate_of": new_doc.duplicate_of_id
+        })
+    
+    return {"message": "Files uploaded, processing started", "files": uploaded_files}
+
+async def _store_uploads(files: List[UploadFile], current_user: User, db: AsyncSession):
+    """
+    Stream uploads to disk and create their Document rows
+
+    XML e-invoices are parsed right here and stored as "processed"; every
+    other file gets status "processing" and is returned in stored_files
+    for the OCR queue.
+    """
+    stored_files = []
+    einvoices = []
+    rejected = {}
     
-    for file in files:
+    for index, file in enumerate(files):
         # Generate unique filename to avoid conflicts
         file_extension = Path(file.filename).suffix
         unique_filename = f"{uuid.uuid4()}{file_extension}"
         file_path = UPLOAD_DIR / unique_filename
         
-        # Save file permanently
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
-        
-        # Classify document type
-        doc_type = await classify_document(str(file_path))
+        # Stream file to disk in chunks (size limit, SHA-256 and byte count in one pass)
+        try:
+            stored = await stream_upload_to_disk(file, file_path)
+        except UploadTooLargeError as e:
+            rejected[index] = str(e)
+            continue
+        finally:
+            await file.close()
         
-        # Process with OCR
+        stored["index"] = index
         try:
-            extracted_data = await ocr_service.process_document(str(file_path), doc_type)
-            confidence = int(extracted_data.get('confidence', 0) * 100)
-        except Exception as e:
-            print(f"OCR processing failed: {e}")
-            extracted_data = {}
-            confidence = 0
+            result = await document_pipeline.process_einvoice(stored["path"], stored["sha256"])
+        except EInvoiceError as e:
+            os.remove(stored["path"])
+            rejected[index] = str(e)
+            continue
         
-        # Save to database
+        if result is not None:
+            einvoices.append((stored, result))
+        else:
+            stored_files.append(stored)
+    
+    # Duplicate lookups and the tax upsert use the sync ORM API; run_sync keeps them off the event loop
+    new_docs = await db.run_sync(
+        _create_upload_documents, [file.filename for file in files], stored_files, einvoices, current_user.id
+    )
+    await db.commit()
+    
+    return stored_files, rejected, new_docs
+
+def _create_upload_documents(db: Session, filenames: List[str], stored_files, einvoices, user_id: int):
+    """Document rows for stored uploads, flagged and counted (sync; AsyncSession.run_sync)"""
+    # Create documents right away; classification + OCR run in the background
+    new_docs = {}
+    for stored in stored_files:
         new_doc = Document(
-            filename=file.filename,
-            file_path=str(file_path),
-            document_type=doc_type,
-            extracted_data=extracted_data,
-            confidence=confidence,
-            user_id=current_user.id
+            filename=filenames[stored["index"]],
+            file_path=stored["path"],
+            file_sha256=stored["sha256"],
+            file_size=stored["size"],
+            status=DocumentStatus.PROCESSING,
+            attempts=0,
+            user_id=user_id,
+            **document_queue.lease()
         )
         db.add(new_doc)
-        
-        uploaded_files.append({
-            "filename": file.filename,
-            "type": doc_type,
-            "confidence": confidence,
-            "data": extracted_data
+        new_docs[stored["index"]] = new_doc
+    
+    # Structured e-invoices skip classification and OCR entirely
+    for stored, result in einvoices:
+        new_doc = Document(
+            filename=filenames[stored["index"]],
+            file_path=stored["path"],
+            file_sha256=stored["sha256"],
+            file_size=stored["size"],
+            document_type=result["document_type"],
+            extracted_data=result["extracted_data"],
+            confidence=result["confidence"],
+            status=DocumentStatus.PROCESSED,
+            attempts=0,
+            processed_at=datetime.utcnow(),
+            user_id=user_id
+        )
+        db.add(new_doc)
+        new_docs[stored["index"]] = new_doc
+    
+    # Duplicate index: byte-identical re-uploads are flagged right away (file_sha256
+    # is indexed); e-invoices are complete, so their field key is checked as well
+    db.flush()
+    for index in sorted(new_docs):
+        new_doc = new_docs[index]
+        if new_doc.status == DocumentStatus.PROCESSED:
+            new_doc.dedup_key = dedup_key(new_doc.extracted_data)
+        new_doc.duplicate_of_id = find_duplicate(
+            db, Document, user_id, new_doc.id,
+            file_sha256=new_doc.file_sha256,
+            dedup_key=new_doc.dedup_key,
+            earlier_only=True
+        )
+        # E-invoices count for their tax year right away (documents in OCR add nothing yet)
+        tax_totals.track(db, TaxYearTotals.__table__, new_doc, before=None)
+    
+    return new_docs
+
+@app.get("/api/documents/status")
+def get_documents_status(
+    ids: List[int] = Query(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Poll processing status of uploaded documents
+    Usage: GET /api/documents/status?ids=1&ids=2
+    """
+    documents = db.query(Document).filter(
+        Document.id.in_(ids),
+        Document.user_id == current_user.id
+    ).all()
+    by_id = {doc.id: doc for doc in documents}
+    
+    results = []
+    for doc_id in ids:
+        doc = by_id.get(doc_id)
+        if not doc:
+            results.append({"id": doc_id, "status": "not_found"})
+            continue
+        results.append({
+            "id": doc.id,
+            "status": doc.status,
+            "document_type": doc.document_type,
+            "confidence": doc.confidence,
+            "attempts": doc.attempts,
+            "error": doc.last_error if doc.status == DocumentStatus.FAILED else None
         })
     
-    db.commit()
-    return {"message": "Files uploaded and processed", "files": uploaded_files}
+    return {
+        "documents": results,
+        "queue": document_queue.stats()
+    }
 
 @app.get("/api/documents/{document_id}")
 def get_document(
@@ -582,12 +981,53 @@ def get_document(
     
     return document
 
-# Helper function for AI responses with Slovak Tax Knowledge Base
-def check_missing_documents(db: Session, user_id: int) -> dict:
-    """Check what important documents are missing for tax return"""
-    documents = db.query(Document).filter(Document.user_id == user_id).all()
+@app.post("/api/documents/{document_id}/not-duplicate", response_model=DocumentResponse)
+def dismiss_duplicate(
+    document_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Clear a duplicate/similar flag; the document counts for its tax year and is not flagged again"""
+    document = db.query(Document).filter(
+        Document.id == document_id,
+        Document.user_id == current_user.id
+    ).first()
+    
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    counted_before = tax_totals.document_contribution(document)
+    document.duplicate_of_id = None
+    document.similar_to_id = None
+    document.duplicate_dismissed = True
+    tax_totals.track(db, TaxYearTotals.__table__, document, counted_before)
+    db.commit()
+    db.refresh(document)
+    return document
+
+@app.get("/api/documents/{document_id}/ocr-output")
+def get_document_ocr_output(
+    document_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Raw OCR text and word boxes (kept out of extracted_data, loaded on demand)"""
+    document = db.query(Document).filter(
+        Document.id == document_id,
+        Document.user_id == current_user.id
+    ).first()
     
-    doc_types = [doc.document_type.lower() if doc.document_type else "" for doc in documents]
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if document.ocr_output is None:
+        raise HTTPException(status_code=404, detail="No raw OCR output stored for this document")
+    
+    return {"document_id": document.id, **unpack_raw_output(document.ocr_output.data)}
+
+# Helper function for AI responses with Slovak Tax Knowledge Base
+def check_missing_documents(document_types: List[Optional[str]]) -> dict:
+    """Check what important documents are missing for tax return (types of the user's documents)"""
+    doc_types = [dt.lower() if dt else "" for dt in document_types]
     
     missing = {
         "bank_statement": not any("bank" in dt or "výpis" in dt for dt in doc_types),
@@ -1201,15 +1641,18 @@ Opýtajte sa ma na čokoľvek!"""
 @app.get("/api/chat/history")
 async def get_chat_history(
     limit: int = 50,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Retrieve chat history for the current user
     """
-    messages = db.query(ChatMessage).filter(
-        ChatMessage.user_id == current_user.id
-    ).order_by(ChatMessage.created_at.asc()).limit(limit).all()
+    messages = (await db.scalars(
+        select(ChatMessage)
+        .where(ChatMessage.user_id == current_user.id)
+        .order_by(ChatMessage.created_at.asc())
+        .limit(limit)
+    )).all()
     
     return {
         "messages": [
@@ -1226,8 +1669,8 @@ async def get_chat_history(
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Save user message
     user_message = ChatMessage(
@@ -1237,13 +1680,14 @@ async def chat(
     )
     db.add(user_message)
     
-    # Get user's documents count for context
-    docs_count = db.query(Document).filter(
-        Document.user_id == current_user.id
-    ).count()
+    # Get user's document types: count for context + missing documents check, one query
+    document_types = (await db.scalars(
+        select(Document.document_type).where(Document.user_id == current_user.id)
+    )).all()
+    docs_count = len(document_types)
     
     # Check for missing important documents
-    missing_docs = check_missing_documents(db, current_user.id)
+    missing_docs = check_missing_documents(document_types)
     
     # Get AI response using built-in knowledge base
     try:
@@ -1260,7 +1704,7 @@ async def chat(
         content=ai_response
     )
     db.add(assistant_message)
-    db.commit()
+    await db.commit()
     
     return {"response": ai_response}
 
@@ -1282,57 +1726,40 @@ class TaxReturnResponse(BaseModel):
 @app.post("/api/tax-return/calculate", response_model=TaxReturnResponse)
 async def calculate_tax_return(
     request: TaxReturnRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Calculate complete tax return for the specified year
-    Aggregates all documents and performs Slovak tax calculations
+    Reads the year's document totals (tax_year_totals) and performs Slovak tax calculations
     """
     calculator = SlovakTaxCalculator(year=request.year)
     
-    # Get all documents for the year
-    documents = db.query(Document).filter(
-        Document.user_id == current_user.id,
-        Document.created_at >= datetime(request.year, 1, 1),
-        Document.created_at < datetime(request.year + 1, 1, 1)
-    ).all()
-    
-    # Aggregate income and expenses from documents
-    total_income = Decimal("0")
-    total_expenses = Decimal("0")
-    
-    documents_data = []
-    for doc in documents:
-        doc_data = {
-            "id": doc.id,
-            "filename": doc.filename,
-            "upload_date": doc.created_at.isoformat(),
-            "document_type": doc.document_type,
-        }
-        
-        # Parse extracted data if available
-        if doc.extracted_data:
-            try:
-                data = doc.extracted_data if isinstance(doc.extracted_data, dict) else {}
-                
-                # Extract amounts from OCR data
-                if doc.document_type == "invoice":
-                    amount = Decimal(str(data.get("total_amount", 0) or 0))
-                    total_income += amount
-                    doc_data["amount"] = float(amount)
-                    doc_data["category"] = "income"
-                    
-                elif doc.document_type == "receipt":
-                    amount = Decimal(str(data.get("total_amount", 0) or 0))
-                    total_expenses += amount
-                    doc_data["amount"] = float(amount)
-                    doc_data["category"] = "expense"
-                    
-            except (ValueError, TypeError):
-                pass
-        
-        documents_data.append(doc_data)
+    # Sums are kept per tax year as documents are processed - one row instead of every document
+    totals = tax_totals.totals_dict(await db.get(TaxYearTotals, (current_user.id, request.year)))
+    total_income = totals["income"]
+    total_expenses = totals["expenses"]
+    
+    # Per category; the documents themselves are listed by /api/tax-return/documents/{year}
+    documents_data = [
+        {
+            "category": "income",
+            "document_type": "invoice",
+            "count": totals["invoice_count"],
+            "amount": float(totals["income"]),
+            "vat": float(totals["income_vat"])
+        },
+        {
+            "category": "expense",
+            "document_type": "receipt",
+            "count": totals["receipt_count"],
+            "amount": float(totals["expenses"]),
+            "vat": float(totals["expense_vat"])
+        },
+        {"category": "other", "count": totals["other_count"]},
+        # Likely duplicates (same file, image or invoice) are not counted
+        {"category": "duplicate", "count": totals["duplicate_count"]}
+    ]
     
     # Perform tax calculation
     calculation = calculator.calculate_complete_tax_return(
@@ -1400,17 +1827,17 @@ async def calculate_tax_return(
 @app.get("/api/tax-return/documents/{year}")
 async def get_tax_documents(
     year: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all documents for a specific tax year
     """
-    documents = db.query(Document).filter(
+    documents = (await db.scalars(select(Document).where(
         Document.user_id == current_user.id,
-        Document.created_at >= datetime(year, 1, 1),
-        Document.created_at < datetime(year + 1, 1, 1)
-    ).all()
+        Document.uploaded_at >= datetime(year, 1, 1),
+        Document.uploaded_at < datetime(year + 1, 1, 1)
+    ))).all()
     
     return {
         "year": year,
@@ -1420,8 +1847,10 @@ async def get_tax_documents(
                 "id": doc.id,
                 "filename": doc.filename,
                 "type": doc.document_type,
-                "upload_date": doc.created_at.isoformat(),
-                "extracted_data": doc.extracted_data
+                "upload_date": doc.uploaded_at.isoformat(),
+                "extracted_data": doc.extracted_data,
+                "duplicate_of": doc.duplicate_of_id,
+                "similar_to": doc.similar_to_id
             }
             for doc in documents
         ]
@@ -1430,8 +1859,7 @@ async def get_tax_documents(
 @app.post("/api/tax-return/generate-pdf/{year}")
 async def generate_tax_return_pdf(
     year: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     Generate PDF of DPFO Type B form
@@ -1448,8 +1876,7 @@ async def generate_tax_return_pdf(
 @app.post("/api/tax-return/export-xml/{year}")
 async def export_tax_return_xml(
     year: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     Export tax return in XML format for electronic submission
@@ -1581,8 +2008,8 @@ async def validate_ico_format(data: dict):
 
 @app.get("/api/gdpr/my-data")
 async def export_my_data(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     GDPR Article 15: Right of access
@@ -1597,10 +2024,10 @@ async def export_my_data(
     )
     
     # Get all user documents
-    documents = db.query(Document).filter(Document.user_id == current_user.id).all()
+    documents = (await db.scalars(select(Document).where(Document.user_id == current_user.id))).all()
     
     # Get all chat messages
-    messages = db.query(ChatMessage).filter(ChatMessage.user_id == current_user.id).all()
+    messages = (await db.scalars(select(ChatMessage).where(ChatMessage.user_id == current_user.id))).all()
     
     # Prepare export data
     export_data = {
@@ -1630,7 +2057,7 @@ async def export_my_data(
                 "filename": doc.filename,
                 "document_type": doc.document_type,
                 "file_path": doc.file_path,
-                "upload_date": doc.created_at.isoformat(),
+                "upload_date": doc.uploaded_at.isoformat(),
                 "extracted_data": doc.extracted_data
             }
             for doc in documents
@@ -1655,8 +2082,8 @@ async def export_my_data(
 
 @app.delete("/api/gdpr/delete-account")
 async def delete_my_account(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     GDPR Article 17: Right to erasure ("right to be forgotten")
@@ -1667,22 +2094,42 @@ async def delete_my_account(
     user_email = current_user.email
     
     # Get counts for audit log
-    documents_count = db.query(Document).filter(Document.user_id == user_id).count()
-    messages_count = db.query(ChatMessage).filter(ChatMessage.user_id == user_id).count()
-    
-    # Delete all documents
-    db.query(Document).filter(Document.user_id == user_id).delete()
+    documents_count = await db.scalar(select(func.count(Document.id)).where(Document.user_id == user_id))
+    messages_count = await db.scalar(select(func.count(ChatMessage.id)).where(ChatMessage.user_id == user_id))
+    
+    # Files whose cached OCR results and rendered pages are purged below
+    digests = set(await db.scalars(
+        select(Document.file_sha256).where(Document.user_id == user_id, Document.file_sha256.is_not(None)).distinct()
+    ))
+    
+    # Delete all documents (raw OCR output first - bulk deletes skip ORM cascades)
+    user_document_ids = select(Document.id).where(Document.user_id == user_id)
+    await db.execute(
+        delete(DocumentOCROutput)
+        .where(DocumentOCROutput.document_id.in_(user_document_ids))
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(delete(Document).where(Document.user_id == user_id))
     SecurityAuditLogger.log_data_deletion(user_id, "documents", documents_count)
     
+    await db.execute(delete(TaxYearTotals).where(TaxYearTotals.user_id == user_id))
+    
     # Delete all chat messages
-    db.query(ChatMessage).filter(ChatMessage.user_id == user_id).delete()
+    await db.execute(delete(ChatMessage).where(ChatMessage.user_id == user_id))
     SecurityAuditLogger.log_data_deletion(user_id, "chat_messages", messages_count)
     
     # Delete user account
-    db.query(User).filter(User.id == user_id).delete()
+    await db.execute(delete(User).where(User.id == user_id))
     SecurityAuditLogger.log_data_deletion(user_id, "user_account", 1)
     
-    db.commit()
+    await db.commit()
+    
+    # The disk caches are keyed by file content; keep files other accounts uploaded too
+    if digests:
+        digests -= set(await db.scalars(select(Document.file_sha256).where(Document.file_sha256.in_(digests))))
+    for digest in digests:
+        await ocr_service.purge_cached(digest)
+    SecurityAuditLogger.log_data_deletion(user_id, "ocr_cache_files", len(digests))
     
     return {
         "message": "Account successfully deleted",
@@ -1761,8 +2208,8 @@ async def get_privacy_info():
 @app.get("/api/gdpr/data-portability")
 async def get_portable_data(
     format: str = "json",
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     GDPR Article 20: Right to data portability
@@ -1777,7 +2224,7 @@ async def get_portable_data(
     )
     
     # Get all data
-    documents = db.query(Document).filter(Document.user_id == current_user.id).all()
+    documents = (await db.scalars(select(Document).where(Document.user_id == current_user.id))).all()
     
     portable_data = {
         "format": format,
@@ -1809,7 +2256,7 @@ async def get_portable_data(
         portable_data["documents"].append({
             "filename": doc.filename,
             "type": doc.document_type,
-            "date": doc.created_at.isoformat(),
+            "date": doc.uploaded_at.isoformat(),
             "extracted_data": doc.extracted_data
         })
     
@@ -1818,8 +2265,7 @@ async def get_portable_data(
 @app.post("/api/gdpr/consent")
 async def update_consent(
     consent_data: dict,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     GDPR Article 7: Consent management
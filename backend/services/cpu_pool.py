@@ -0,0 +1,147 @@
+"""
+CPU Worker Pool
+Process pool for CPU-heavy document work (Tesseract OCR, image decoding)
+"""
+
+import os
+import sys
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CPUTaskTimeoutError(Exception):
+    """Raised when a pooled task exceeds its time limit"""
+    pass
+
+
+class CPUWorkerPool:
+    """
+    Runs CPU-bound functions in separate processes so the event loop stays free
+
+    - workers: pool size, defaults to the number of cores
+    - task_timeout: seconds before a task is abandoned and the pool recycled
+    - max_tasks_per_worker: worker processes are replaced after this many
+      tasks, which bounds memory growth from Tesseract/PIL (before Python
+      3.11 the whole pool is replaced after workers * max_tasks_per_worker)
+    - initializer: runs once in every new worker (e.g. loading OCR models)
+
+    Functions and arguments must be picklable (module-level functions).
+    """
+
+    def __init__(
+        self,
+        workers: int = None,
+        task_timeout: float = None,
+        max_tasks_per_worker: int = None,
+        initializer: Optional[Callable] = None
+    ):
+        if workers is None:
+            workers = int(os.getenv("OCR_PROCESS_WORKERS") or os.cpu_count() or 1)
+        self.workers = workers
+        self.task_timeout = task_timeout or float(os.getenv("OCR_TASK_TIMEOUT_SECONDS", "120"))
+        self.max_tasks_per_worker = max_tasks_per_worker or int(os.getenv("OCR_WORKER_MAX_TASKS", "50"))
+        self.initializer = initializer
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_tasks = 0  # Submitted to the current executor
+        # Only submit as many tasks as there are workers, so the timeout
+        # measures execution time rather than time spent queued. Created on
+        # first use: before Python 3.10 a semaphore binds to the loop current
+        # at creation, and the pool is built at import, before uvicorn's loop
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.completed = 0
+        self.timeouts = 0
+        self.restarts = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def _worker_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(max(self.workers, 1))
+        return self._slots
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is not None and self._executor_tasks >= self.workers * self.max_tasks_per_worker:
+            # No max_tasks_per_child before 3.11: retire the pool, running tasks still finish
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            self.restarts += 1
+        if self._executor is None:
+            options = {}
+            if sys.version_info >= (3, 11):
+                options["max_tasks_per_child"] = self.max_tasks_per_worker
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=self.initializer,
+                **options
+            )
+            self._executor_tasks = 0
+        if sys.version_info < (3, 11):
+            self._executor_tasks += 1
+        return self._executor
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        """
+        Run func(*args) in a worker process
+
+        Falls back to a thread when the pool is disabled (OCR_PROCESS_WORKERS=0).
+
+        Raises:
+            CPUTaskTimeoutError: if the task did not finish within task_timeout
+        """
+        if not self.enabled:
+            return await asyncio.to_thread(func, *args)
+
+        loop = asyncio.get_running_loop()
+        executor = None
+        try:
+            async with self._worker_slots():
+                executor = self._get_executor()
+                future = loop.run_in_executor(executor, func, *args)
+                result = await asyncio.wait_for(future, timeout=self.task_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.error(f"CPU task {getattr(func, '__name__', func)} timed out after {self.task_timeout}s")
+            # A stuck worker cannot be cancelled - recycle the whole pool
+            self._restart(executor)
+            raise CPUTaskTimeoutError(f"Task exceeded {self.task_timeout}s")
+        except BrokenProcessPool:
+            logger.error("CPU worker pool broken (worker crashed) - restarting")
+            self._restart(executor)
+            raise
+
+        self.completed += 1
+        return result
+
+    def _restart(self, executor: Optional[ProcessPoolExecutor]):
+        # Other tasks of the same broken pool must not tear down its replacement
+        if executor is None or executor is not self._executor:
+            return
+        self._executor = None
+        self.restarts += 1
+        # Terminate worker processes directly: shutdown() alone would wait for the stuck task
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "completed": self.completed,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts
+        }
+
+    def shutdown(self):
+        """Stop worker processes (call on application shutdown)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
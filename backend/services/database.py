@@ -0,0 +1,233 @@
+"""
+Database Engines
+Engine settings for the sync and asyncio engines created in main.py
+
+Handlers that run on the event loop (async def) use the async session, so
+a query awaits asyncpg (PostgreSQL) or aiosqlite (SQLite) instead of
+blocking every other request in the worker. Sync handlers keep
+SessionLocal - FastAPI already runs them in its threadpool.
+
+Pool settings come from the environment (DB_POOL_*), apply to each engine
+separately and are per worker process. SQLite connections run in WAL mode
+so one writer no longer blocks readers. Time spent waiting for a pooled
+connection is tracked per engine (PoolStats) and exported on /metrics.
+
+The schema is versioned with Alembic (backend/alembic/); upgrade_database()
+replaces the former Base.metadata.create_all() at startup. Every uvicorn
+worker calls it, so the upgrade runs under a lock shared by all workers:
+a PostgreSQL advisory lock, for SQLite a file lock next to the database.
+"""
+
+import os
+import time
+import logging
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+try:
+    import fcntl
+except ImportError:  # Windows: local development only, one worker
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATABASE_URL = "sqlite:///./taxa.db"
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+# The schema create_all() produced before migrations existed
+BASELINE_REVISION = "0001"
+# pg_advisory_xact_lock() key held while migrating (any constant unique to this app)
+MIGRATION_LOCK_KEY = 0x7461786D  # "taxm"
+
+# Backend name in DATABASE_URL -> asyncio driver
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",  # Heroku/Railway style URLs
+}
+
+
+def async_database_url(database_url: str) -> URL:
+    """DATABASE_URL with its driver replaced by the asyncio one"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No asyncio driver configured for {backend} databases")
+    url = url.set(drivername=ASYNC_DRIVERS[backend])
+
+    if url.drivername == "postgresql+asyncpg" and "sslmode" in url.query:
+        # asyncpg rejects the libpq sslmode parameter, it takes ssl=<mode>
+        query = dict(url.query)
+        query["ssl"] = query.pop("sslmode")
+        url = url.set(query=query)
+    return url
+
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() == "true"
+
+
+class PoolStats:
+    """
+    Connection checkout timing of one engine's pool
+
+    A checkout is measured from the request for a connection until the pool
+    hands one over - waiting for a free connection plus opening a new one
+    when the pool may still grow. Percentiles cover the last `window`
+    checkouts.
+    """
+
+    def __init__(self, window: int = 1000):
+        self.waits = deque(maxlen=window)  # Seconds
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0  # Gave up after DB_POOL_TIMEOUT_SECONDS
+        self.pool = None  # Current pool, set on checkout (dispose() replaces it)
+
+    def observe(self, seconds: float):
+        self.waits.append(seconds)
+        self.checkouts += 1
+        self.wait_seconds += seconds
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.waits:
+            return None
+        ordered = sorted(self.waits)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+    def stats(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        result = {
+            "checkouts_total": self.checkouts,
+            "checkout_wait_seconds_total": round(self.wait_seconds, 3),
+            "checkout_timeouts_total": self.timeouts,
+            "checkout_wait_p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+            "checkout_wait_p95_ms": round(p95 * 1000, 2) if p95 is not None else None,
+            "checkout_wait_max_ms": round(max(self.waits) * 1000, 2) if self.waits else None,
+        }
+        if self.pool is not None:
+            result.update(
+                pool_size=self.pool.size(),
+                checked_out=self.pool.checkedout(),
+                overflow=self.pool.overflow()
+            )
+        return result
+
+
+def _timed_pool_class(base, stats: PoolStats):
+    """Pool class recording checkout time into stats (survives engine.dispose(), which rebuilds the pool)"""
+
+    class TimedPool(base):
+        def connect(self):
+            stats.pool = self
+            started = time.perf_counter()
+            try:
+                connection = super().connect()
+            except PoolTimeoutError:
+                stats.timeouts += 1
+                raise
+            stats.observe(time.perf_counter() - started)
+            return connection
+
+    TimedPool.__name__ = f"Timed{base.__name__}"
+    return TimedPool
+
+
+def engine_options(database_url: str, stats: PoolStats, use_asyncio: bool = False) -> Dict[str, Any]:
+    """
+    create_engine()/create_async_engine() keyword arguments from the environment
+
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT_SECONDS,
+    DB_POOL_RECYCLE_SECONDS (-1 = never), DB_POOL_PRE_PING
+    """
+    url = make_url(database_url)
+    options: Dict[str, Any] = {"pool_pre_ping": _env_bool("DB_POOL_PRE_PING", "true")}
+
+    if url.get_backend_name() == "sqlite":
+        if not use_asyncio:
+            options["connect_args"] = {"check_same_thread": False}
+        if url.database in (None, "", ":memory:"):
+            return options  # In-memory: single shared connection, nothing to pool
+
+    options.update(
+        poolclass=_timed_pool_class(AsyncAdaptedQueuePool if use_asyncio else QueuePool, stats),
+        pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30")),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+    )
+    return options
+
+
+def configure_sqlite(engine, database_url: str):
+    """
+    Per-connection SQLite settings (pass AsyncEngine.sync_engine for async engines)
+
+    WAL lets readers continue while a write is in progress; synchronous=NORMAL
+    is durable in WAL mode except for the last commits on power loss;
+    busy_timeout makes a second writer wait instead of failing right away.
+    SQLITE_WAL=false keeps the rollback journal.
+    """
+    if make_url(database_url).get_backend_name() != "sqlite":
+        return
+    wal = _env_bool("SQLITE_WAL", "true")
+    busy_timeout_ms = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if wal:
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA busy_timeout={busy_timeout_ms}")
+        finally:
+            cursor.close()
+
+
+@contextmanager
+def _sqlite_migration_lock(engine):
+    """Exclusive flock on <database>.migrate.lock for the duration of the block (SQLite only)"""
+    database = engine.url.database
+    if engine.dialect.name != "sqlite" or fcntl is None or not database or database == ":memory:":
+        yield
+        return
+    with open(f"{database}.migrate.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def upgrade_database(engine, metadata=None):
+    """
+    Migrate the database to the latest Alembic revision (one transaction)
+
+    Databases created by create_all() have the tables but no alembic_version;
+    they are stamped at the baseline first, later revisions add what
+    create_all() never added to existing tables.
+
+    Workers starting together wait for each other: the first one migrates,
+    the rest find the database at head and have nothing left to do.
+    """
+    config = Config(ALEMBIC_INI)
+    config.attributes["target_metadata"] = metadata
+    with _sqlite_migration_lock(engine), engine.begin() as connection:
+        if engine.dialect.name == "postgresql":
+            # Released with the transaction, also when the upgrade fails
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        config.attributes["connection"] = connection
+        inspector = inspect(connection)
+        if not inspector.has_table("alembic_version") and inspector.has_table("users"):
+            logger.info(f"Existing schema without migration history, stamping revision {BASELINE_REVISION}")
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, "head")
@@ -0,0 +1,177 @@
+"""
+Duplicate Detection
+Dedup keys for uploaded documents and the lookup that flags likely duplicates
+
+Three keys, each stored in an indexed Document column so a lookup is a
+single index probe per upload:
+- file_sha256: byte-identical re-upload
+- dedup_key: the same invoice in another form (PDF vs. phone photo),
+  from normalized supplier ID, invoice number and total
+- perceptual_hash: the same image re-saved, resized or recompressed
+
+A match on the first two sets duplicate_of_id and leaves the document out
+of the tax totals. The 64-bit image hash also matches different receipts
+that look alike (same store, same layout), so on its own it only sets
+similar_to_id for the user to review. Dead-lettered documents are never an
+original - they count for nothing themselves.
+"""
+
+import re
+import hashlib
+import logging
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from PIL import Image, ImageOps
+from sqlalchemy import or_
+
+from services.image_preprocessing import IMAGE_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+# dHash grid: 8x8 gradient bits -> 64-bit hash
+_HASH_SIZE = 8
+
+# DocumentStatus.FAILED (dead-letter)
+DEAD_LETTER_STATUS = "failed"
+
+
+def perceptual_hash(file_path: str) -> Optional[str]:
+    """
+    64-bit difference hash of an image as 16 hex chars (blocking)
+
+    Compares neighbouring pixels of a 9x8 grayscale thumbnail, so it is
+    stable under resizing, JPEG recompression and EXIF-only changes.
+    Returns None for non-images.
+    """
+    if Path(file_path).suffix.lower() not in IMAGE_EXTENSIONS:
+        return None
+
+    with Image.open(file_path) as image:
+        image.draft("L", (_HASH_SIZE * 16, _HASH_SIZE * 16))  # JPEG: decode at reduced size
+        small = ImageOps.exif_transpose(image).convert("L").resize((_HASH_SIZE + 1, _HASH_SIZE), Image.BOX)
+
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(_HASH_SIZE):
+        offset = row * (_HASH_SIZE + 1)
+        for col in range(_HASH_SIZE):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{bits:016x}"
+
+
+def _field(extracted_data: Dict[str, Any], *names: str):
+    """First non-empty field; Tesseract results keep their fields one level down"""
+    nested = extracted_data.get("extracted_data")
+    for source in (extracted_data, nested if isinstance(nested, dict) else {}):
+        for name in names:
+            if source.get(name) not in (None, ""):
+                return source[name]
+    return None
+
+
+def dedup_key(extracted_data: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    SHA-256 of "supplier|number|total" with each part normalized, or None
+    when any part is missing
+
+    Supplier is the IČO (digits only), else the VAT ID, else the supplier
+    name folded to lowercase alphanumerics. Number is the invoice number
+    (or eKasa receipt ID) without spaces/punctuation; total has 2 decimals.
+    """
+    if not extracted_data:
+        return None
+
+    supplier = None
+    ico = _field(extracted_data, "supplier_ico", "ico")
+    if ico:
+        supplier = re.sub(r"\D", "", str(ico))
+    if not supplier:
+        vat_id = _field(extracted_data, "supplier_vat_id", "ic_dph", "dic")
+        name = _field(extracted_data, "supplier_name", "merchant_name")
+        supplier = re.sub(r"\W", "", str(vat_id or name or "")).lower()
+
+    number = _field(extracted_data, "invoice_number", "receipt_id")
+    number = re.sub(r"[\W_]", "", str(number or "")).upper()
+
+    try:
+        total = Decimal(str(_field(extracted_data, "total_amount"))).quantize(Decimal("0.01"))
+    except (InvalidOperation, ValueError):
+        total = None
+
+    if not supplier or not number or total is None:
+        return None
+    return hashlib.sha256(f"{supplier}|{number}|{total}".encode("utf-8")).hexdigest()
+
+
+def _find_original(db, Document, user_id: int, document_id: int, conditions, earlier_only: bool) -> Optional[int]:
+    if not conditions:
+        return None
+    query = db.query(Document.id).filter(
+        Document.user_id == user_id,
+        Document.id < document_id if earlier_only else Document.id != document_id,
+        Document.duplicate_of_id.is_(None),
+        or_(Document.status.is_(None), Document.status != DEAD_LETTER_STATUS),
+        or_(*conditions)
+    )
+    row = query.order_by(Document.id.asc()).first()
+    return row.id if row else None
+
+
+def find_duplicate(
+    db,
+    document_model,
+    user_id: int,
+    document_id: int,
+    file_sha256: str = None,
+    dedup_key: str = None,
+    earlier_only: bool = False
+) -> Optional[int]:
+    """
+    Id of the user's original document with the same file or field key, or None
+
+    Only documents that are neither duplicates themselves nor dead-lettered
+    are candidates, so every duplicate points at a copy that counts.
+    earlier_only restricts the match to documents uploaded before this one
+    (used at upload time, when every earlier document already has its
+    digest). One indexed query.
+    """
+    Document = document_model
+    conditions = []
+    if file_sha256:
+        conditions.append(Document.file_sha256 == file_sha256)
+    if dedup_key:
+        conditions.append(Document.dedup_key == dedup_key)
+    return _find_original(db, Document, user_id, document_id, conditions, earlier_only)
+
+
+def find_similar(db, document_model, user_id: int, document_id: int, perceptual_hash: str = None) -> Optional[int]:
+    """Id of the user's original document with the same image hash, or None (a flag, not an exclusion)"""
+    Document = document_model
+    conditions = [Document.perceptual_hash == perceptual_hash] if perceptual_hash else []
+    return _find_original(db, Document, user_id, document_id, conditions, earlier_only=False)
+
+
+def first_live_copy(db, document_model, original_id: int):
+    """The earliest duplicate of a document that is not dead-lettered, or None"""
+    Document = document_model
+    return db.query(Document).filter(
+        Document.duplicate_of_id == original_id,
+        or_(Document.status.is_(None), Document.status != DEAD_LETTER_STATUS)
+    ).order_by(Document.id.asc()).first()
+
+
+def replace_original(db, document_model, original_id: int, copy=None):
+    """
+    Stop using a dead-lettered document as an original
+
+    copy (from first_live_copy) becomes the original and the other
+    duplicates point to it; without one they are cleared. similar_to_id
+    flags pointing at the document are dropped.
+    """
+    Document = document_model
+    for duplicate in db.query(Document).filter(Document.duplicate_of_id == original_id):
+        duplicate.duplicate_of_id = None if copy is None or duplicate.id == copy.id else copy.id
+    for similar in db.query(Document).filter(Document.similar_to_id == original_id):
+        similar.similar_to_id = None
@@ -0,0 +1,221 @@
+"""
+Document Processing Pipeline
+Runs classification + OCR for uploaded documents with bounded concurrency
+"""
+
+import os
+import time
+import asyncio
+import logging
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from services.ocr_service import OCRService, classify_document
+from services.image_preprocessing import ImagePreprocessor, IMAGE_EXTENSIONS
+from services.dedup import perceptual_hash
+from services.einvoice import EINVOICE_EXTENSIONS, parse_einvoice
+from services.ekasa import EKasaService
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentPipeline:
+    """
+    Processes batches of stored documents concurrently
+
+    Two limits apply:
+    - max_per_request: documents of one upload batch processed in parallel
+    - max_per_process: documents processed in parallel across all requests
+      handled by this worker process
+
+    Results are always returned in the same order as the input files.
+    """
+
+    def __init__(
+        self,
+        ocr_service: OCRService,
+        max_per_request: int = None,
+        max_per_process: int = None,
+        preprocessor: ImagePreprocessor = None,
+        ekasa: EKasaService = None
+    ):
+        self.ocr_service = ocr_service
+        # eKasa QR stage: receipts with a QR code are fetched instead of OCRed
+        self.ekasa = ekasa
+        # Downscale/grayscale/deskew stage before Tesseract and provider upload
+        self.preprocessor = preprocessor
+        self.max_per_request = max_per_request or int(os.getenv("UPLOAD_MAX_PARALLEL_PER_REQUEST", "4"))
+        self.max_per_process = max_per_process or int(os.getenv("UPLOAD_MAX_PARALLEL_PER_PROCESS", "8"))
+        # Created on first use: the pipeline is built at import, before uvicorn's loop
+        # exists, and on Python < 3.10 a semaphore binds to the loop current at creation
+        self._process_semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0  # Documents currently holding a process slot
+        # Moving average of seconds per document, used to estimate queue wait
+        self.avg_seconds = None
+        self.einvoices = 0  # XML e-invoices read without OCR
+
+    def _process_slots(self) -> asyncio.Semaphore:
+        if self._process_semaphore is None:
+            self._process_semaphore = asyncio.Semaphore(self.max_per_process)
+        return self._process_semaphore
+
+    async def process_file(self, file_path: str, file_sha256: str = None) -> Dict[str, Any]:
+        """
+        Classify and OCR a single stored document
+
+        file_sha256 is the digest computed while the upload was streamed to
+        disk, so later stages never need to re-read the file to hash it.
+
+        Tesseract runs once per page; the same OCRResult feeds classification
+        and (for the Tesseract provider) confidence scoring + field extraction.
+        A re-upload of an identical file is served from the OCR cache without
+        running Tesseract or calling the provider.
+
+        Images are normalized first (see ImagePreprocessor); the normalized
+        copy is what Tesseract reads and what is uploaded to the provider.
+
+        XML e-invoices are parsed directly (see process_einvoice). Images
+        with an eKasa QR code are resolved through the receipt registry;
+        OCR only runs when no code is found or the lookup fails.
+
+        Images also get a perceptual hash for duplicate detection (see
+        services/dedup.py).
+
+        OCR failures propagate so the caller can decide whether to retry.
+        """
+        result = await self._process_file(file_path, file_sha256)
+        result["perceptual_hash"] = await self._perceptual_hash(file_path)
+        return result
+
+    async def _process_file(self, file_path: str, file_sha256: str = None) -> Dict[str, Any]:
+        einvoice = await self.process_einvoice(file_path, file_sha256)
+        if einvoice is not None:
+            return einvoice
+
+        if self.ekasa is not None:
+            receipt = await self.ekasa.process(file_path, file_sha256)
+            if receipt is not None:
+                return {
+                    "document_type": "receipt",
+                    "extracted_data": receipt,
+                    "confidence": 100,
+                    "file_sha256": file_sha256
+                }
+
+        doc_type = await self.ocr_service.get_cached_classification(file_sha256)
+        extracted_data = None
+        if doc_type is not None:
+            extracted_data = await self.ocr_service.get_cached_result(file_sha256, doc_type)
+
+        if extracted_data is None:
+            extracted_data, doc_type = await self._run_ocr(file_path, file_sha256, doc_type)
+
+        confidence = int(extracted_data.get('confidence', 0) * 100)
+
+        return {
+            "document_type": doc_type,
+            "extracted_data": extracted_data,
+            "confidence": confidence,
+            "file_sha256": file_sha256
+        }
+
+    async def process_einvoice(self, file_path: str, file_sha256: str = None) -> Optional[Dict[str, Any]]:
+        """
+        Read an ISDOC/UBL/Peppol XML invoice without classification or OCR
+
+        Returns None for files that are not .xml/.isdoc, so callers can fall
+        through to OCR. Raises EInvoiceError for XML that is not a readable
+        e-invoice - OCR would not do better on it.
+        """
+        if Path(file_path).suffix.lower() not in EINVOICE_EXTENSIONS:
+            return None
+
+        extracted_data = await asyncio.to_thread(parse_einvoice, file_path)
+        self.einvoices += 1
+        return {
+            "document_type": extracted_data["document_type"],
+            "extracted_data": extracted_data,
+            "confidence": 100,
+            "file_sha256": file_sha256
+        }
+
+    async def _perceptual_hash(self, file_path: str) -> Optional[str]:
+        if Path(file_path).suffix.lower() not in IMAGE_EXTENSIONS:
+            return None
+        try:
+            return await asyncio.to_thread(perceptual_hash, file_path)
+        except Exception as e:
+            logger.warning(f"Perceptual hash failed for {file_path}: {e}")
+            return None
+
+    async def _run_ocr(self, file_path: str, file_sha256: str, doc_type: str = None):
+        """Preprocess, classify (unless already known) and OCR one document"""
+        prepared = {"path": file_path, "temporary": False}
+        if self.preprocessor is not None:
+            prepared = await self.preprocessor.prepare(file_path)
+
+        try:
+            ocr_path = prepared["path"]
+            ocr_result = None
+
+            # A known type means its cached result was already looked up (and missed)
+            check_cache = doc_type is None
+            if doc_type is None:
+                try:
+                    ocr_result = await self.ocr_service.run_ocr(ocr_path, file_sha256)
+                except Exception as e:
+                    logger.warning(f"Local OCR failed for {file_path}: {e}")
+
+                doc_type = await classify_document(ocr_path, ocr_result)
+                await self.ocr_service.cache_classification(file_sha256, doc_type)
+
+            extracted_data = await self.ocr_service.process_document(
+                ocr_path, doc_type, ocr_result, file_sha256=file_sha256, check_cache=check_cache
+            )
+        finally:
+            if self.preprocessor is not None:
+                self.preprocessor.cleanup(prepared)
+
+        return extracted_data, doc_type
+
+    async def process_batch(self, stored_files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Process several stored documents concurrently
+
+        Args:
+            stored_files: Dicts from stream_upload_to_disk ("path", "sha256", "size")
+
+        Returns one result per input file, in input order. A file that fails
+        gets {"error": "..."} instead of aborting the batch.
+        """
+        request_semaphore = asyncio.Semaphore(self.max_per_request)
+
+        async def run(stored: Dict[str, Any]) -> Dict[str, Any]:
+            async with request_semaphore:
+                async with self._process_slots():
+                    self.in_flight += 1
+                    started = time.monotonic()
+                    try:
+                        return await self.process_file(stored["path"], stored.get("sha256"))
+                    except Exception as e:
+                        logger.error(f"Document processing failed for {stored['path']}: {e}")
+                        return {"error": str(e)}
+                    finally:
+                        self.in_flight -= 1
+                        self._record_duration(time.monotonic() - started)
+
+        return await asyncio.gather(*(run(stored) for stored in stored_files))
+
+    def _record_duration(self, seconds: float):
+        if self.avg_seconds is None:
+            self.avg_seconds = seconds
+        else:
+            self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * seconds
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_per_process,
+            "avg_seconds_per_document": round(self.avg_seconds, 3) if self.avg_seconds is not None else None,
+            "einvoices_total": self.einvoices
+        }
@@ -0,0 +1,489 @@
+"""
+Document Processing Queue
+Background worker pool that classifies and OCRs uploaded documents
+"""
+
+import os
+import math
+import uuid
+import socket
+import asyncio
+import logging
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Callable
+
+from sqlalchemy import or_, update
+
+from services.document_pipeline import DocumentPipeline
+from services.ocr_output import split_raw_output, pack_raw_output
+from services.dedup import dedup_key, find_duplicate, find_similar, first_live_copy, replace_original
+from services import tax_totals
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentStatus:
+    """Processing states stored in Document.status"""
+    PROCESSING = "processing"  # Stored, waiting for or running OCR
+    PROCESSED = "processed"    # OCR finished, extracted_data is final
+    FAILED = "failed"          # Dead-letter: gave up after max attempts
+
+
+class QueueFullError(Exception):
+    """
+    Raised when a batch cannot be admitted
+
+    scope: "user"   - the user's documents in flight plus backlog are at the limit (429)
+           "global" - the queue is full (503)
+           "batch"  - the batch alone exceeds the per-user limit including backlog (never fits)
+    retry_after: estimated seconds until the batch would fit (None for "batch")
+    """
+
+    def __init__(self, scope: str, retry_after: int = None, limit: int = None):
+        self.scope = scope
+        self.retry_after = retry_after
+        self.limit = limit
+        messages = {
+            "user": f"Too many documents waiting for processing (max {limit} per user)",
+            "global": "Document processing is at capacity",
+            "batch": f"Too many files in one upload (max {limit})",
+        }
+        super().__init__(messages[scope])
+
+
+class DocumentQueue:
+    """
+    Runs classification + OCR outside of the HTTP request
+
+    - Upload creates Document rows with status "processing" and enqueues them
+    - Work runs through DocumentPipeline, so its per-request and per-process
+      concurrency limits apply to the background pool as well
+    - Failed documents are retried with exponential backoff; after
+      max_attempts they are moved to the "failed" (dead-letter) state
+    - Every "processing" document is leased to one worker process
+      (claimed_by/claimed_at); the owner renews its leases every
+      lease_seconds / 3. On startup and at each renewal a worker claims the
+      documents whose lease expired (or that were released on shutdown)
+      with a single conditional UPDATE and re-queues them through the
+      per-user backlog, so a restart loses nothing and several uvicorn
+      workers never OCR the same document twice
+    - Raw OCR output (text, word boxes) is stored compressed in
+      ocr_output_model; extracted_data keeps only the normalized fields
+    - Stored results are checked against the user's other documents:
+      the supplier/number/total key sets duplicate_of_id (left out of the
+      tax totals), an equal image hash alone only similar_to_id; documents
+      the user marked as not a duplicate are skipped
+    - A dead-lettered original hands over to its first live duplicate
+    - Every stored result or dead-letter updates the user's tax year totals
+      (totals_model) in the same transaction
+
+    Admission control (admit() before storing an upload):
+    - at most max_per_user documents per user waiting or running; the rest
+      of a larger batch waits in the user's backlog (rows already stored)
+      and starts as the user's documents finish
+    - at most max_backlog_per_user more documents per user in that backlog
+    - at most max_depth documents waiting for a process slot, on top of the
+      pipeline's max_per_process running ones
+    - a rejected batch gets a Retry-After estimate: documents ahead of it
+      divided by the measured drain rate
+    """
+
+    # Seconds per document assumed until the pipeline has measured one
+    DEFAULT_SECONDS_PER_DOCUMENT = 5.0
+    MAX_RETRY_AFTER = 300
+
+    def __init__(
+        self,
+        pipeline: DocumentPipeline,
+        session_factory: Callable,
+        document_model,
+        ocr_output_model=None,
+        totals_model=None,
+        max_attempts: int = None,
+        retry_backoff: float = None,
+        retry_backoff_max: float = None,
+        max_depth: int = None,
+        max_per_user: int = None,
+        max_backlog_per_user: int = None,
+        lease_seconds: float = None
+    ):
+        self.pipeline = pipeline
+        self.session_factory = session_factory
+        self.document_model = document_model
+        # Raw OCR text/word boxes go to this table instead of extracted_data
+        self.ocr_output_model = ocr_output_model
+        # Per-user tax year sums kept in step with each document (services/tax_totals.py)
+        self.totals_model = totals_model
+        self.max_attempts = max_attempts or int(os.getenv("OCR_QUEUE_MAX_ATTEMPTS", "3"))
+        self.retry_backoff = retry_backoff or float(os.getenv("OCR_QUEUE_RETRY_BACKOFF_SECONDS", "2"))
+        self.retry_backoff_max = retry_backoff_max or float(os.getenv("OCR_QUEUE_RETRY_BACKOFF_MAX_SECONDS", "60"))
+        self.max_depth = max_depth or int(os.getenv("OCR_QUEUE_MAX_DEPTH", "100"))
+        self.max_per_user = max_per_user or int(os.getenv("OCR_QUEUE_MAX_PER_USER", "20"))
+        self.max_backlog_per_user = max_backlog_per_user or int(os.getenv("OCR_QUEUE_MAX_BACKLOG_PER_USER", "200"))
+        # Owner of this process's leases; unique across hosts, pids and restarts
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds or float(os.getenv("OCR_QUEUE_LEASE_SECONDS", "300"))
+        self._tasks = set()
+        self.pending = 0  # Documents started: waiting for a slot, running or waiting for a retry
+        self.pending_by_user: Dict[Any, int] = defaultdict(int)
+        # Admitted beyond max_per_user: reserved by admit(), then jobs in the user's backlog
+        self.reserved_by_user: Dict[Any, int] = defaultdict(int)
+        self.backlog: Dict[Any, deque] = defaultdict(deque)
+        self.rejected = {"user": 0, "global": 0, "batch": 0}
+        self.duplicates = 0  # Documents flagged as likely duplicates after OCR
+        self.similar = 0  # Documents flagged for an equal image hash only
+        self.recovered = 0  # Documents claimed from an expired or released lease
+
+    async def start(self):
+        """Claim and re-queue documents left unfinished by a stopped or crashed worker"""
+        await self._recover()
+        self._spawn(self._keep_leases())
+
+    async def stop(self):
+        """
+        Cancel in-flight work and release its leases
+        Cancelled documents keep status "processing"; the next worker to start
+        (or another running one at its next renewal) claims and re-queues them
+        """
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        try:
+            await asyncio.to_thread(self._release_leases)
+        except Exception as e:
+            logger.error(f"Could not release document leases: {e}")
+
+    def lease(self) -> Dict[str, Any]:
+        """claimed_by/claimed_at values for a document this process will process"""
+        return {"claimed_by": self.worker_id, "claimed_at": datetime.utcnow()}
+
+    async def _keep_leases(self):
+        interval = self.lease_seconds / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self._renew_leases)
+                await self._recover()
+            except Exception as e:
+                logger.error(f"Document lease renewal failed: {e}")
+
+    async def _recover(self):
+        rows = await asyncio.to_thread(self._claim_orphans)
+        if rows:
+            self.recovered += len(rows)
+            logger.info(f"Re-queuing {len(rows)} unfinished documents")
+            self.enqueue([
+                {"document_id": row.id, "user_id": row.user_id, "path": row.file_path, "sha256": row.file_sha256}
+                for row in rows
+            ])
+
+    def _claim_orphans(self):
+        """
+        Take over "processing" documents without a live lease
+
+        One UPDATE ... RETURNING: when workers start together, each row's
+        condition is re-checked under the row lock, so exactly one claims it.
+        """
+        Document = self.document_model
+        table = Document.__table__
+        now = datetime.utcnow()
+        expired = now - timedelta(seconds=self.lease_seconds)
+        statement = update(table).where(
+            table.c.status == DocumentStatus.PROCESSING,
+            or_(table.c.claimed_at.is_(None), table.c.claimed_at < expired)
+        ).values(claimed_by=self.worker_id, claimed_at=now).returning(
+            table.c.id, table.c.user_id, table.c.file_path, table.c.file_sha256
+        )
+        db = self.session_factory()
+        try:
+            rows = db.execute(statement).all()
+            db.commit()
+        finally:
+            db.close()
+        return sorted(rows, key=lambda row: row.id)
+
+    def _renew_leases(self):
+        table = self.document_model.__table__
+        db = self.session_factory()
+        try:
+            db.execute(update(table).where(
+                table.c.claimed_by == self.worker_id,
+                table.c.status == DocumentStatus.PROCESSING
+            ).values(claimed_at=datetime.utcnow()))
+            db.commit()
+        finally:
+            db.close()
+
+    def _release_leases(self):
+        table = self.document_model.__table__
+        db = self.session_factory()
+        try:
+            db.execute(update(table).where(
+                table.c.claimed_by == self.worker_id,
+                table.c.status == DocumentStatus.PROCESSING
+            ).values(claimed_by=None, claimed_at=None))
+            db.commit()
+        finally:
+            db.close()
+
+    @property
+    def capacity(self) -> int:
+        """Documents that can be admitted at once: running slots + bounded queue"""
+        return self.pipeline.max_per_process + self.max_depth
+
+    @property
+    def depth(self) -> int:
+        """Admitted documents waiting for a process slot"""
+        return max(0, self.pending - self.pipeline.in_flight)
+
+    def queued_for(self, user_id: Any) -> int:
+        """The user's documents started, reserved or in the backlog"""
+        return (
+            self.pending_by_user.get(user_id, 0)
+            + self.reserved_by_user.get(user_id, 0)
+            + len(self.backlog.get(user_id, ()))
+        )
+
+    def admit(self, user_id: Any, count: int):
+        """
+        Reserve room for an upload batch of count documents
+
+        Call before storing the files; give back slots that are not used
+        with release(). enqueue(..., admitted=True) then takes them over and
+        starts as many as the user's max_per_user allows.
+
+        Raises:
+            QueueFullError: if the user or the whole queue is at its limit
+        """
+        user_limit = self.max_per_user + self.max_backlog_per_user
+        if count > user_limit:
+            self.rejected["batch"] += 1
+            raise QueueFullError("batch", limit=user_limit)
+
+        user_excess = self.queued_for(user_id) + count - user_limit
+        if user_excess > 0:
+            self.rejected["user"] += 1
+            # A user's documents drain at most max_per_request at a time
+            raise QueueFullError("user", self._retry_after(user_excess, self.pipeline.max_per_request), user_limit)
+
+        # Only the part that starts right away competes for the shared queue
+        starting = min(count, max(0, self.max_per_user - self.queued_for(user_id)))
+        global_excess = self.pending + starting - self.capacity
+        if global_excess > 0:
+            self.rejected["global"] += 1
+            raise QueueFullError("global", self._retry_after(global_excess, self.pipeline.max_per_process))
+
+        self._reserve(user_id, count)
+
+    def release(self, user_id: Any, count: int):
+        """Give back admitted slots that were not enqueued (e.g. rejected files)"""
+        if count:
+            self._reserve(user_id, -count)
+
+    def _reserve(self, user_id: Any, count: int):
+        self.reserved_by_user[user_id] += count
+        if self.reserved_by_user[user_id] <= 0:
+            del self.reserved_by_user[user_id]
+
+    def _retry_after(self, excess: int, parallel: int) -> int:
+        """Seconds until `excess` admitted documents have finished"""
+        per_document = self.pipeline.avg_seconds or self.DEFAULT_SECONDS_PER_DOCUMENT
+        seconds = math.ceil(excess / max(parallel, 1)) * per_document
+        return max(1, min(self.MAX_RETRY_AFTER, math.ceil(seconds)))
+
+    def _add_pending(self, user_id: Any, count: int):
+        self.pending += count
+        self.pending_by_user[user_id] += count
+        if self.pending_by_user[user_id] <= 0:
+            del self.pending_by_user[user_id]
+
+    def _finish(self, job: Dict[str, Any]):
+        self._add_pending(job.get("user_id"), -1)
+        self._start_backlog(job.get("user_id"))
+
+    def enqueue(self, jobs: List[Dict[str, Any]], admitted: bool = False):
+        """
+        Schedule documents for processing
+
+        Jobs go to their user's backlog; up to max_per_user per user start
+        right away as one batch, the rest when earlier ones finish.
+
+        Args:
+            jobs: Dicts with "document_id", "user_id", "path" and "sha256" - one upload batch
+            admitted: True when the slots were already reserved with admit()
+        """
+        users = []
+        for job in jobs:
+            user_id = job.get("user_id")
+            if admitted:
+                self._reserve(user_id, -1)
+            self.backlog[user_id].append(job)
+            if user_id not in users:
+                users.append(user_id)
+        for user_id in users:
+            self._start_backlog(user_id)
+
+    def _start_backlog(self, user_id: Any):
+        """Start the user's backlogged documents that fit under max_per_user"""
+        waiting = self.backlog.get(user_id)
+        if not waiting:
+            self.backlog.pop(user_id, None)
+            return
+        free = self.max_per_user - self.pending_by_user.get(user_id, 0)
+        batch = [waiting.popleft() for _ in range(min(free, len(waiting)))]
+        if not waiting:
+            del self.backlog[user_id]
+        if batch:
+            self._add_pending(user_id, len(batch))
+            self._spawn(self._run_batch(batch))
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue state for health/metrics endpoints"""
+        return {
+            "pending": self.pending,
+            "depth": self.depth,
+            "in_flight": self.pipeline.in_flight,
+            "capacity": self.capacity,
+            "max_depth": self.max_depth,
+            "max_per_user": self.max_per_user,
+            "users_with_pending": len(self.pending_by_user),
+            "backlog": sum(len(jobs) for jobs in self.backlog.values()),
+            "max_backlog_per_user": self.max_backlog_per_user,
+            "rejected_user_total": self.rejected["user"],
+            "rejected_global_total": self.rejected["global"],
+            "rejected_batch_total": self.rejected["batch"],
+            "einvoices_total": self.pipeline.einvoices,
+            "duplicates_total": self.duplicates,
+            "similar_images_total": self.similar,
+            "recovered_total": self.recovered,
+            "max_attempts": self.max_attempts
+        }
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, jobs: List[Dict[str, Any]]):
+        results = await self.pipeline.process_batch(jobs)
+
+        # Writes (with duplicate lookups and tax upserts) run in a thread: a write
+        # waiting on a locked database must not stall the event loop
+        for job, result in zip(jobs, results):
+            if "error" in result:
+                await self._handle_failure(job, result["error"])
+                continue
+            try:
+                flag = await asyncio.to_thread(self._store_result, job["document_id"], result)
+                self.duplicates += flag == "duplicate"
+                self.similar += flag == "similar"
+            except Exception as e:
+                # Row stays in "processing" and is picked up again on restart
+                logger.error(f"Failed to store OCR result for document {job['document_id']}: {e}")
+            self._finish(job)
+
+    async def _retry(self, job: Dict[str, Any], delay: float):
+        await asyncio.sleep(delay)
+        await self._run_batch([job])
+
+    async def _handle_failure(self, job: Dict[str, Any], error: str):
+        try:
+            attempts = await asyncio.to_thread(self._record_failure, job["document_id"], error)
+        except Exception as e:
+            # Not recorded: the row stays in "processing" and is picked up again on restart
+            logger.error(f"Failed to record OCR failure for document {job['document_id']}: {e}")
+            attempts = None
+
+        if attempts is None or attempts >= self.max_attempts:
+            # Dead-lettered (or document deleted meanwhile)
+            self._finish(job)
+            return
+
+        delay = min(self.retry_backoff * (2 ** (attempts - 1)), self.retry_backoff_max)
+        logger.info(f"Retrying document {job['document_id']} in {delay:.1f}s (attempt {attempts + 1}/{self.max_attempts})")
+        self._spawn(self._retry(job, delay))
+
+    def _store_result(self, document_id: int, result: Dict[str, Any]):
+        """Store an OCR result (blocking); returns "duplicate", "similar" or None"""
+        Document = self.document_model
+        flag = None
+        db = self.session_factory()
+        try:
+            document = db.query(Document).filter(Document.id == document_id).first()
+            if not document:
+                return None
+            counted_before = tax_totals.document_contribution(document)
+            extracted_data = result["extracted_data"]
+            if self.ocr_output_model is not None:
+                extracted_data, raw_output = split_raw_output(extracted_data)
+                if raw_output:
+                    db.merge(self.ocr_output_model(document_id=document.id, **pack_raw_output(raw_output)))
+            document.document_type = result["document_type"]
+            document.extracted_data = extracted_data
+            document.confidence = result["confidence"]
+            document.status = DocumentStatus.PROCESSED
+            document.last_error = None
+            document.processed_at = datetime.utcnow()
+
+            # Likely duplicates are flagged here, before tax aggregation sees them
+            document.perceptual_hash = result.get("perceptual_hash")
+            document.dedup_key = dedup_key(extracted_data)
+            if document.duplicate_of_id is None and not document.duplicate_dismissed:
+                document.duplicate_of_id = find_duplicate(
+                    db, Document, document.user_id, document.id,
+                    dedup_key=document.dedup_key
+                )
+                if document.duplicate_of_id is not None:
+                    flag = "duplicate"
+                    document.similar_to_id = None
+                    logger.info(f"Document {document.id} looks like a duplicate of {document.duplicate_of_id}")
+                else:
+                    document.similar_to_id = find_similar(
+                        db, Document, document.user_id, document.id,
+                        perceptual_hash=document.perceptual_hash
+                    )
+                    flag = "similar" if document.similar_to_id is not None else None
+            self._track_totals(db, document, counted_before)
+            db.commit()
+            return flag
+        finally:
+            db.close()
+
+    def _track_totals(self, db, document, counted_before):
+        if self.totals_model is not None:
+            tax_totals.track(db, self.totals_model.__table__, document, counted_before)
+
+    def _replace_original(self, db, document):
+        """Duplicates of a dead-lettered document must not lose their income with it"""
+        Document = self.document_model
+        copy = first_live_copy(db, Document, document.id)
+        copy_before = tax_totals.document_contribution(copy) if copy is not None else None
+        replace_original(db, Document, document.id, copy)
+        if copy is not None:
+            logger.info(f"Document {copy.id} replaces dead-lettered original {document.id}")
+            self._track_totals(db, copy, copy_before)
+
+    def _record_failure(self, document_id: int, error: str):
+        """Increment attempt counter (blocking); returns attempts so far or None if the document is gone"""
+        Document = self.document_model
+        db = self.session_factory()
+        try:
+            document = db.query(Document).filter(Document.id == document_id).first()
+            if not document:
+                return None
+            counted_before = tax_totals.document_contribution(document)
+            document.attempts = (document.attempts or 0) + 1
+            document.last_error = error
+            if document.attempts >= self.max_attempts:
+                logger.error(f"Document {document_id} moved to dead-letter after {document.attempts} attempts: {error}")
+                document.status = DocumentStatus.FAILED
+                document.extracted_data = {}
+                document.confidence = 0
+                document.processed_at = datetime.utcnow()
+                self._track_totals(db, document, counted_before)
+                self._replace_original(db, document)
+            db.commit()
+            return document.attempts
+        finally:
+            db.close()
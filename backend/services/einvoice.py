@@ -0,0 +1,341 @@
+"""
+E-Invoice Service
+Reads structured XML invoices (ISDOC, UBL 2.1, Peppol BIS) without OCR
+"""
+
+import logging
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+# defusedxml refuses entity expansion and external references; the stdlib
+# parser is used when it is not installed (DOCTYPEs are rejected up front)
+try:
+    from defusedxml.ElementTree import iterparse, ParseError
+    DEFUSEDXML_AVAILABLE = True
+except ImportError:
+    from xml.etree.ElementTree import iterparse, ParseError
+    DEFUSEDXML_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+EINVOICE_EXTENSIONS = {'.xml', '.isdoc'}
+
+ISDOC_NAMESPACE = "http://isdoc.cz/namespace/2013"
+UBL_NAMESPACES = {
+    "urn:oasis:names:specification:ubl:schema:xsd:Invoice-2": "invoice",
+    "urn:oasis:names:specification:ubl:schema:xsd:CreditNote-2": "credit_note",
+}
+
+# ISDOC DocumentType -> invoice_type (2 dobropis, 3 vrubopis, 6 dobropis k daňovému zálohovému listu)
+ISDOC_DOCUMENT_TYPES = {"2": "credit_note", "3": "debit_note", "6": "credit_note"}
+# UBL InvoiceTypeCode (UNTDID 1001) that turn an Invoice into a credit note
+UBL_CREDIT_NOTE_CODES = {"381", "396", "532"}
+
+# Bytes read to look for a DOCTYPE before parsing
+_HEAD_BYTES = 4096
+# Root children inspected for a Peppol CustomizationID before giving up
+_SNIFF_CHILDREN = 8
+
+
+class EInvoiceError(ValueError):
+    """File has an e-invoice extension but is not a readable ISDOC/UBL invoice"""
+
+
+# Paths are tuples of local element names below the root element.
+# ISDOC and UBL share most of their names (ISDOC is derived from UBL).
+_HEADER_FIELDS = {
+    ("ID",): "invoice_number",
+    ("DocumentType",): "isdoc_document_type",
+    ("InvoiceTypeCode",): "invoice_type_code",
+    ("IssueDate",): "invoice_date",
+    ("DueDate",): "due_date",
+    ("PaymentMeans", "PaymentDueDate"): "due_date",
+    ("PaymentMeans", "Payment", "Details", "PaymentDueDate"): "due_date",
+    ("DocumentCurrencyCode",): "currency",
+    ("LocalCurrencyCode",): "currency",
+    ("CustomizationID",): "customization_id",
+    ("TaxTotal", "TaxAmount"): "total_tax",
+    ("LegalMonetaryTotal", "TaxExclusiveAmount"): "total_net",
+    ("LegalMonetaryTotal", "TaxInclusiveAmount"): "total_amount",
+    ("LegalMonetaryTotal", "PayableAmount"): "amount_due",
+}
+
+_PARTY_FIELDS = {
+    ("PartyName", "Name"): "name",
+    ("PartyLegalEntity", "RegistrationName"): "registration_name",
+    ("PartyIdentification", "ID"): "ico",
+    ("PartyLegalEntity", "CompanyID"): "legal_id",
+    ("PartyTaxScheme", "CompanyID"): "tax_id",
+    ("PostalAddress", "StreetName"): "street",
+    ("PostalAddress", "BuildingNumber"): "building",
+    ("PostalAddress", "PostalZone"): "postal_zone",
+    ("PostalAddress", "CityName"): "city",
+    ("PostalAddress", "Country", "IdentificationCode"): "country",
+}
+_PARTIES = {
+    ("AccountingSupplierParty", "Party"): "supplier",
+    ("AccountingCustomerParty", "Party"): "customer",
+}
+
+_LINE_PATHS = {("InvoiceLine",), ("CreditNoteLine",), ("InvoiceLines", "InvoiceLine")}
+_LINE_FIELDS = {
+    ("Item", "Name"): "name",
+    ("Item", "Description"): "description",
+    ("InvoicedQuantity",): "quantity",
+    ("CreditedQuantity",): "quantity",
+    ("Price", "PriceAmount"): "unit_price",
+    ("UnitPrice",): "unit_price",
+    ("LineExtensionAmount",): "total_amount",
+    ("ClassifiedTaxCategory", "Percent"): "tax_rate",
+    ("Item", "ClassifiedTaxCategory", "Percent"): "tax_rate",
+}
+
+_SUBTOTAL_PATHS = {("TaxTotal", "TaxSubtotal"), ("TaxTotal", "TaxSubTotal")}
+_SUBTOTAL_FIELDS = {
+    ("TaxableAmount",): "base",
+    ("TaxAmount",): "vat",
+    ("TaxCategory", "Percent"): "rate",
+}
+
+
+def _split_tag(tag: str) -> Tuple[str, str]:
+    """'{namespace}Name' -> (namespace, 'Name')"""
+    if tag.startswith("{"):
+        namespace, _, name = tag[1:].partition("}")
+        return namespace, name
+    return "", tag
+
+
+def _check_head(file_path: str):
+    with open(file_path, "rb") as f:
+        head = f.read(_HEAD_BYTES)
+    if b"<!DOCTYPE" in head.upper():
+        raise EInvoiceError("XML with a DOCTYPE is not accepted")
+
+
+def detect_format(file_path: str) -> Optional[str]:
+    """
+    "isdoc", "ubl" or "peppol" for an e-invoice, None for any other file
+
+    Only the first few elements are parsed: the root namespace tells ISDOC
+    from UBL, and a UBL document is Peppol BIS when its CustomizationID
+    (always near the top) names a Peppol specification.
+    """
+    if Path(file_path).suffix.lower() not in EINVOICE_EXTENSIONS:
+        return None
+    _check_head(file_path)
+
+    depth = 0
+    children = 0
+    detected = None
+    try:
+        for event, elem in iterparse(file_path, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if depth == 1:
+                    namespace, _ = _split_tag(elem.tag)
+                    if namespace == ISDOC_NAMESPACE:
+                        return "isdoc"
+                    if namespace not in UBL_NAMESPACES:
+                        return None
+                    detected = "ubl"
+                continue
+
+            depth -= 1
+            if depth == 1:
+                if _split_tag(elem.tag)[1] == "CustomizationID":
+                    return "peppol" if "peppol" in (elem.text or "").lower() else "ubl"
+                children += 1
+                if children >= _SNIFF_CHILDREN:
+                    break
+            elem.clear()
+    except ParseError:
+        return None
+    return detected
+
+
+def _amount(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(Decimal(value.strip()))
+    except InvalidOperation:
+        return None
+
+
+def _rate_key(value: Optional[str]) -> str:
+    """'20.00' -> '20', same keys as field_extraction's vat_breakdown"""
+    try:
+        rate = Decimal(value.strip()).normalize()
+    except (InvalidOperation, AttributeError):
+        return "0"
+    return str(int(rate)) if rate == rate.to_integral_value() else str(rate)
+
+
+def _address(party: Dict[str, str]) -> Optional[str]:
+    street = " ".join(filter(None, (party.get("street"), party.get("building"))))
+    city = " ".join(filter(None, (party.get("postal_zone"), party.get("city"))))
+    parts = [part for part in (street, city, party.get("country")) if part]
+    return ", ".join(parts) or None
+
+
+def _vat_id(tax_ids: List[str]) -> Optional[str]:
+    """Prefer the EU VAT ID (IČ DPH, country prefix) over a plain DIČ"""
+    for tax_id in tax_ids:
+        if tax_id[:2].isalpha():
+            return tax_id
+    return tax_ids[0] if tax_ids else None
+
+
+def _signed(value: Optional[float], sign: int) -> Optional[float]:
+    """Credit notes carry negative amounts whatever sign the file uses"""
+    return None if value is None else sign * abs(value)
+
+
+def parse_einvoice(file_path: str) -> Dict[str, Any]:
+    """
+    Parse an e-invoice into the extracted_data schema of the Mindee parser
+    (blocking; run it in a thread)
+
+    The file is read with iterparse and every element is cleared once its
+    end tag has been handled, so memory stays flat for invoices with
+    thousands of lines. Values come from the document itself, hence
+    confidence 1.0. Besides the Mindee keys the result carries
+    vat_breakdown ({"20": {"base", "vat"}}), supplier_ico, supplier_vat_id,
+    total_net and source_format.
+
+    invoice_type is "credit_note" for a UBL CreditNote, a UBL invoice with a
+    credit note type code or ISDOC DocumentType 2/6; its amounts (totals,
+    VAT breakdown, line totals) are negative, so sums over invoices net
+    the credit out.
+
+    Raises EInvoiceError when the file is not an ISDOC/UBL invoice or has
+    no total.
+    """
+    source_format = detect_format(file_path)
+    if source_format is None:
+        raise EInvoiceError("Not a supported e-invoice (ISDOC, UBL or Peppol BIS)")
+
+    header: Dict[str, str] = {}
+    parties: Dict[str, Dict[str, Any]] = {"supplier": {"tax_ids": []}, "customer": {"tax_ids": []}}
+    lines: List[Dict[str, str]] = []
+    subtotals: List[Dict[str, str]] = []
+    invoice_kind = "invoice"
+
+    path: List[str] = []
+    tax_totals = 0
+    line: Optional[Dict[str, str]] = None
+    line_depth = 0
+    subtotal: Optional[Dict[str, str]] = None
+    subtotal_depth = 0
+
+    try:
+        for event, elem in iterparse(file_path, events=("start", "end")):
+            namespace, name = _split_tag(elem.tag)
+
+            if event == "start":
+                path.append(name)
+                key = tuple(path[1:])
+                if not key:
+                    invoice_kind = UBL_NAMESPACES.get(namespace, "invoice")
+                elif key == ("TaxTotal",):
+                    tax_totals += 1
+                elif line is None and key in _LINE_PATHS:
+                    line, line_depth = {}, len(key)
+                elif subtotal is None and key in _SUBTOTAL_PATHS and tax_totals == 1:
+                    subtotal, subtotal_depth = {}, len(key)
+                continue
+
+            key = tuple(path[1:])
+            text = (elem.text or "").strip()
+
+            if line is not None:
+                if len(key) == line_depth:
+                    lines.append(line)
+                    line = None
+                else:
+                    field = _LINE_FIELDS.get(key[line_depth:])
+                    if field and text:
+                        line.setdefault(field, text)
+            elif subtotal is not None:
+                if len(key) == subtotal_depth:
+                    subtotals.append(subtotal)
+                    subtotal = None
+                else:
+                    field = _SUBTOTAL_FIELDS.get(key[subtotal_depth:])
+                    if field and text:
+                        subtotal.setdefault(field, text)
+            elif text:
+                field = _HEADER_FIELDS.get(key)
+                if field and not (field == "total_tax" and tax_totals > 1):
+                    header.setdefault(field, text)
+                else:
+                    party = _PARTIES.get(key[:2])
+                    field = _PARTY_FIELDS.get(key[2:]) if party else None
+                    if field == "tax_id":
+                        parties[party]["tax_ids"].append(text.replace(" ", ""))
+                    elif field:
+                        parties[party].setdefault(field, text)
+
+            path.pop()
+            elem.clear()
+    except ParseError as e:
+        raise EInvoiceError(f"Malformed e-invoice XML: {e}")
+
+    if source_format == "isdoc":
+        invoice_kind = ISDOC_DOCUMENT_TYPES.get(header.get("isdoc_document_type"), "invoice")
+    elif header.get("invoice_type_code") in UBL_CREDIT_NOTE_CODES:
+        invoice_kind = "credit_note"
+    sign = -1 if invoice_kind == "credit_note" else 1
+
+    total_amount = _amount(header.get("total_amount")) or _amount(header.get("amount_due"))
+    if total_amount is None:
+        raise EInvoiceError("E-invoice has no TaxInclusiveAmount or PayableAmount")
+
+    vat_breakdown: Dict[str, Dict[str, float]] = {}
+    for row in subtotals:
+        entry = vat_breakdown.setdefault(_rate_key(row.get("rate")), {"base": 0.0, "vat": 0.0})
+        entry["base"] = round(entry["base"] + (_signed(_amount(row.get("base")), sign) or 0.0), 2)
+        entry["vat"] = round(entry["vat"] + (_signed(_amount(row.get("vat")), sign) or 0.0), 2)
+
+    total_tax = _signed(_amount(header.get("total_tax")), sign)
+    if total_tax is None and vat_breakdown:
+        total_tax = round(sum(entry["vat"] for entry in vat_breakdown.values()), 2)
+
+    supplier, customer = parties["supplier"], parties["customer"]
+    return {
+        "document_type": "invoice",
+        "invoice_type": invoice_kind,
+        "supplier_name": supplier.get("name") or supplier.get("registration_name"),
+        "supplier_address": _address(supplier),
+        # ISDOC: PartyIdentification is the IČO; UBL: it may be a GLN, the
+        # registration number is PartyLegalEntity/CompanyID
+        "supplier_ico": (
+            supplier.get("ico") if source_format == "isdoc"
+            else supplier.get("legal_id") or supplier.get("ico")
+        ),
+        "supplier_vat_id": _vat_id(supplier["tax_ids"]),
+        "customer_name": customer.get("name") or customer.get("registration_name"),
+        "invoice_number": header.get("invoice_number"),
+        "invoice_date": header.get("invoice_date"),
+        "due_date": header.get("due_date"),
+        "total_amount": _signed(total_amount, sign),
+        "total_net": _signed(_amount(header.get("total_net")), sign),
+        "total_tax": total_tax,
+        "currency": header.get("currency"),
+        "vat_breakdown": vat_breakdown,
+        "line_items": [
+            {
+                "description": item.get("name") or item.get("description"),
+                "quantity": _amount(item.get("quantity")),
+                "unit_price": _amount(item.get("unit_price")),
+                "total_amount": _signed(_amount(item.get("total_amount")), sign),
+                "tax_rate": _amount(item.get("tax_rate"))
+            }
+            for item in lines
+        ],
+        "source_format": source_format,
+        "ocr_provider": "einvoice",
+        "confidence": 1.0
+    }
@@ -0,0 +1,338 @@
+"""
+eKasa Receipt Service
+Reads the eKasa QR code of Slovak cash-register receipts and fetches the
+receipt from the registry instead of running OCR
+"""
+
+import os
+import re
+import json
+import asyncio
+import logging
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from PIL import Image, ImageOps
+
+from services.cpu_pool import CPUWorkerPool
+from services.http_client import ProviderHTTPClient
+from services.image_preprocessing import IMAGE_EXTENSIONS
+from services.ocr_cache import OCRResultCache
+
+# QR decoders are optional; without one the QR stage is skipped
+# pyzbar needs the zbar shared library (libzbar0) on the host
+try:
+    from pyzbar import pyzbar
+    PYZBAR_AVAILABLE = True
+except ImportError:
+    PYZBAR_AVAILABLE = False
+    pyzbar = None
+
+try:
+    import cv2
+    import numpy as np
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+    cv2 = None
+
+QR_AVAILABLE = PYZBAR_AVAILABLE or OPENCV_AVAILABLE
+
+logger = logging.getLogger(__name__)
+
+# Online receipt: "O-" + 32 hex digits (the receipt's unique ID in eKasa)
+ONLINE_RECEIPT_ID = re.compile(r"^O-[0-9A-F]{32}$", re.IGNORECASE)
+# Offline receipt: OKP:cash register code:ddMMyyHHmmss:receipt number:total
+OFFLINE_RECEIPT = re.compile(
+    r"^(?P<okp>[0-9A-F]{8}(?:-[0-9A-F]{8}){4}):(?P<cash_register_code>\d+):"
+    r"(?P<issue_date>\d{12}):(?P<receipt_number>\d+):(?P<total>\d+(?:\.\d{1,2})?)$",
+    re.IGNORECASE
+)
+
+# Long edges tried when decoding; QR decoders do better on moderate sizes
+_DECODE_EDGES = (1600, 900)
+
+
+def parse_ekasa_code(payload: str) -> Optional[Dict[str, str]]:
+    """
+    Receipt reference from a QR payload, or None if it is not an eKasa code
+
+    Returns {"receipt_id": ..., "kind": "online"} or, for offline receipts,
+    the OKP fields with receipt_id set to the whole payload (unique as well).
+    """
+    payload = payload.strip()
+    if ONLINE_RECEIPT_ID.match(payload):
+        return {"receipt_id": payload.upper(), "kind": "online"}
+    match = OFFLINE_RECEIPT.match(payload)
+    if match:
+        return {"receipt_id": payload.upper(), "kind": "offline", **match.groupdict()}
+    return None
+
+
+def _decode(image: Image.Image) -> List[str]:
+    if PYZBAR_AVAILABLE:
+        return [
+            symbol.data.decode("utf-8", "replace")
+            for symbol in pyzbar.decode(image, symbols=[pyzbar.ZBarSymbol.QRCODE])
+        ]
+    found, texts, _, _ = cv2.QRCodeDetector().detectAndDecodeMulti(np.array(image))
+    return [text for text in texts if text] if found else []
+
+
+def find_ekasa_code(file_path: str) -> Optional[Dict[str, str]]:
+    """
+    Decode the eKasa QR code of a receipt image (blocking, CPU-bound)
+
+    The image is decoded at a couple of sizes (grayscale, EXIF-rotated);
+    the first QR payload that is an eKasa reference wins.
+    """
+    if not QR_AVAILABLE or Path(file_path).suffix.lower() not in IMAGE_EXTENSIONS:
+        return None
+
+    with Image.open(file_path) as original:
+        image = ImageOps.exif_transpose(original).convert("L")
+
+    for edge in _DECODE_EDGES:
+        if max(image.size) > edge:
+            image.thumbnail((edge, edge), Image.LANCZOS)
+        for payload in _decode(image):
+            code = parse_ekasa_code(payload)
+            if code is not None:
+                return code
+    return None
+
+
+class ReceiptLookupBackend:
+    """
+    Resolves an eKasa code to the receipt as stored by the registry
+
+    find() returns the receipt dict in the eKasa API shape ("receipt" of
+    the /receipt/find response), or None when the receipt is unknown.
+    Network errors propagate; the pipeline then falls back to OCR.
+    """
+
+    name = "none"
+
+    async def find(self, code: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        return None
+
+
+class EKasaAPIBackend(ReceiptLookupBackend):
+    """Public receipt lookup of the Financial Administration (EKASA_API_URL)"""
+
+    name = "ekasa"
+
+    def __init__(self, http_client: ProviderHTTPClient, api_url: str = None):
+        self.http_client = http_client
+        self.api_url = (api_url or os.getenv("EKASA_API_URL", "https://ekasa.financnasprava.sk")).rstrip("/")
+
+    async def find(self, code: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        if code["kind"] == "online":
+            body = {"receiptId": code["receipt_id"]}
+        else:
+            body = {
+                "okp": code["okp"],
+                "cashRegisterCode": code["cash_register_code"],
+                "issueDate": datetime.strptime(code["issue_date"], "%d%m%y%H%M%S").strftime("%d.%m.%Y %H:%M:%S"),
+                "receiptNumber": int(code["receipt_number"]),
+                "totalAmount": float(code["total"])
+            }
+        response = await self.http_client.post("ekasa", f"{self.api_url}/mdu/api/v1/opd/receipt/find", json=body)
+        data = response.json()
+        if data.get("returnValue", 0) != 0:
+            return None
+        return data.get("receipt")
+
+
+class StaticReceiptBackend(ReceiptLookupBackend):
+    """
+    Receipts from a dict or a JSON file ({receipt_id: receipt}) - local
+    stand-in for development and tests (EKASA_RECEIPTS_FILE)
+    """
+
+    name = "static"
+
+    def __init__(self, receipts: Dict[str, Dict[str, Any]] = None, path: str = None):
+        if receipts is None and path:
+            with open(path, encoding="utf-8") as f:
+                receipts = json.load(f)
+        self.receipts = {key.upper(): value for key, value in (receipts or {}).items()}
+
+    async def find(self, code: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        return self.receipts.get(code["receipt_id"])
+
+
+def create_backend(http_client: ProviderHTTPClient) -> ReceiptLookupBackend:
+    """Backend selected by EKASA_LOOKUP_BACKEND: ekasa (default), static or none"""
+    name = os.getenv("EKASA_LOOKUP_BACKEND", "ekasa").lower()
+    if name == "ekasa":
+        return EKasaAPIBackend(http_client)
+    if name == "static":
+        return StaticReceiptBackend(path=os.getenv("EKASA_RECEIPTS_FILE"))
+    return ReceiptLookupBackend()
+
+
+def _amount(value) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(Decimal(str(value)))
+    except InvalidOperation:
+        return None
+
+
+def _rate_key(rate) -> str:
+    rate = Decimal(str(rate)).normalize()
+    return str(int(rate)) if rate == rate.to_integral_value() else str(rate)
+
+
+def receipt_to_extracted_data(receipt: Dict[str, Any], receipt_id: str) -> Dict[str, Any]:
+    """
+    Map an eKasa receipt to the Mindee receipt schema
+
+    Adds vat_breakdown ({"20": {"base", "vat"}}), line_items, supplier_ico
+    and supplier_vat_id like the e-invoice parser does.
+    """
+    organization = receipt.get("organization") or {}
+
+    issued = None
+    if receipt.get("issueDate"):
+        try:
+            issued = datetime.strptime(receipt["issueDate"], "%d.%m.%Y %H:%M:%S")
+        except ValueError:
+            logger.warning(f"Unexpected eKasa issueDate: {receipt['issueDate']}")
+
+    vat_breakdown = {}
+    for suffix in ("Basic", "Reduced"):
+        rate = receipt.get(f"vatRate{suffix}")
+        base = _amount(receipt.get(f"taxBase{suffix}"))
+        vat = _amount(receipt.get(f"vatAmount{suffix}"))
+        if rate is not None and (base or vat):
+            vat_breakdown[_rate_key(rate)] = {"base": base or 0.0, "vat": vat or 0.0}
+    if _amount(receipt.get("freeTaxAmount")):
+        vat_breakdown["0"] = {"base": _amount(receipt["freeTaxAmount"]), "vat": 0.0}
+
+    line_items = []
+    for item in receipt.get("items") or []:
+        quantity = _amount(item.get("quantity"))
+        price = _amount(item.get("price"))
+        line_items.append({
+            "description": item.get("name"),
+            "quantity": quantity,
+            "unit_price": round(price / quantity, 4) if price is not None and quantity else None,
+            "total_amount": price,
+            "tax_rate": _amount(item.get("vatRate"))
+        })
+
+    vat_amounts = [row["vat"] for row in vat_breakdown.values()]
+    return {
+        "document_type": "receipt",
+        "merchant_name": organization.get("name"),
+        "date": issued.date().isoformat() if issued else None,
+        "time": issued.strftime("%H:%M") if issued else None,
+        "total_amount": _amount(receipt.get("totalPrice")),
+        "total_tax": round(sum(vat_amounts), 2) if vat_amounts else None,
+        "category": None,
+        "payment_method": None,
+        "supplier_ico": receipt.get("ico") or organization.get("ico"),
+        "supplier_vat_id": receipt.get("icDph") or organization.get("icDph") or receipt.get("dic"),
+        "receipt_id": receipt.get("receiptId") or receipt_id,
+        "vat_breakdown": vat_breakdown,
+        "line_items": line_items,
+        "ocr_provider": "ekasa",
+        "confidence": 1.0
+    }
+
+
+class EKasaService:
+    """
+    QR stage of the document pipeline
+
+    process() decodes the eKasa QR code of an image and returns the
+    registry's receipt as extracted_data, or None (no QR code, QR decoding
+    not installed, receipt unknown or registry unreachable) so the caller
+    runs OCR instead. Lookups are cached by receipt ID in the OCR result
+    cache - a receipt in the registry never changes - under the digest of
+    the uploaded file, so they are purged with it.
+
+    Settings (env): EKASA_ENABLED, EKASA_LOOKUP_BACKEND, EKASA_API_URL,
+    EKASA_RECEIPTS_FILE
+    """
+
+    def __init__(
+        self,
+        backend: ReceiptLookupBackend,
+        cache: Optional[OCRResultCache] = None,
+        cpu_pool: Optional[CPUWorkerPool] = None,
+        enabled: bool = None
+    ):
+        self.backend = backend
+        self.cache = cache
+        self.cpu_pool = cpu_pool
+        if enabled is None:
+            enabled = os.getenv("EKASA_ENABLED", "true").lower() == "true"
+        self.enabled = enabled and QR_AVAILABLE
+
+        self.scanned = 0
+        self.codes_found = 0
+        self.lookups = 0
+        self.cache_hits = 0
+        self.not_found = 0
+        self.errors = 0
+
+    async def process(self, file_path: str, file_sha256: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        if not self.enabled or Path(file_path).suffix.lower() not in IMAGE_EXTENSIONS:
+            return None
+
+        self.scanned += 1
+        try:
+            if self.cpu_pool is not None:
+                code = await self.cpu_pool.run(find_ekasa_code, file_path)
+            else:
+                code = await asyncio.to_thread(find_ekasa_code, file_path)
+        except Exception as e:
+            logger.warning(f"QR decoding failed for {file_path}: {e}")
+            return None
+        if code is None:
+            return None
+        self.codes_found += 1
+
+        receipt_id = code["receipt_id"]
+        cache_key = OCRResultCache.make_key("ekasa", receipt_id)
+        use_cache = self.cache is not None and file_sha256
+        if use_cache:
+            cached = await self.cache.aget(cache_key, file_sha256)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached
+
+        self.lookups += 1
+        try:
+            receipt = await self.backend.find(code)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"eKasa lookup failed for {receipt_id}, falling back to OCR: {e}")
+            return None
+        if receipt is None:
+            self.not_found += 1
+            logger.info(f"eKasa receipt {receipt_id} not found ({self.backend.name}), falling back to OCR")
+            return None
+
+        extracted_data = receipt_to_extracted_data(receipt, receipt_id)
+        if use_cache:
+            await self.cache.aput(cache_key, extracted_data, file_sha256)
+        return extracted_data
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend.name,
+            "scanned_total": self.scanned,
+            "codes_found_total": self.codes_found,
+            "lookups_total": self.lookups,
+            "cache_hits_total": self.cache_hits,
+            "not_found_total": self.not_found,
+            "errors_total": self.errors
+        }
@@ -0,0 +1,154 @@
+"""
+Provider HTTP Client
+Shared async HTTP client for external OCR/IDP providers (Mindee, Veryfi, Klippa)
+and the eKasa receipt registry
+"""
+
+import os
+import asyncio
+import random
+import logging
+import time
+from typing import Dict, Any, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class RetryBudget:
+    """
+    Limits retries to a fraction of regular traffic
+
+    Every request deposits `ratio` tokens, every retry withdraws one.
+    A provider that keeps failing therefore cannot be hammered with
+    retries - once the budget is spent, errors are returned immediately.
+    """
+
+    def __init__(self, ratio: float = 0.2, reserve: float = 3.0):
+        self.ratio = ratio
+        self.reserve = reserve
+        self.max_tokens = max(reserve, 10.0)
+        self.tokens = reserve
+
+    def record_request(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class ProviderHTTPClient:
+    """
+    One pooled, keep-alive httpx.AsyncClient shared by all providers
+
+    Per provider:
+    - timeout: total seconds for one attempt
+    - max_retries: retries on timeouts, connection errors, 429 and 5xx
+    - max_concurrency: requests in flight at once (others wait)
+
+    Defaults can be overridden with env variables, e.g.
+    MINDEE_TIMEOUT_SECONDS, MINDEE_MAX_RETRIES, MINDEE_MAX_CONCURRENCY.
+    """
+
+    DEFAULT_LIMITS = {
+        'mindee': {'timeout': 30.0, 'max_retries': 2, 'max_concurrency': 8},
+        'veryfi': {'timeout': 30.0, 'max_retries': 2, 'max_concurrency': 4},
+        'klippa': {'timeout': 30.0, 'max_retries': 2, 'max_concurrency': 4},
+        'ekasa': {'timeout': 10.0, 'max_retries': 2, 'max_concurrency': 4},
+    }
+
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+    def __init__(self, max_connections: int = None, max_keepalive: int = None):
+        self.max_connections = max_connections or int(os.getenv("PROVIDER_HTTP_MAX_CONNECTIONS", "32"))
+        self.max_keepalive = max_keepalive or int(os.getenv("PROVIDER_HTTP_MAX_KEEPALIVE", "16"))
+        self.limits = {name: self._load_limits(name, defaults) for name, defaults in self.DEFAULT_LIMITS.items()}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._budgets: Dict[str, RetryBudget] = {}
+
+    @staticmethod
+    def _load_limits(name: str, defaults: Dict[str, Any]) -> Dict[str, Any]:
+        prefix = name.upper()
+        return {
+            'timeout': float(os.getenv(f"{prefix}_TIMEOUT_SECONDS", defaults['timeout'])),
+            'max_retries': int(os.getenv(f"{prefix}_MAX_RETRIES", defaults['max_retries'])),
+            'max_concurrency': int(os.getenv(f"{prefix}_MAX_CONCURRENCY", defaults['max_concurrency'])),
+        }
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive
+                ),
+                timeout=httpx.Timeout(30.0, connect=5.0)
+            )
+        return self._client
+
+    def _provider_state(self, provider: str):
+        if provider not in self._semaphores:
+            limits = self.limits.get(provider) or self.DEFAULT_LIMITS['mindee']
+            self._semaphores[provider] = asyncio.Semaphore(limits['max_concurrency'])
+            self._budgets[provider] = RetryBudget()
+        return self._semaphores[provider], self._budgets[provider]
+
+    async def post(
+        self,
+        provider: str,
+        url: str,
+        files: Dict[str, Any] = None,
+        headers: Dict[str, str] = None,
+        json: Dict[str, Any] = None
+    ) -> httpx.Response:
+        """
+        POST to a provider with its timeout, retry budget and concurrency limit
+
+        Raises httpx.HTTPStatusError for non-2xx responses after retries,
+        httpx.TimeoutException / httpx.TransportError when the provider is unreachable.
+        """
+        limits = self.limits.get(provider) or self.DEFAULT_LIMITS['mindee']
+        semaphore, budget = self._provider_state(provider)
+        budget.record_request()
+
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                async with semaphore:
+                    response = await self.client.post(
+                        url, files=files, json=json, headers=headers, timeout=limits['timeout']
+                    )
+                if response.status_code not in self.RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    return response
+                error = httpx.HTTPStatusError(
+                    f"{provider} returned {response.status_code}",
+                    request=response.request,
+                    response=response
+                )
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                error = e
+
+            if attempt >= limits['max_retries'] or not budget.try_withdraw():
+                logger.warning(
+                    f"{provider} request failed after {attempt + 1} attempt(s) "
+                    f"({time.monotonic() - started:.2f}s last attempt): {error}"
+                )
+                raise error
+
+            attempt += 1
+            # Exponential backoff with jitter
+            await asyncio.sleep(min(0.5 * (2 ** (attempt - 1)), 5.0) * (0.5 + random.random()))
+
+    async def aclose(self):
+        """Close pooled connections (call on shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,245 @@
+"""
+Image Preprocessing Service
+Normalizes photos/scans before OCR: downscale to target DPI, grayscale,
+EXIF stripping and optional deskew
+"""
+
+import os
+import asyncio
+import time
+import uuid
+import logging
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from services.cpu_pool import CPUWorkerPool
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tif', '.tiff'}
+
+# Long edge of an A4 page in inches - used to turn a target DPI into a pixel limit
+A4_LONG_EDGE_INCHES = 11.69
+
+
+def estimate_skew(image: Image.Image, max_angle: float = 5.0, step: float = 0.5) -> float:
+    """
+    Estimate text skew angle (degrees) with a projection profile
+
+    Text lines produce sharp peaks in the row-sum profile when they are
+    horizontal; the angle with the highest profile variance wins.
+    Row sums are computed by resizing to 1px width (BOX filter = row mean).
+    """
+    small = image.convert('L')
+    small.thumbnail((800, 800))
+    ink = small.point(lambda p: 255 if p < 128 else 0)  # Text becomes white
+
+    best_angle = 0.0
+    best_score = -1.0
+    steps = int(2 * max_angle / step)
+    for i in range(steps + 1):
+        angle = -max_angle + i * step
+        rotated = ink.rotate(angle, resample=Image.NEAREST, expand=True, fillcolor=0)
+        rows = list(rotated.resize((1, rotated.height), Image.BOX).getdata())
+        mean = sum(rows) / len(rows)
+        score = sum((row - mean) ** 2 for row in rows)
+        if score > best_score:
+            best_angle, best_score = angle, score
+
+    return best_angle
+
+
+def find_text_regions(
+    image: Image.Image,
+    header_fraction: float = 0.25,
+    footer_fraction: float = 0.35,
+    padding: int = 12
+) -> Optional[List[Tuple[int, int, int, int]]]:
+    """
+    Fast layout pass: header and footer bands of the printed content
+
+    Invoices and receipts keep supplier IDs and the document title at the
+    top and totals, VAT and dates at the bottom. The content bounding box
+    is found on a small copy; the band edges are then moved to the nearest
+    blank row so no text line is cut in half.
+
+    Returns (left, top, right, bottom) boxes in image coordinates, or None
+    when the bands would cover (almost) the whole page anyway.
+    """
+    small = image.convert('L')
+    small.thumbnail((600, 600))
+    scale = image.height / small.height
+    ink = small.point(lambda p: 255 if p < 128 else 0)
+
+    bbox = ink.getbbox()
+    if bbox is None:
+        return None
+    left, top, right, bottom = bbox
+    rows = list(ink.crop(bbox).resize((1, bottom - top), Image.BOX).getdata())
+    height = len(rows)
+
+    def blank_row(start: int, step: int) -> int:
+        index = start
+        while 0 <= index < height and rows[index] > 2:
+            index += step
+        return min(max(index, 0), height)
+
+    header_end = blank_row(int(height * header_fraction), 1)
+    footer_start = blank_row(int(height * (1 - footer_fraction)), -1)
+    if footer_start - header_end < height * 0.15:
+        return None  # Little to skip - read the full page
+
+    def to_image(y0: int, y1: int) -> Tuple[int, int, int, int]:
+        return (
+            max(0, int(left * scale) - padding),
+            max(0, int((top + y0) * scale) - padding),
+            min(image.width, int(right * scale) + padding),
+            min(image.height, int((top + y1) * scale) + padding)
+        )
+
+    return [to_image(0, header_end), to_image(footer_start, height)]
+
+
+def normalize_image(
+    source: str,
+    destination: str,
+    target_dpi: int = 300,
+    grayscale: bool = True,
+    deskew: bool = False,
+    jpeg_quality: int = 85
+) -> Dict[str, Any]:
+    """
+    Write a normalized JPEG copy of an image (blocking, CPU-bound)
+
+    - Applies EXIF orientation, then drops all EXIF metadata
+    - Downscales so the long edge fits an A4 page at target_dpi
+    - Converts to grayscale
+    - Optionally rotates to remove skew
+
+    Returns before/after sizes and timing.
+    """
+    started = time.perf_counter()
+    bytes_before = os.path.getsize(source)
+
+    with Image.open(source) as original:
+        original_size = original.size
+        image = ImageOps.exif_transpose(original)
+
+    max_edge = int(target_dpi * A4_LONG_EDGE_INCHES)
+    resized = max(image.size) > max_edge
+    if resized:
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    if grayscale:
+        image = image.convert('L')
+    elif image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    angle = 0.0
+    if deskew:
+        angle = estimate_skew(image)
+        if abs(angle) >= 0.1:
+            fill = 255 if image.mode == 'L' else (255, 255, 255)
+            image = image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=fill)
+
+    # No exif= argument -> metadata is not written
+    image.save(destination, 'JPEG', quality=jpeg_quality, optimize=True, dpi=(target_dpi, target_dpi))
+
+    return {
+        "bytes_before": bytes_before,
+        "bytes_after": os.path.getsize(destination),
+        "original_size": list(original_size),
+        "normalized_size": list(image.size),
+        "resized": resized,
+        "deskew_angle": angle,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
+
+class ImagePreprocessor:
+    """
+    Preprocessing stage of the OCR pipeline
+
+    prepare() returns the path OCR should use: a normalized temporary copy,
+    or the original file when normalization does not help (non-images,
+    or the copy would not be smaller and nothing was resized/rotated).
+    Always call cleanup() with the returned dict when done.
+
+    Settings (env): OCR_PREPROCESS_ENABLED, OCR_TARGET_DPI,
+    OCR_PREPROCESS_GRAYSCALE, OCR_DESKEW
+    """
+
+    def __init__(
+        self,
+        cpu_pool: Optional[CPUWorkerPool] = None,
+        enabled: bool = None,
+        target_dpi: int = None,
+        grayscale: bool = None,
+        deskew: bool = None
+    ):
+        self.cpu_pool = cpu_pool
+        self.enabled = enabled if enabled is not None else os.getenv("OCR_PREPROCESS_ENABLED", "true").lower() == "true"
+        self.target_dpi = target_dpi or int(os.getenv("OCR_TARGET_DPI", "300"))
+        self.grayscale = grayscale if grayscale is not None else os.getenv("OCR_PREPROCESS_GRAYSCALE", "true").lower() == "true"
+        self.deskew = deskew if deskew is not None else os.getenv("OCR_DESKEW", "false").lower() == "true"
+        self.work_dir = Path(tempfile.gettempdir()) / "taxa_preprocessed"
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+
+        self.images = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+        self.total_ms = 0.0
+
+    async def prepare(self, file_path: str) -> Dict[str, Any]:
+        """Normalize an image for OCR; see class docstring"""
+        if not self.enabled or Path(file_path).suffix.lower() not in IMAGE_EXTENSIONS:
+            return {"path": file_path, "temporary": False}
+
+        destination = str(self.work_dir / f"{uuid.uuid4()}.jpg")
+        args = (file_path, destination, self.target_dpi, self.grayscale, self.deskew)
+
+        try:
+            if self.cpu_pool is not None:
+                stats = await self.cpu_pool.run(normalize_image, *args)
+            else:
+                stats = await asyncio.to_thread(normalize_image, *args)
+        except Exception as e:
+            logger.warning(f"Image normalization failed for {file_path}, using original: {e}")
+            if os.path.exists(destination):
+                os.remove(destination)
+            return {"path": file_path, "temporary": False}
+
+        self.images += 1
+        self.bytes_before += stats["bytes_before"]
+        self.bytes_after += stats["bytes_after"]
+        self.total_ms += stats["duration_ms"]
+        logger.info(
+            f"Normalized {Path(file_path).name}: {stats['bytes_before']} -> {stats['bytes_after']} bytes, "
+            f"{stats['original_size']} -> {stats['normalized_size']} px in {stats['duration_ms']} ms"
+        )
+
+        changed = stats["resized"] or abs(stats["deskew_angle"]) >= 0.1
+        if not changed and stats["bytes_after"] >= stats["bytes_before"]:
+            os.remove(destination)
+            return {"path": file_path, "temporary": False, **stats}
+
+        return {"path": destination, "temporary": True, **stats}
+
+    def cleanup(self, prepared: Dict[str, Any]):
+        """Delete the temporary normalized copy, if one was created"""
+        if prepared.get("temporary"):
+            try:
+                os.remove(prepared["path"])
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "images": self.images,
+            "bytes_before": self.bytes_before,
+            "bytes_after": self.bytes_after,
+            "avg_duration_ms": round(self.total_ms / self.images, 2) if self.images else 0.0
+        }
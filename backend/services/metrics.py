@@ -0,0 +1,44 @@
+"""
+Metrics Service
+Prometheus exposition of the stats() dictionaries the services already keep
+"""
+
+from typing import Any, Callable, Dict
+
+from prometheus_client import CollectorRegistry, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+
+class StatsCollector:
+    """
+    Turns stats() dictionaries into Prometheus metrics at scrape time
+
+    Each source is a name and a callable returning a flat dict; numeric
+    values become taxa_<source>_<key>. Keys ending in "_total" are exported
+    as counters, everything else as gauges. Values are read live on every
+    scrape, so nothing has to be updated on the hot path.
+    """
+
+    def __init__(self, sources: Dict[str, Callable[[], Dict[str, Any]]]):
+        self.sources = sources
+
+    def collect(self):
+        for source, stats in self.sources.items():
+            for key, value in (stats() or {}).items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                if key.endswith("_total"):
+                    yield CounterMetricFamily(f"taxa_{source}_{key[:-len('_total')]}", f"{source} {key}", value=value)
+                else:
+                    yield GaugeMetricFamily(f"taxa_{source}_{key}", f"{source} {key}", value=value)
+
+
+def create_registry(sources: Dict[str, Callable[[], Dict[str, Any]]]) -> CollectorRegistry:
+    registry = CollectorRegistry()
+    registry.register(StatsCollector(sources))
+    return registry
+
+
+def render(registry: CollectorRegistry):
+    """(body, content type) for a /metrics response"""
+    return generate_latest(registry), CONTENT_TYPE_LATEST
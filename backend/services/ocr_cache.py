@@ -0,0 +1,173 @@
+"""
+OCR Result Cache
+Persistent, content-addressed cache for OCR/classification results
+"""
+
+import os
+import json
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class OCRResultCache:
+    """
+    Disk cache of OCR results keyed by file content
+
+    - One JSON file per entry, named by the SHA-256 of the cache key
+      (file digest + provider + document type + parser version)
+    - Entries carry the digest of the file they were read from (group), so
+      purge() can remove everything derived from a file when the last
+      account holding it is deleted
+    - Size-based eviction: least recently used entries are removed once the
+      total size exceeds max_bytes
+    - Survives restarts; the LRU order is rebuilt from file mtimes
+    - Hit/miss/eviction counters are available via stats()
+    - aget()/aput()/apurge() run the file I/O and JSON coding in a thread,
+      for callers on the event loop
+    """
+
+    def __init__(self, directory: str = None, max_bytes: int = None):
+        self.directory = Path(directory or os.getenv("OCR_CACHE_DIR", "ocr_cache"))
+        self.max_bytes = max_bytes or int(os.getenv("OCR_CACHE_MAX_MB", "256")) * 1024 * 1024
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # filename -> size, oldest first
+        self._total_bytes = 0
+        self._load_index()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Build a cache key from its parts (e.g. digest, provider, type, version)"""
+        raw = "|".join(str(part) for part in parts)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _filename(key: str, group: str) -> str:
+        return f"{group}.{key}.json"
+
+    def get(self, key: str, group: str) -> Optional[Dict[str, Any]]:
+        """Return cached value or None"""
+        path = self.directory / self._filename(key, group)
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (FileNotFoundError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            if path.name in self._entries:
+                self._entries.move_to_end(path.name)
+
+        # Refresh mtime so LRU order survives restarts
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        return value
+
+    def put(self, key: str, value: Dict[str, Any], group: str):
+        """Store value and evict old entries if the cache is over its size limit"""
+        path = self.directory / self._filename(key, group)
+        tmp_path = path.with_name(path.name + f".{os.getpid()}.tmp")
+
+        try:
+            data = json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"OCR cache write failed: {e}")
+            if tmp_path.exists():
+                tmp_path.unlink()
+            return
+
+        with self._lock:
+            self._total_bytes -= self._entries.pop(path.name, 0)
+            self._entries[path.name] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def purge(self, group: str) -> int:
+        """Remove every entry of a group (file digest); returns the number removed"""
+        prefix = f"{group}."
+        with self._lock:
+            names = [name for name in self._entries if name.startswith(prefix)]
+            for name in names:
+                self._total_bytes -= self._entries.pop(name)
+        for name in names:
+            try:
+                (self.directory / name).unlink()
+            except FileNotFoundError:
+                pass
+        return len(names)
+
+    async def aget(self, key: str, group: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.get, key, group)
+
+    async def aput(self, key: str, value: Dict[str, Any], group: str):
+        await asyncio.to_thread(self.put, key, value, group)
+
+    async def apurge(self, group: str) -> int:
+        return await asyncio.to_thread(self.purge, group)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for health/metrics endpoints"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+    def _load_index(self):
+        files = []
+        for path in self.directory.glob("*.json"):
+            if "." not in path.stem:
+                # Written before entries were grouped by file: could never be purged
+                path.unlink(missing_ok=True)
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, path.name, stat.st_size))
+
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total_bytes += size
+
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        """Remove least recently used entries until under max_bytes (lock held)"""
+        while self._total_bytes > self.max_bytes and self._entries:
+            name, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                (self.directory / name).unlink()
+            except FileNotFoundError:
+                pass
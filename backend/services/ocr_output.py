@@ -0,0 +1,94 @@
+"""
+Raw OCR Output Storage
+Keeps raw OCR text and word boxes out of Document.extracted_data
+
+Raw output is stored zlib-compressed in its own table (document_ocr_output)
+and only loaded when it is asked for, so listing documents, tax calculation
+and exports read just the normalized fields.
+
+Backfill documents processed before the split (from backend/):
+    python -m services.ocr_output --backfill
+"""
+
+import json
+import zlib
+import logging
+import argparse
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Provider output that is only needed for debugging/re-extraction:
+# Tesseract raw_text + word boxes, Veryfi ocr_text
+RAW_OUTPUT_KEYS = ("raw_text", "words", "ocr_text")
+
+
+def split_raw_output(extracted_data: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """(normalized fields, raw output or None) - the input dict is not modified"""
+    if not extracted_data:
+        return extracted_data, None
+    raw = {key: extracted_data[key] for key in RAW_OUTPUT_KEYS if extracted_data.get(key)}
+    if not raw:
+        return extracted_data, None
+    fields = {key: value for key, value in extracted_data.items() if key not in RAW_OUTPUT_KEYS}
+    return fields, raw
+
+
+def pack_raw_output(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Column values for a DocumentOCROutput row: compressed data + original size"""
+    encoded = json.dumps(raw, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+    return {"data": zlib.compress(encoded, 6), "raw_size": len(encoded)}
+
+
+def unpack_raw_output(data: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+
+def backfill(session_factory, document_model, ocr_output_model, batch_size: int = 200) -> int:
+    """
+    Move raw output of already stored documents into the blob table
+
+    Walks documents by id in batches; returns the number of documents moved.
+    """
+    moved = 0
+    last_id = 0
+    while True:
+        db = session_factory()
+        try:
+            documents = (
+                db.query(document_model)
+                .filter(document_model.id > last_id)
+                .order_by(document_model.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not documents:
+                return moved
+            for document in documents:
+                fields, raw = split_raw_output(document.extracted_data)
+                if raw:
+                    db.merge(ocr_output_model(document_id=document.id, **pack_raw_output(raw)))
+                    document.extracted_data = fields
+                    moved += 1
+            last_id = documents[-1].id
+            db.commit()
+        finally:
+            db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Raw OCR output storage")
+    parser.add_argument("--backfill", action="store_true", help="move raw_text/words out of extracted_data")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.backfill:
+        from main import SessionLocal, Document, DocumentOCROutput
+        moved = backfill(SessionLocal, Document, DocumentOCROutput, args.batch_size)
+        print(f"Moved raw OCR output of {moved} document(s)")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
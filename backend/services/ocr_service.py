@@ -4,19 +4,188 @@ Supports multiple providers: Mindee, Tesseract, Veryfi, etc.
 """
 
 import os
-from typing import Dict, Any, Optional
+import shutil
+import asyncio
+import logging
+import tempfile
+from typing import Dict, Any, List, Optional
 from enum import Enum
-import requests
+from pathlib import Path
 from PIL import Image
 import io
 
-# Make pytesseract optional for Railway deployment
-try:
-    import pytesseract
-    TESSERACT_AVAILABLE = True
-except ImportError:
-    TESSERACT_AVAILABLE = False
-    pytesseract = None
+from services.ocr_cache import OCRResultCache
+from services.http_client import ProviderHTTPClient
+from services.cpu_pool import CPUWorkerPool
+from services.provider_chain import ProviderChain
+from services.field_extraction import extract_fields, serialize_fields
+from services.document_classifier import get_classifier, keyword_classify, page_size_from_words
+# Persistent engine (tesserocr) when installed, pytesseract otherwise; both optional
+from services.tesseract_engine import TESSERACT_AVAILABLE, image_to_data, recognize
+from services.image_preprocessing import IMAGE_EXTENSIONS, find_text_regions
+from services.pdf_service import (
+    PDF_AVAILABLE, PageImageCache, is_pdf, pdf_page_texts, has_text_layer, render_pdf_page
+)
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever parsing/extraction output changes - cached results are then recomputed
+PARSER_VERSION = "4"
+
+# Resolution used to rasterize scanned PDF pages for Tesseract
+PDF_RENDER_DPI = int(os.getenv("PDF_RENDER_DPI", "300"))
+
+# Multi-page OCR stops early once all of these fields were found
+REQUIRED_FIELDS = ('invoice_number', 'date', 'total_amount')
+
+# Region-of-interest OCR of images: header + footer bands only, full page
+# when any of these fields is missing from the regions
+ROI_REQUIRED_FIELDS = ('date', 'total_amount')
+OCR_ROI_ENABLED = os.getenv("OCR_ROI_ENABLED", "true").lower() == "true"
+OCR_ROI_HEADER_FRACTION = float(os.getenv("OCR_ROI_HEADER_FRACTION", "0.25"))
+OCR_ROI_FOOTER_FRACTION = float(os.getenv("OCR_ROI_FOOTER_FRACTION", "0.35"))
+
+
+class OCRResult:
+    """
+    Output of one Tesseract pass over one page
+    
+    Holds the full text together with word boxes and confidences, so
+    classification, confidence scoring and field extraction all reuse the
+    same run instead of calling Tesseract again.
+    """
+    
+    def __init__(self, text: str, words: List[Dict[str, Any]], confidence: Optional[float] = None):
+        self.text = text
+        self.words = words  # {"text", "left", "top", "width", "height", "conf"[, "page"]}
+        self._confidence = confidence
+        self.regions = None  # Boxes that were OCR'd when only regions of interest were read
+    
+    @classmethod
+    def from_text_layer(cls, text: str) -> "OCRResult":
+        """Result for a PDF page with an embedded text layer (exact, no OCR)"""
+        return cls(text.strip(), [], confidence=100.0)
+    
+    @classmethod
+    def merge(cls, pages: List["OCRResult"]) -> "OCRResult":
+        """Combine per-page results into one document result"""
+        words = []
+        weighted = 0.0
+        for page_index, page in enumerate(pages):
+            for word in page.words:
+                words.append(dict(word, page=page_index + 1))
+            weighted += page.confidence * max(len(page.text), 1)
+        total_chars = sum(max(len(page.text), 1) for page in pages)
+        return cls(
+            '\n\n'.join(page.text for page in pages),
+            words,
+            confidence=weighted / total_chars if total_chars else 0
+        )
+    
+    @classmethod
+    def from_tesseract_data(cls, data: Dict[str, List]) -> "OCRResult":
+        """Build result from image_to_data (pytesseract DICT layout)"""
+        words = []
+        blocks = []
+        lines = []
+        line_words = []
+        current_line = None
+        current_block = None
+        
+        for i, word in enumerate(data['text']):
+            if not word or not word.strip():
+                continue
+            
+            block_key = (data['page_num'][i], data['block_num'][i])
+            line_key = block_key + (data['par_num'][i], data['line_num'][i])
+            
+            if line_key != current_line:
+                if line_words:
+                    lines.append(' '.join(line_words))
+                    line_words = []
+                current_line = line_key
+            if block_key != current_block:
+                if lines:
+                    blocks.append('\n'.join(lines))
+                    lines = []
+                current_block = block_key
+            
+            line_words.append(word)
+            words.append({
+                "text": word,
+                "left": int(data['left'][i]),
+                "top": int(data['top'][i]),
+                "width": int(data['width'][i]),
+                "height": int(data['height'][i]),
+                "conf": float(data['conf'][i])
+            })
+        
+        if line_words:
+            lines.append(' '.join(line_words))
+        if lines:
+            blocks.append('\n'.join(lines))
+        
+        return cls('\n\n'.join(blocks), words)
+    
+    @property
+    def confidence(self) -> float:
+        """Average word confidence (0-100), ignoring non-text boxes"""
+        if self._confidence is not None:
+            return self._confidence
+        confidences = [word["conf"] for word in self.words if word["conf"] >= 0]
+        return sum(confidences) / len(confidences) if confidences else 0
+
+
+def run_tesseract(file_path: str) -> OCRResult:
+    """
+    Single Tesseract pass over an image file (blocking)
+    image_to_data returns text, boxes and confidences in one run; with the
+    persistent engine the worker's loaded models are reused
+    """
+    return OCRResult.from_tesseract_data(image_to_data(file_path))
+
+
+def run_roi_tesseract(file_path: str) -> OCRResult:
+    """
+    OCR only the header and footer regions of an image (blocking)
+
+    A layout pass (find_text_regions) picks the bands that hold IDs,
+    title, totals, VAT and dates; only those are recognized. If the layout
+    pass finds nothing to skip, or ROI_REQUIRED_FIELDS are not all in the
+    regions' text, the full page is read instead - in the same worker, so
+    the image is decoded only once.
+    """
+    with Image.open(file_path) as image:
+        image.load()
+        regions = find_text_regions(image, OCR_ROI_HEADER_FRACTION, OCR_ROI_FOOTER_FRACTION)
+        if regions:
+            parts = []
+            for left, top, right, bottom in regions:
+                part = OCRResult.from_tesseract_data(recognize(image.crop((left, top, right, bottom))))
+                for word in part.words:
+                    word["left"] += left
+                    word["top"] += top
+                parts.append(part)
+            result = OCRResult(
+                '\n\n'.join(part.text for part in parts),
+                [word for part in parts for word in part.words]
+            )
+            found = extract_fields(result.text)
+            if all(field in found for field in ROI_REQUIRED_FIELDS):
+                result.regions = regions
+                return result
+        
+        return OCRResult.from_tesseract_data(recognize(image))
+
+
+def ocr_pdf_page(file_path: str, page_index: int, dpi: int, image_path: str) -> OCRResult:
+    """
+    Rasterize (unless already cached at image_path) and OCR one PDF page (blocking)
+    """
+    if not os.path.exists(image_path):
+        render_pdf_page(file_path, page_index, dpi, image_path)
+    return run_tesseract(image_path)
+
 
 class OCRProvider(Enum):
     MINDEE = "mindee"
@@ -25,33 +194,225 @@ class OCRProvider(Enum):
     KLIPPA = "klippa"
 
 class OCRService:
-    def __init__(self, provider: OCRProvider = OCRProvider.MINDEE):
+    def __init__(
+        self,
+        provider: OCRProvider = OCRProvider.MINDEE,
+        cache: Optional[OCRResultCache] = None,
+        http_client: Optional[ProviderHTTPClient] = None,
+        cpu_pool: Optional[CPUWorkerPool] = None,
+        page_cache: Optional[PageImageCache] = None,
+        fallback_providers: Optional[List[OCRProvider]] = None
+    ):
         self.provider = provider
+        # Ordered provider chain: primary first, hedged/fallback calls go to the rest
+        providers = [provider] + [p for p in (fallback_providers or []) if p != provider]
+        self.chain = ProviderChain(providers)
+        # Process pool for Tesseract + image decoding (threads when not given)
+        self.cpu_pool = cpu_pool
+        # Rendered PDF pages, reused when the same PDF is OCR'd again
+        self.page_cache = page_cache
+        # Pooled async client with per-provider timeouts, retries and concurrency limits
+        self.http_client = http_client or ProviderHTTPClient()
         self.mindee_api_key = os.getenv("MINDEE_API_KEY")
         self.veryfi_api_key = os.getenv("VERYFI_API_KEY")
         self.klippa_api_key = os.getenv("KLIPPA_API_KEY")
+        # Base URLs can point elsewhere, e.g. at the local stand-ins in benchmarks/provider_stubs.py
+        self.mindee_api_url = os.getenv("MINDEE_API_URL", "https://api.mindee.net").rstrip("/")
+        self.veryfi_api_url = os.getenv("VERYFI_API_URL", "https://api.veryfi.com").rstrip("/")
+        self.klippa_api_url = os.getenv("KLIPPA_API_URL", "https://custom-ocr.klippa.com").rstrip("/")
+        # Results keyed by (file SHA-256, provider, document type, parser version)
+        self.cache = cache
+        # Images: OCR header/footer regions first (OCR_ROI_ENABLED), full page as fallback
+        self.roi_enabled = OCR_ROI_ENABLED
+        self.roi_stats = {"regions": 0, "full_page": 0}
+    
+    async def aclose(self):
+        """Release pooled provider connections"""
+        await self.http_client.aclose()
+    
+    async def _read_upload(self, file_path: str, field: str) -> Dict[str, Any]:
+        """Multipart payload for provider APIs (bytes, so retries can resend it)"""
+        content = await asyncio.to_thread(Path(file_path).read_bytes)
+        return {field: (Path(file_path).name, content)}
+    
+    def _cache_key(self, file_sha256: str, document_type: str) -> str:
+        chain = ",".join(p.value for p in self.chain.providers)
+        return OCRResultCache.make_key(file_sha256, chain, document_type, PARSER_VERSION)
+    
+    async def get_cached_classification(self, file_sha256: Optional[str]) -> Optional[str]:
+        """Document type previously determined for this exact file, if cached"""
+        if self.cache is None or not file_sha256:
+            return None
+        cached = await self.cache.aget(
+            OCRResultCache.make_key(file_sha256, "classification", PARSER_VERSION), file_sha256
+        )
+        return cached.get("document_type") if cached else None
+    
+    async def get_cached_result(self, file_sha256: Optional[str], document_type: str) -> Optional[Dict[str, Any]]:
+        """Previously extracted data for this exact file and document type, if cached"""
+        if self.cache is None or not file_sha256:
+            return None
+        return await self.cache.aget(self._cache_key(file_sha256, document_type), file_sha256)
+    
+    async def cache_classification(self, file_sha256: Optional[str], document_type: str):
+        """Remember the document type of this exact file"""
+        if self.cache is None or not file_sha256 or document_type == 'unknown':
+            return
+        await self.cache.aput(
+            OCRResultCache.make_key(file_sha256, "classification", PARSER_VERSION),
+            {"document_type": document_type},
+            file_sha256
+        )
+    
+    async def purge_cached(self, file_sha256: str):
+        """Drop every cached result and rendered page of a file (its last owner deleted it)"""
+        if self.cache is not None:
+            await self.cache.apurge(file_sha256)
+        if self.page_cache is not None:
+            await asyncio.to_thread(self.page_cache.purge, file_sha256)
+    
+    async def _run_cpu(self, func, *args):
+        """Tesseract, PIL decoding and PDF rendering are CPU-bound - keep them off the event loop"""
+        if self.cpu_pool is not None:
+            return await self.cpu_pool.run(func, *args)
+        return await asyncio.to_thread(func, *args)
+    
+    async def run_ocr(self, file_path: str, file_sha256: Optional[str] = None) -> Optional[OCRResult]:
+        """
+        Run one local Tesseract pass over a document
+        The result can be shared by classify_document and process_document
+        Returns None when Tesseract is not installed
+        """
+        if PDF_AVAILABLE and is_pdf(file_path):
+            return await self._run_pdf_ocr(file_path, file_sha256)
+        
+        if not TESSERACT_AVAILABLE:
+            return None
+        
+        if self.roi_enabled and Path(file_path).suffix.lower() in IMAGE_EXTENSIONS:
+            result = await self._run_cpu(run_roi_tesseract, file_path)
+            self.roi_stats["regions" if result.regions else "full_page"] += 1
+            return result
+        
+        return await self._run_cpu(run_tesseract, file_path)
     
-    async def process_document(self, file_path: str, document_type: str = "invoice") -> Dict[str, Any]:
+    async def _run_pdf_ocr(self, file_path: str, file_sha256: Optional[str]) -> Optional[OCRResult]:
+        """
+        OCR a PDF page by page
+        
+        - Pages with a text layer use it directly (no OCR)
+        - Scanned pages are rendered and OCR'd in parallel, one window of
+          pages at a time; remaining pages are skipped once all
+          REQUIRED_FIELDS were found
+        - Rendered pages are kept in the page cache (keyed by file digest)
+        """
+        texts = await self._run_cpu(pdf_page_texts, file_path)
+        pages: List[Optional[OCRResult]] = [
+            OCRResult.from_text_layer(text) if has_text_layer(text) else None
+            for text in texts
+        ]
+        scanned = [index for index, page in enumerate(pages) if page is None]
+        
+        if scanned and TESSERACT_AVAILABLE:
+            use_cache = self.page_cache is not None and file_sha256
+            render_dir = None if use_cache else tempfile.mkdtemp(prefix="taxa_pdf_")
+            window = self.cpu_pool.workers if self.cpu_pool is not None and self.cpu_pool.enabled else 2
+            
+            try:
+                for start in range(0, len(scanned), window):
+                    found = extract_fields(
+                        '\n\n'.join(page.text for page in pages if page is not None)
+                    )
+                    if all(field in found for field in REQUIRED_FIELDS):
+                        logger.info(f"Early exit: skipped OCR of {len(scanned) - start} PDF pages")
+                        break
+                    
+                    batch = scanned[start:start + window]
+                    results = await asyncio.gather(*(
+                        self._run_cpu(
+                            ocr_pdf_page, file_path, index, PDF_RENDER_DPI,
+                            self.page_cache.page_path(file_sha256, index, PDF_RENDER_DPI) if use_cache
+                            else os.path.join(render_dir, f"page-{index + 1:04d}.png")
+                        )
+                        for index in batch
+                    ))
+                    for index, result in zip(batch, results):
+                        pages[index] = result
+            finally:
+                if render_dir:
+                    shutil.rmtree(render_dir, ignore_errors=True)
+                elif use_cache:
+                    self.page_cache.touch(file_sha256, PDF_RENDER_DPI)
+                    self.page_cache.prune()
+        
+        done = [page for page in pages if page is not None]
+        return OCRResult.merge(done) if done else None
+    
+    async def process_document(
+        self,
+        file_path: str,
+        document_type: str = "invoice",
+        ocr_result: Optional[OCRResult] = None,
+        file_sha256: Optional[str] = None,
+        check_cache: bool = True
+    ) -> Dict[str, Any]:
         """
         Process document using selected OCR provider
         
         Args:
             file_path: Path to the document file
             document_type: Type of document (invoice, receipt, tax_form, etc.)
+            ocr_result: Tesseract result from run_ocr, reused instead of running OCR again
+            file_sha256: Digest of the file; enables the result cache
+            check_cache: False when the caller already looked the result up
         
         Returns:
             Extracted data as dictionary
         """
-        if self.provider == OCRProvider.MINDEE:
+        if check_cache:
+            cached = await self.get_cached_result(file_sha256, document_type)
+            if cached is not None:
+                return cached
+        
+        result = await self._process_uncached(file_path, document_type, ocr_result)
+        
+        if self.cache is not None and file_sha256:
+            await self.cache.aput(self._cache_key(file_sha256, document_type), result, file_sha256)
+        
+        return result
+    
+    async def _process_uncached(
+        self,
+        file_path: str,
+        document_type: str,
+        ocr_result: Optional[OCRResult]
+    ) -> Dict[str, Any]:
+        """Run the provider chain (hedged requests + fallback, first good result wins)"""
+        provider, result = await self.chain.run(
+            lambda p: self._process_with_provider(p, file_path, document_type, ocr_result),
+            is_good=bool
+        )
+        result["ocr_provider"] = provider.value
+        return result
+    
+    async def _process_with_provider(
+        self,
+        provider: OCRProvider,
+        file_path: str,
+        document_type: str,
+        ocr_result: Optional[OCRResult]
+    ) -> Dict[str, Any]:
+        """Dispatch to a single provider"""
+        if provider == OCRProvider.MINDEE:
             return await self._process_with_mindee(file_path, document_type)
-        elif self.provider == OCRProvider.TESSERACT:
-            return await self._process_with_tesseract(file_path)
-        elif self.provider == OCRProvider.VERYFI:
+        elif provider == OCRProvider.TESSERACT:
+            return await self._process_with_tesseract(file_path, ocr_result)
+        elif provider == OCRProvider.VERYFI:
             return await self._process_with_veryfi(file_path)
-        elif self.provider == OCRProvider.KLIPPA:
+        elif provider == OCRProvider.KLIPPA:
             return await self._process_with_klippa(file_path)
         else:
-            raise ValueError(f"Unsupported OCR provider: {self.provider}")
+            raise ValueError(f"Unsupported OCR provider: {provider}")
     
     async def _process_with_mindee(self, file_path: str, document_type: str) -> Dict[str, Any]:
         """
@@ -63,22 +424,20 @@ class OCRService:
         
         # Mindee API endpoints for different document types
         endpoints = {
-            "invoice": "https://api.mindee.net/v1/products/mindee/invoices/v4/predict",
-            "receipt": "https://api.mindee.net/v1/products/mindee/expense_receipts/v5/predict",
-            "tax_form": "https://api.mindee.net/v1/products/mindee/financial_document/v1/predict"
+            "invoice": f"{self.mindee_api_url}/v1/products/mindee/invoices/v4/predict",
+            "receipt": f"{self.mindee_api_url}/v1/products/mindee/expense_receipts/v5/predict",
+            "tax_form": f"{self.mindee_api_url}/v1/products/mindee/financial_document/v1/predict"
         }
         
         endpoint = endpoints.get(document_type, endpoints["invoice"])
         
-        with open(file_path, 'rb') as file:
-            files = {'document': file}
-            headers = {'Authorization': f'Token {self.mindee_api_key}'}
-            
-            response = requests.post(endpoint, files=files, headers=headers)
-            response.raise_for_status()
-            
-            data = response.json()
-            return self._parse_mindee_response(data, document_type)
+        files = await self._read_upload(file_path, 'document')
+        headers = {'Authorization': f'Token {self.mindee_api_key}'}
+        
+        response = await self.http_client.post('mindee', endpoint, files=files, headers=headers)
+        
+        data = response.json()
+        return self._parse_mindee_response(data, document_type)
     
     def _parse_mindee_response(self, data: Dict, document_type: str) -> Dict[str, Any]:
         """Parse Mindee API response into standardized format"""
@@ -124,7 +483,7 @@ class OCRService:
         
         return {"raw_data": prediction}
     
-    async def _process_with_tesseract(self, file_path: str) -> Dict[str, Any]:
+    async def _process_with_tesseract(self, file_path: str, ocr_result: Optional[OCRResult] = None) -> Dict[str, Any]:
         """
         Process document with Tesseract OCR (open-source)
         Good for basic text extraction, requires additional ML for structured data
@@ -133,51 +492,33 @@ class OCRService:
             raise ValueError("Tesseract is not available. Please use Mindee provider instead.")
         
         try:
-            image = Image.open(file_path)
-            
-            # Extract text
-            text = pytesseract.image_to_string(image, lang='slk+eng')  # Slovak + English
+            if ocr_result is None:
+                ocr_result = await self.run_ocr(file_path)
             
-            # Extract structured data using pytesseract
-            data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
-            
-            # Basic parsing (you can add ML model here for better extraction)
-            return {
+            fields = extract_fields(ocr_result.text)
+            result = {
                 "document_type": "unknown",
-                "raw_text": text,
-                "confidence": self._calculate_tesseract_confidence(data),
-                "extracted_data": self._extract_structured_data(text)
+                "raw_text": ocr_result.text,
+                "words": ocr_result.words,
+                # 0-1 scale, same as Mindee (Document.confidence stores percent)
+                "confidence": ocr_result.confidence / 100,
+                "extracted_data": serialize_fields(fields)
             }
+            # Same top-level keys as the Mindee schema, used by tax aggregation
+            if "total_amount" in fields:
+                result["total_amount"] = float(fields["total_amount"])
+            if "total_vat" in fields:
+                result["total_tax"] = float(fields["total_vat"])
+            return result
         except Exception as e:
             raise ValueError(f"Tesseract processing failed: {str(e)}")
     
-    def _calculate_tesseract_confidence(self, data: Dict) -> float:
-        """Calculate average confidence from Tesseract output"""
-        confidences = [int(conf) for conf in data['conf'] if conf != '-1']
-        return sum(confidences) / len(confidences) if confidences else 0
-    
     def _extract_structured_data(self, text: str) -> Dict[str, Any]:
         """
-        Basic structured data extraction from text
-        In production, use ML model or regex patterns for better accuracy
+        Structured data extraction from OCR text (see services/field_extraction.py)
+        Amounts are returned as exact decimal strings so they survive JSON storage
         """
-        import re
-        
-        # Simple regex patterns for common fields
-        patterns = {
-            'invoice_number': r'(?:Invoice|Faktúra|č\.|No\.?)\s*:?\s*([A-Z0-9-]+)',
-            'date': r'(\d{1,2}[./-]\d{1,2}[./-]\d{2,4})',
-            'total': r'(?:Total|Celkom|Spolu)\s*:?\s*€?\s*([\d,]+\.?\d*)',
-            'tax': r'(?:VAT|DPH)\s*:?\s*€?\s*([\d,]+\.?\d*)'
-        }
-        
-        extracted = {}
-        for field, pattern in patterns.items():
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                extracted[field] = match.group(1)
-        
-        return extracted
+        return serialize_fields(extract_fields(text))
     
     async def _process_with_veryfi(self, file_path: str) -> Dict[str, Any]:
         """
@@ -189,19 +530,17 @@ class OCRService:
         
         # Veryfi API implementation
         # https://docs.veryfi.com/
-        url = "https://api.veryfi.com/api/v8/partner/documents"
+        url = f"{self.veryfi_api_url}/api/v8/partner/documents"
         
-        with open(file_path, 'rb') as file:
-            files = {'file': file}
-            headers = {
-                'CLIENT-ID': os.getenv('VERYFI_CLIENT_ID'),
-                'AUTHORIZATION': f'apikey {self.veryfi_api_key}'
-            }
-            
-            response = requests.post(url, files=files, headers=headers)
-            response.raise_for_status()
-            
-            return response.json()
+        files = await self._read_upload(file_path, 'file')
+        headers = {
+            'CLIENT-ID': os.getenv('VERYFI_CLIENT_ID'),
+            'AUTHORIZATION': f'apikey {self.veryfi_api_key}'
+        }
+        
+        response = await self.http_client.post('veryfi', url, files=files, headers=headers)
+        
+        return response.json()
     
     async def _process_with_klippa(self, file_path: str) -> Dict[str, Any]:
         """
@@ -213,41 +552,41 @@ class OCRService:
         
         # Klippa API implementation
         # https://custom-ocr.klippa.com/api/v1/parseDocument
-        url = "https://custom-ocr.klippa.com/api/v1/parseDocument"
+        url = f"{self.klippa_api_url}/api/v1/parseDocument"
         
-        with open(file_path, 'rb') as file:
-            files = {'document': file}
-            headers = {'X-Auth-Key': self.klippa_api_key}
-            
-            response = requests.post(url, files=files, headers=headers)
-            response.raise_for_status()
-            
-            return response.json()
+        files = await self._read_upload(file_path, 'document')
+        headers = {'X-Auth-Key': self.klippa_api_key}
+        
+        response = await self.http_client.post('klippa', url, files=files, headers=headers)
+        
+        return response.json()
 
 # Helper function for document classification
-async def classify_document(file_path: str) -> str:
+async def classify_document(file_path: str, ocr_result: Optional[OCRResult] = None) -> str:
     """
-    Classify document type using basic OCR
+    Classify document type with the local n-gram + layout classifier
+    (services/document_classifier.py); keyword matching if no model is available
+    Pass ocr_result from OCRService.run_ocr (CPU pool); Tesseract is never run here
+    Without any text (Tesseract missing or failed, no PDF text layer) the page shape still counts
     Returns: 'invoice', 'receipt', 'contract', 'tax_form', 'other'
     """
     
     try:
-        # If tesseract not available, return 'other' as fallback
-        if not TESSERACT_AVAILABLE:
-            return 'other'
-        
-        image = Image.open(file_path)
-        text = pytesseract.image_to_string(image, lang='slk+eng').lower()
-        
-        if any(word in text for word in ['faktúra', 'invoice', 'faktura']):
-            return 'invoice'
-        elif any(word in text for word in ['pokladničný', 'receipt', 'účtenka']):
-            return 'receipt'
-        elif any(word in text for word in ['daňové priznanie', 'tax return', 'danove priznanie']):
-            return 'tax_form'
-        elif any(word in text for word in ['zmluva', 'contract', 'dohoda']):
-            return 'contract'
-        else:
-            return 'other'
-    except:
+        text = ocr_result.text if ocr_result is not None else ""
+        
+        classifier = get_classifier()
+        if classifier is None:
+            return keyword_classify(text) if ocr_result is not None else 'other'
+        
+        page_size = None
+        if Path(file_path).suffix.lower() in IMAGE_EXTENSIONS:
+            with Image.open(file_path) as image:  # Reads the header only
+                page_size = image.size
+        elif ocr_result is not None and ocr_result.words:
+            page_size = page_size_from_words(ocr_result.words)
+        
+        document_type, _ = classifier.predict(text, page_size)
+        return document_type
+    except Exception as e:
+        logger.warning(f"Classification failed for {file_path}: {e}")
         return 'unknown'
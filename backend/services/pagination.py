@@ -0,0 +1,39 @@
+"""
+Keyset Pagination
+Opaque cursors for lists ordered by (uploaded_at, id), newest first
+
+A cursor encodes the sort key of the last row on a page; the next page
+continues strictly below it. Unlike OFFSET, every page is a bounded index
+range scan, and rows uploaded meanwhile neither shift nor repeat entries.
+"""
+
+import base64
+from datetime import datetime
+from typing import Tuple
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(uploaded_at: datetime, row_id: int) -> str:
+    raw = f"{uploaded_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """(uploaded_at, id); ValueError for anything encode_cursor did not produce"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        timestamp, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def before_cursor(timestamp_column, id_column, cursor: str):
+    """WHERE clause for rows after the cursor in (timestamp DESC, id DESC) order"""
+    timestamp, row_id = decode_cursor(cursor)
+    # The leading <= bounds the index range; the OR breaks ties on equal timestamps
+    return and_(
+        timestamp_column <= timestamp,
+        or_(timestamp_column < timestamp, id_column < row_id)
+    )
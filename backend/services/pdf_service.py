@@ -0,0 +1,124 @@
+"""
+PDF Service
+Text-layer extraction and page rasterization for PDF documents
+"""
+
+import os
+import shutil
+import logging
+import threading
+from pathlib import Path
+from typing import List
+
+# Make pypdfium2 optional, like pytesseract
+try:
+    import pypdfium2 as pdfium
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+    pdfium = None
+
+logger = logging.getLogger(__name__)
+
+# A page with fewer non-whitespace characters is treated as a scan and OCR'd
+PDF_TEXT_LAYER_MIN_CHARS = int(os.getenv("PDF_TEXT_LAYER_MIN_CHARS", "20"))
+
+
+def is_pdf(file_path: str) -> bool:
+    """Check PDF magic bytes (extension alone is not trusted)"""
+    try:
+        with open(file_path, 'rb') as f:
+            return f.read(5) == b'%PDF-'
+    except OSError:
+        return False
+
+
+def pdf_page_texts(file_path: str) -> List[str]:
+    """
+    Text layer of every page (blocking)
+    Pages without an embedded text layer return an empty string
+    """
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        texts = []
+        for index in range(len(pdf)):
+            page = pdf[index]
+            text_page = page.get_textpage()
+            texts.append(text_page.get_text_range())
+            text_page.close()
+            page.close()
+        return texts
+    finally:
+        pdf.close()
+
+
+def has_text_layer(text: str) -> bool:
+    return len(''.join(text.split())) >= PDF_TEXT_LAYER_MIN_CHARS
+
+
+def render_pdf_page(file_path: str, page_index: int, dpi: int, destination: str) -> str:
+    """Rasterize one page to a grayscale PNG (blocking, CPU-bound)"""
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        page = pdf[page_index]
+        bitmap = page.render(scale=dpi / 72, grayscale=True)
+        image = bitmap.to_pil()
+        tmp_path = destination + f".{os.getpid()}.tmp"
+        image.save(tmp_path, 'PNG')
+        os.replace(tmp_path, destination)
+        page.close()
+        return destination
+    finally:
+        pdf.close()
+
+
+class PageImageCache:
+    """
+    Rendered PDF page images, keyed by file SHA-256 and DPI
+
+    Re-classification or re-OCR of the same PDF reuses the rendered pages
+    instead of rasterizing again. Whole documents are evicted, oldest first,
+    once the cache exceeds max_bytes (PDF_PAGE_CACHE_MAX_MB).
+    """
+
+    def __init__(self, directory: str = None, max_bytes: int = None):
+        self.directory = Path(directory or os.getenv("PDF_PAGE_CACHE_DIR", "page_cache"))
+        self.max_bytes = max_bytes or int(os.getenv("PDF_PAGE_CACHE_MAX_MB", "512")) * 1024 * 1024
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def page_path(self, file_sha256: str, page_index: int, dpi: int) -> str:
+        document_dir = self.directory / f"{file_sha256}_{dpi}"
+        document_dir.mkdir(exist_ok=True)
+        return str(document_dir / f"page-{page_index + 1:04d}.png")
+
+    def touch(self, file_sha256: str, dpi: int):
+        """Mark a document as recently used"""
+        try:
+            os.utime(self.directory / f"{file_sha256}_{dpi}", None)
+        except OSError:
+            pass
+
+    def purge(self, file_sha256: str):
+        """Remove a document's rendered pages at every DPI"""
+        with self._lock:
+            for document_dir in self.directory.glob(f"{file_sha256}_*"):
+                shutil.rmtree(document_dir, ignore_errors=True)
+
+    def prune(self):
+        """Evict least recently used documents until under max_bytes"""
+        with self._lock:
+            documents = []
+            total = 0
+            for document_dir in self.directory.iterdir():
+                if not document_dir.is_dir():
+                    continue
+                size = sum(f.stat().st_size for f in document_dir.iterdir() if f.is_file())
+                documents.append((document_dir.stat().st_mtime, document_dir, size))
+                total += size
+
+            for _, document_dir, size in sorted(documents):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(document_dir, ignore_errors=True)
+                total -= size
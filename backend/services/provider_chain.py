@@ -0,0 +1,172 @@
+"""
+OCR Provider Chain
+Ordered provider fallback with hedged requests and rolling latency/error stats
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _name(provider: Any) -> str:
+    """Display name of a provider (enum value or plain string)"""
+    return str(getattr(provider, "value", provider))
+
+
+class ProviderStats:
+    """Rolling latency and error statistics for one provider"""
+
+    def __init__(self, window: int = 100):
+        self.latencies = deque(maxlen=window)  # Seconds, successful calls only
+        self.outcomes = deque(maxlen=window)   # True = success, False = error
+        self.hedges = 0  # Times a hedge was started because this provider was slow
+        self.wins = 0    # Times this provider delivered the result
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+
+    def record_error(self):
+        self.outcomes.append(False)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        p50 = self.percentile(50)
+        p95 = self.percentile(95)
+        return {
+            "samples": len(self.outcomes),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "hedges": self.hedges,
+            "wins": self.wins
+        }
+
+
+class ProviderChain:
+    """
+    Runs a call against an ordered list of providers
+
+    - The first provider in the current order is called
+    - If it has not answered within its latency budget (rolling p95, or
+      OCR_HEDGE_DEFAULT_SECONDS until enough samples exist), the next
+      provider is started in parallel (hedged request)
+    - If a provider fails, the next one is started right away
+    - The first good result wins; the other calls are cancelled
+    - Providers whose rolling error rate exceeds OCR_PROVIDER_DEMOTE_ERROR_RATE
+      are moved to the end of the order until they recover
+    """
+
+    def __init__(
+        self,
+        providers: List[Any],
+        default_budget: float = None,
+        min_budget: float = None,
+        min_samples: int = 5,
+        demote_error_rate: float = None
+    ):
+        if not providers:
+            raise ValueError("Provider chain needs at least one provider")
+        self.providers = list(providers)
+        self.default_budget = default_budget or float(os.getenv("OCR_HEDGE_DEFAULT_SECONDS", "10"))
+        self.min_budget = min_budget or float(os.getenv("OCR_HEDGE_MIN_SECONDS", "0.5"))
+        self.min_samples = min_samples
+        self.demote_error_rate = demote_error_rate or float(os.getenv("OCR_PROVIDER_DEMOTE_ERROR_RATE", "0.5"))
+        self.stats = {provider: ProviderStats() for provider in self.providers}
+
+    def budget(self, provider: Any) -> float:
+        """Seconds to wait for provider before hedging"""
+        stats = self.stats[provider]
+        if len(stats.latencies) < self.min_samples:
+            return self.default_budget
+        return max(self.min_budget, stats.percentile(95))
+
+    def ordered(self) -> List[Any]:
+        """Configured order, with unhealthy providers demoted to the end"""
+        def unhealthy(provider):
+            stats = self.stats[provider]
+            return len(stats.outcomes) >= self.min_samples and stats.error_rate >= self.demote_error_rate
+        return sorted(self.providers, key=unhealthy)  # Stable: keeps configured order otherwise
+
+    async def run(
+        self,
+        call: Callable[[Any], Awaitable[Any]],
+        is_good: Callable[[Any], bool] = lambda result: True
+    ):
+        """
+        Run call(provider) with hedging/fallback
+
+        Returns (provider, result) of the first good result.
+        Raises the last error if every provider failed.
+        """
+        order = self.ordered()
+        pending: Dict[asyncio.Task, Any] = {}
+        started: Dict[Any, float] = {}
+        last_error: Optional[BaseException] = None
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            provider = order[next_index]
+            next_index += 1
+            started[provider] = time.monotonic()
+            pending[asyncio.create_task(call(provider))] = provider
+            return provider
+
+        current = launch()
+        try:
+            while pending:
+                timeout = self.budget(current) if next_index < len(order) else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Slowest acceptable time exceeded - hedge with the next provider
+                    self.stats[current].hedges += 1
+                    logger.info(f"OCR provider {_name(current)} exceeded {timeout:.2f}s budget, hedging")
+                    current = launch()
+                    continue
+
+                for task in done:
+                    provider = pending.pop(task)
+                    latency = time.monotonic() - started[provider]
+                    error = task.exception()
+                    if error is None and is_good(task.result()):
+                        self.stats[provider].record_success(latency)
+                        self.stats[provider].wins += 1
+                        return provider, task.result()
+
+                    self.stats[provider].record_error()
+                    last_error = error or ValueError(f"{_name(provider)} returned an unusable result")
+                    logger.warning(f"OCR provider {_name(provider)} failed after {latency:.2f}s: {last_error}")
+
+                    # Latest provider failed - fall back to the next one immediately
+                    if provider == current and next_index < len(order):
+                        current = launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise last_error
+
+    def stats_dict(self) -> Dict[str, Any]:
+        return {
+            "order": [_name(provider) for provider in self.ordered()],
+            "providers": {_name(provider): stats.to_dict() for provider, stats in self.stats.items()}
+        }
@@ -0,0 +1,233 @@
+"""
+Tax Year Totals
+Per-user, per-year sums of income, expenses and VAT kept next to the documents
+
+calculate_tax_return reads one tax_year_totals row instead of loading every
+document of the year. Each change to what a document counts for is applied
+as a difference in the same transaction as the change itself:
+- upload (e-invoices are complete right away)
+- OCR result stored, also when a document is OCRed again
+- dead-lettered after the last failed attempt
+- account deletion removes the rows together with the documents
+
+A document counts for the year it was uploaded in (as the tax year
+document list does): invoices as income, receipts as expenses, everything
+else and likely duplicates only as counts. Credit notes (invoice_type
+"credit_note") are invoices that reduce income and its VAT.
+
+Rebuild the rows from the documents (from backend/):
+    python -m services.tax_totals --rebuild [--user-id N]
+"""
+
+import logging
+import argparse
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, update
+
+logger = logging.getLogger(__name__)
+
+AMOUNT_COLUMNS = ("income", "expenses", "income_vat", "expense_vat")
+COUNT_COLUMNS = ("invoice_count", "receipt_count", "other_count", "duplicate_count")
+
+# DocumentStatus.PROCESSED; NULL for documents stored before the OCR queue existed
+COUNTED_STATUSES = ("processed", None)
+
+# document_type -> (amount column, VAT column, count column)
+CATEGORIES = {
+    "invoice": ("income", "income_vat", "invoice_count"),
+    "receipt": ("expenses", "expense_vat", "receipt_count"),
+}
+
+Contribution = Optional[Tuple[int, Dict[str, Any]]]
+
+
+def _field(data: Dict[str, Any], name: str) -> Any:
+    nested = data.get("extracted_data")
+    return data.get(name) or (nested.get(name) if isinstance(nested, dict) else None)
+
+
+def _amount(data: Dict[str, Any], *names: str) -> Decimal:
+    """First present amount field; Tesseract results keep their fields one level down"""
+    nested = data.get("extracted_data")
+    for source in (data, nested if isinstance(nested, dict) else {}):
+        for name in names:
+            if source.get(name) not in (None, ""):
+                try:
+                    return Decimal(str(source[name])).quantize(Decimal("0.01"))
+                except (InvalidOperation, ValueError, TypeError):
+                    return Decimal("0")
+    return Decimal("0")
+
+
+def document_contribution(document) -> Contribution:
+    """
+    (year, {column: value}) the document adds to its tax year, or None
+
+    Works on a Document instance or any row with its columns. Documents
+    still waiting for OCR, or dead-lettered, add nothing.
+    """
+    if document.uploaded_at is None or document.status not in COUNTED_STATUSES:
+        return None
+    year = document.uploaded_at.year
+    if document.duplicate_of_id is not None:
+        return year, {"duplicate_count": 1}
+
+    category = CATEGORIES.get(document.document_type)
+    if category is None:
+        return year, {"other_count": 1}
+    amount_column, vat_column, count_column = category
+    data = document.extracted_data if isinstance(document.extracted_data, dict) else {}
+    amount, vat = _amount(data, "total_amount"), _amount(data, "total_tax", "total_vat")
+    if _field(data, "invoice_type") == "credit_note":
+        # Subtracted whatever sign the source used (e-invoices store them negative)
+        amount, vat = -abs(amount), -abs(vat)
+    return year, {amount_column: amount, vat_column: vat, count_column: 1}
+
+
+def changes(before: Contribution, after: Contribution) -> Dict[int, Dict[str, Any]]:
+    """{year: {column: delta}} that turns the `before` contribution into `after`"""
+    deltas: Dict[int, Dict[str, Any]] = defaultdict(dict)
+    for contribution, sign in ((before, -1), (after, 1)):
+        if contribution is None:
+            continue
+        year, values = contribution
+        for column, value in values.items():
+            deltas[year][column] = deltas[year].get(column, 0) + sign * value
+    return {
+        year: {column: value for column, value in values.items() if value}
+        for year, values in deltas.items()
+        if any(values.values())
+    }
+
+
+def _dialect_name(db) -> str:
+    """Session or Connection"""
+    dialect = getattr(db, "dialect", None)
+    return (dialect or db.get_bind().dialect).name
+
+
+def apply_changes(db, totals_table, user_id: int, deltas: Dict[int, Dict[str, Any]]):
+    """
+    Add deltas to the user's rows inside the caller's transaction (sync Session or Connection)
+
+    One atomic upsert per year on PostgreSQL/SQLite, so concurrent
+    workers updating the same row cannot lose an increment.
+    """
+    dialect = _dialect_name(db)
+    now = datetime.utcnow()
+    for year, delta in deltas.items():
+        row = {column: 0 for column in AMOUNT_COLUMNS + COUNT_COLUMNS}
+        row.update(delta, user_id=user_id, year=year, updated_at=now)
+
+        if dialect in ("postgresql", "sqlite"):
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            statement = dialect_insert(totals_table).values(**row)
+            statement = statement.on_conflict_do_update(
+                index_elements=["user_id", "year"],
+                set_={
+                    **{column: totals_table.c[column] + statement.excluded[column] for column in delta},
+                    "updated_at": statement.excluded.updated_at
+                }
+            )
+            db.execute(statement)
+            continue
+
+        result = db.execute(
+            update(totals_table)
+            .where(totals_table.c.user_id == user_id, totals_table.c.year == year)
+            .values(**{column: totals_table.c[column] + value for column, value in delta.items()}, updated_at=now)
+        )
+        if result.rowcount == 0:
+            db.execute(insert(totals_table).values(**row))
+
+
+def track(db, totals_table, document, before: Contribution):
+    """Apply the change of one document since `before` (its contribution prior to the update)"""
+    deltas = changes(before, document_contribution(document))
+    if deltas:
+        apply_changes(db, totals_table, document.user_id, deltas)
+
+
+def totals_dict(row) -> Dict[str, Any]:
+    """Row (or None) as {column: value} with zeros for a year without documents"""
+    return {
+        **{column: Decimal(str(getattr(row, column) or 0)) if row is not None else Decimal("0")
+           for column in AMOUNT_COLUMNS},
+        **{column: int(getattr(row, column) or 0) if row is not None else 0 for column in COUNT_COLUMNS},
+        "updated_at": row.updated_at if row is not None else None
+    }
+
+
+def rebuild(db, documents_table, totals_table, user_id: int = None, batch_size: int = 500) -> int:
+    """
+    Recompute the rows from the documents (sync Session or Connection)
+
+    Replaces the rows of one user (or all) in the caller's transaction;
+    returns the number of rows written. Run it while the OCR queue is idle
+    so no result lands between reading the documents and writing the rows.
+    """
+    documents = documents_table.c
+    query = select(
+        documents.user_id, documents.uploaded_at, documents.status,
+        documents.document_type, documents.duplicate_of_id, documents.extracted_data
+    ).where(documents.user_id.is_not(None))
+    delete_rows = delete(totals_table)
+    if user_id is not None:
+        query = query.where(documents.user_id == user_id)
+        delete_rows = delete_rows.where(totals_table.c.user_id == user_id)
+
+    sums: Dict[Tuple[int, int], Dict[str, Any]] = defaultdict(dict)
+    for row in db.execute(query.execution_options(yield_per=batch_size)):
+        contribution = document_contribution(row)
+        if contribution is None:
+            continue
+        year, values = contribution
+        target = sums[(row.user_id, year)]
+        for column, value in values.items():
+            target[column] = target.get(column, 0) + value
+
+    db.execute(delete_rows)
+    now = datetime.utcnow()
+    rows = [
+        {
+            **{column: 0 for column in AMOUNT_COLUMNS + COUNT_COLUMNS},
+            **values,
+            "user_id": owner,
+            "year": year,
+            "updated_at": now
+        }
+        for (owner, year), values in sums.items()
+    ]
+    if rows:
+        db.execute(insert(totals_table), rows)
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-user tax year totals")
+    parser.add_argument("--rebuild", action="store_true", help="recompute tax_year_totals from the documents")
+    parser.add_argument("--user-id", type=int, help="only this user")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        from main import SessionLocal, Document, TaxYearTotals
+        db = SessionLocal()
+        try:
+            written = rebuild(db, Document.__table__, TaxYearTotals.__table__, user_id=args.user_id)
+            db.commit()
+        finally:
+            db.close()
+        print(f"Rebuilt {written} tax year row(s)")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Tesseract Engine
+Long-lived Tesseract handles so language models are loaded once per worker
+"""
+
+import os
+import logging
+import threading
+from typing import Dict, List
+
+from PIL import Image
+
+# Preferred: tesserocr talks to libtesseract directly, one API handle per
+# worker keeps the traineddata in memory between pages
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+    tesserocr = None
+
+# Fallback: pytesseract starts a tesseract process (and reloads the models) per call
+# Optional for Railway deployment
+try:
+    import pytesseract
+    PYTESSERACT_AVAILABLE = True
+except ImportError:
+    PYTESSERACT_AVAILABLE = False
+    pytesseract = None
+
+logger = logging.getLogger(__name__)
+
+# Languages loaded for every Tesseract run
+TESSERACT_LANG = 'slk+eng'  # Slovak + English
+
+# OCR_TESSERACT_PERSISTENT=false forces the pytesseract subprocess path
+PERSISTENT_ENGINE = TESSEROCR_AVAILABLE and os.getenv("OCR_TESSERACT_PERSISTENT", "true").lower() == "true"
+
+TESSERACT_AVAILABLE = PERSISTENT_ENGINE or PYTESSERACT_AVAILABLE
+
+# One handle per thread: a TessBaseAPI must not be used concurrently.
+# Worker processes run one task at a time, so each holds exactly one.
+_local = threading.local()
+
+
+def _get_api():
+    api = getattr(_local, "api", None)
+    if api is None:
+        kwargs = {"lang": TESSERACT_LANG}
+        if os.getenv("TESSDATA_PREFIX"):
+            kwargs["path"] = os.getenv("TESSDATA_PREFIX")
+        api = tesserocr.PyTessBaseAPI(**kwargs)
+        _local.api = api
+        logger.info(f"Loaded Tesseract models ({TESSERACT_LANG}) in process {os.getpid()}")
+    return api
+
+
+def warm_up():
+    """
+    Load the language models ahead of the first page
+
+    Used as the CPU pool's worker initializer, so the model load happens
+    when a worker starts rather than inside the first OCR task.
+    """
+    if PERSISTENT_ENGINE:
+        try:
+            _get_api()
+        except Exception as e:
+            logger.warning(f"Tesseract warm-up failed: {e}")
+
+
+def _image_to_data(image: Image.Image) -> Dict[str, List]:
+    """
+    Recognize one image with the persistent handle
+
+    Returns the same layout as pytesseract.image_to_data(output_type=DICT)
+    for word-level entries, so callers do not care which engine ran.
+    """
+    api = _get_api()
+    try:
+        api.SetImage(image)
+        api.Recognize()
+        return _collect_words(api)
+    finally:
+        # Release the page image and results; the loaded models stay
+        api.Clear()
+
+
+def _collect_words(api) -> Dict[str, List]:
+    data = {key: [] for key in (
+        'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+        'left', 'top', 'width', 'height', 'conf', 'text'
+    )}
+    level = tesserocr.RIL.WORD
+    iterator = api.GetIterator()
+    block = par = line = word = 0
+
+    if iterator is not None:
+        while True:
+            if iterator.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+                block, par, line, word = block + 1, 0, 0, 0
+            if iterator.IsAtBeginningOf(tesserocr.RIL.PARA):
+                par, line, word = par + 1, 0, 0
+            if iterator.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                line, word = line + 1, 0
+            word += 1
+
+            text = iterator.GetUTF8Text(level)
+            box = iterator.BoundingBox(level)
+            if text is not None and box is not None:
+                left, top, right, bottom = box
+                data['page_num'].append(1)
+                data['block_num'].append(block)
+                data['par_num'].append(par)
+                data['line_num'].append(line)
+                data['word_num'].append(word)
+                data['left'].append(left)
+                data['top'].append(top)
+                data['width'].append(right - left)
+                data['height'].append(bottom - top)
+                data['conf'].append(iterator.Confidence(level))
+                data['text'].append(text)
+
+            if not iterator.Next(level):
+                break
+
+    return data
+
+
+def image_to_data(file_path: str) -> Dict[str, List]:
+    """
+    Word boxes, confidences and text of an image file (blocking, CPU-bound)
+
+    Uses the persistent engine when tesserocr is installed, otherwise one
+    pytesseract subprocess call.
+    """
+    with Image.open(file_path) as image:
+        return recognize(image)
+
+
+def recognize(image: Image.Image) -> Dict[str, List]:
+    """image_to_data for an already decoded image (e.g. a cropped region)"""
+    if PERSISTENT_ENGINE:
+        return _image_to_data(image)
+    return pytesseract.image_to_data(image, lang=TESSERACT_LANG, output_type=pytesseract.Output.DICT)
+
+
+def engine_name() -> str:
+    if PERSISTENT_ENGINE:
+        return "tesserocr"
+    return "pytesseract" if PYTESSERACT_AVAILABLE else "unavailable"
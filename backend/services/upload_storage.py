@@ -0,0 +1,84 @@
+"""
+Upload Storage Service
+Streams uploaded files to disk in chunks while hashing them
+"""
+
+import os
+import hashlib
+from pathlib import Path
+from typing import Dict, Any
+
+from fastapi import UploadFile
+
+
+# Read uploads in 1 MB chunks - never hold a whole file in memory
+CHUNK_SIZE = 1024 * 1024
+
+# Default limit matches MAX_FILE_SIZE_MB from .env
+MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE_MB", "10")) * 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the allowed size while streaming"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        super().__init__(f"File size exceeds maximum allowed size of {max_bytes // (1024 * 1024)}MB")
+
+
+async def stream_upload_to_disk(
+    upload: UploadFile,
+    destination: Path,
+    max_bytes: int = MAX_FILE_SIZE,
+    chunk_size: int = CHUNK_SIZE
+) -> Dict[str, Any]:
+    """
+    Stream an UploadFile to disk chunk by chunk
+
+    The SHA-256 digest and byte count are computed in the same pass.
+    Data is written to a temporary ".part" file which is renamed only when
+    the whole upload was received, so a rejected or broken upload never
+    leaves a partial file behind.
+
+    Args:
+        upload: FastAPI UploadFile
+        destination: Final path of the stored file
+        max_bytes: Size limit enforced while streaming
+        chunk_size: Bytes read per chunk
+
+    Returns:
+        {"path": str, "sha256": hex digest, "size": bytes written}
+
+    Raises:
+        UploadTooLargeError: if the upload is larger than max_bytes
+    """
+    digest = hashlib.sha256()
+    size = 0
+    partial_path = destination.with_name(destination.name + ".part")
+
+    try:
+        with open(partial_path, "wb") as f:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+
+                digest.update(chunk)
+                f.write(chunk)
+
+        os.replace(partial_path, destination)
+    except BaseException:
+        # Never keep partial uploads
+        if partial_path.exists():
+            partial_path.unlink()
+        raise
+
+    return {
+        "path": str(destination),
+        "sha256": digest.hexdigest(),
+        "size": size
+    }
@@ -0,0 +1,118 @@
+"""Tests run from backend/ and import services.* and benchmarks/ scripts as modules"""
+
+import os
+import sys
+import importlib
+from types import SimpleNamespace
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+
+@pytest.fixture
+def pipeline():
+    """Stand-in for DocumentPipeline: the limits and counters DocumentQueue reads"""
+    return SimpleNamespace(max_per_request=4, max_per_process=8, in_flight=0, avg_seconds=None, einvoices=0)
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """
+    main imported against a scratch SQLite database
+
+    main creates uploads/ and the OCR cache relative to the working
+    directory, so the import runs in a temporary one.
+    """
+    workdir = tmp_path_factory.mktemp("app")
+    previous = os.getcwd()
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'taxa.db'}"
+    os.environ["DB_AUTO_MIGRATE"] = "true"
+    os.chdir(workdir)
+    try:
+        yield importlib.import_module("main")
+    finally:
+        os.chdir(previous)
+
+
+@pytest.fixture
+def client(app_module):
+    from fastapi.testclient import TestClient
+    return TestClient(app_module.app)
+
+
+@pytest.fixture
+def make_user(app_module):
+    """make_user(email) -> (user id, Authorization headers)"""
+
+    def make(email: str):
+        db = app_module.SessionLocal()
+        try:
+            user = app_module.User(name=email, email=email, hashed_password="-")
+            db.add(user)
+            db.commit()
+            user_id = user.id
+        finally:
+            db.close()
+        token = app_module.create_access_token({"sub": email})
+        return user_id, {"Authorization": f"Bearer {token}"}
+
+    return make
+
+
+@pytest.fixture
+def add_document(app_module):
+    """add_document(user_id, **columns) -> Document id (a processed invoice unless overridden)"""
+
+    def add(user_id: int, **columns):
+        values = {
+            "filename": "invoice.pdf", "file_path": "uploads/invoice.pdf",
+            "status": "processed", "document_type": "invoice", "extracted_data": {}
+        }
+        values.update(columns)
+        db = app_module.SessionLocal()
+        try:
+            document = app_module.Document(user_id=user_id, **values)
+            db.add(document)
+            db.commit()
+            return document.id
+        finally:
+            db.close()
+
+    return add
+
+
+@pytest.fixture
+def totals(app_module):
+    """
+    totals.rebuild(user_id): recompute the user's tax_year_totals rows
+    totals.checked(user_id): the rows, asserted equal to a fresh rebuild
+    """
+    from sqlalchemy import select
+    from services import tax_totals
+
+    documents, table = app_module.Document.__table__, app_module.TaxYearTotals.__table__
+
+    def rebuild(user_id: int):
+        with app_module.engine.begin() as connection:
+            tax_totals.rebuild(connection, documents, table, user_id=user_id)
+
+    def read(connection, user_id: int):
+        rows = connection.execute(select(table).where(table.c.user_id == user_id).order_by(table.c.year))
+        return [
+            {column: value for column, value in tax_totals.totals_dict(row).items() if column != "updated_at"}
+            for row in rows
+        ]
+
+    def checked(user_id: int):
+        with app_module.engine.connect() as connection:
+            kept = read(connection, user_id)
+            tax_totals.rebuild(connection, documents, table, user_id=user_id)
+            rebuilt = read(connection, user_id)
+            connection.rollback()
+        assert kept == rebuilt
+        return kept
+
+    return SimpleNamespace(rebuild=rebuild, checked=checked)
@@ -0,0 +1,25 @@
+"""DELETE /api/gdpr/delete-account removes cached OCR data of the user's files"""
+
+from services.ocr_cache import OCRResultCache
+
+
+def test_deletion_purges_cached_ocr_of_files_nobody_else_has(app_module, client, make_user, add_document):
+    cache = app_module.ocr_cache
+    page_cache = app_module.ocr_service.page_cache
+    own, shared = "1" * 64, "2" * 64
+    user_id, headers = make_user("leaving@example.com")
+    other_id, _ = make_user("staying@example.com")
+    add_document(user_id, file_sha256=own)
+    add_document(user_id, file_sha256=shared)
+    add_document(other_id, file_sha256=shared)
+    for digest in (own, shared):
+        cache.put(OCRResultCache.make_key(digest, "classification"), {"document_type": "receipt"}, digest)
+    page = page_cache.page_path(own, 0, 200)
+    open(page, "wb").close()
+
+    response = client.delete("/api/gdpr/delete-account", headers=headers)
+    assert response.status_code == 200, response.text
+
+    assert cache.get(OCRResultCache.make_key(own, "classification"), own) is None
+    assert cache.get(OCRResultCache.make_key(shared, "classification"), shared) == {"document_type": "receipt"}
+    assert not list(page_cache.directory.glob(f"{own}_*"))
@@ -0,0 +1,50 @@
+"""CPUWorkerPool: process slots, thread fallback and worker recycling"""
+
+import asyncio
+import operator
+
+import pytest
+
+from services.cpu_pool import CPUWorkerPool
+
+
+def test_pool_built_outside_the_loop_runs_contended_tasks():
+    # Built like main.py does at import, before any event loop runs
+    pool = CPUWorkerPool(workers=1, max_tasks_per_worker=2)
+
+    async def run_all():
+        return await asyncio.gather(*(pool.run(operator.add, number, 1) for number in range(5)))
+
+    try:
+        assert asyncio.run(run_all()) == [1, 2, 3, 4, 5]
+    finally:
+        pool.shutdown()
+    assert pool.completed == 5
+
+
+def test_disabled_pool_runs_in_a_thread():
+    pool = CPUWorkerPool(workers=0)
+    assert not pool.enabled
+    assert asyncio.run(pool.run(operator.mul, 6, 7)) == 42
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_executor_is_recycled_after_its_task_budget(workers, monkeypatch):
+    pool = CPUWorkerPool(workers=workers, max_tasks_per_worker=2)
+    created = []
+
+    class FakeExecutor:
+        def __init__(self, **options):
+            created.append(options)
+
+        def shutdown(self, wait=True, cancel_futures=False):
+            pass
+
+    monkeypatch.setattr("services.cpu_pool.ProcessPoolExecutor", FakeExecutor)
+    monkeypatch.setattr("services.cpu_pool.sys.version_info", (3, 9, 18))
+    for _ in range(workers * 2 + 1):
+        pool._get_executor()
+    # Python 3.9: no max_tasks_per_child, the pool itself is replaced
+    assert len(created) == 2
+    assert "max_tasks_per_child" not in created[0]
+    assert pool.restarts == 1
@@ -0,0 +1,81 @@
+"""Duplicate keys, original lookup and the "not a duplicate" endpoint"""
+
+from PIL import Image, ImageDraw
+
+from services.dedup import dedup_key, find_duplicate, find_similar, perceptual_hash
+
+
+def test_dedup_key_normalizes_supplier_number_and_total():
+    pdf = {"supplier_ico": "12 345 678", "invoice_number": "FV-2025/42", "total_amount": "120.5"}
+    # Tesseract keeps its fields one level down
+    photo = {"extracted_data": {"ico": "12345678", "invoice_number": "fv 2025 42", "total_amount": 120.50}}
+    assert dedup_key(pdf) == dedup_key(photo) is not None
+    assert dedup_key({**pdf, "total_amount": "120.51"}) != dedup_key(pdf)
+
+
+def test_dedup_key_needs_every_part():
+    assert dedup_key({"supplier_ico": "12345678", "total_amount": 10}) is None
+    assert dedup_key({"supplier_name": "Obchod", "invoice_number": "1"}) is None
+    assert dedup_key({}) is None
+
+
+def test_perceptual_hash_survives_resizing(tmp_path):
+    image = Image.new("L", (400, 600), 255)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((40, 40, 360, 140), fill=0)
+    draw.rectangle((40, 400, 200, 560), fill=90)
+    image.save(tmp_path / "receipt.png")
+    image.resize((200, 300)).save(tmp_path / "receipt-small.jpg", quality=70)
+
+    assert perceptual_hash(str(tmp_path / "receipt.png")) == perceptual_hash(str(tmp_path / "receipt-small.jpg"))
+    assert perceptual_hash(str(tmp_path / "receipt.pdf")) is None
+
+
+def test_original_must_count(app_module, make_user, add_document):
+    user_id, _ = make_user("originals@example.com")
+    other_id, _ = make_user("someone-else@example.com")
+    Document = app_module.Document
+    failed = add_document(user_id, status="failed", file_sha256="f" * 64)
+    original = add_document(user_id, file_sha256="f" * 64, dedup_key="k1", perceptual_hash="00ff00ff00ff00ff")
+    copy = add_document(user_id, file_sha256="f" * 64, duplicate_of_id=original)
+    add_document(other_id, dedup_key="k1")
+    document_id = add_document(user_id, status="processing")
+
+    db = app_module.SessionLocal()
+    try:
+        # Neither the dead-lettered upload nor the flagged copy is an original
+        assert find_duplicate(db, Document, user_id, document_id, file_sha256="f" * 64) == original
+        assert find_duplicate(db, Document, user_id, document_id, dedup_key="k1") == original
+        assert find_duplicate(db, Document, user_id, failed, file_sha256="f" * 64, earlier_only=True) is None
+        assert find_duplicate(db, Document, user_id, document_id, dedup_key="other") is None
+        # An equal image hash is only a "similar" flag
+        assert find_duplicate(db, Document, user_id, document_id) is None
+        assert find_similar(db, Document, user_id, document_id, perceptual_hash="00ff00ff00ff00ff") == original
+        assert find_similar(db, Document, user_id, copy) is None
+    finally:
+        db.close()
+
+
+def test_not_duplicate_clears_flags_and_counts_the_document(app_module, client, make_user, add_document, totals):
+    user_id, headers = make_user("dismiss@example.com")
+    original = add_document(user_id, extracted_data={"total_amount": 50})
+    copy = add_document(user_id, duplicate_of_id=original, extracted_data={"total_amount": 70})
+    similar = add_document(user_id, similar_to_id=original, extracted_data={"total_amount": 30})
+    totals.rebuild(user_id)
+
+    for document_id in (copy, similar):
+        response = client.post(f"/api/documents/{document_id}/not-duplicate", headers=headers)
+        assert response.status_code == 200, response.text
+        assert response.json()["duplicate_of_id"] is None
+        assert response.json()["similar_to_id"] is None
+
+    db = app_module.SessionLocal()
+    try:
+        assert db.get(app_module.Document, copy).duplicate_dismissed
+    finally:
+        db.close()
+    # The copy moved from duplicate_count to income; the similar one counted already
+    [year] = totals.checked(user_id)
+    assert (year["income"], year["invoice_count"], year["duplicate_count"]) == (150, 3, 0)
+
+    assert client.post(f"/api/documents/{copy}/not-duplicate", headers=make_user("intruder@example.com")[1]).status_code == 404
@@ -0,0 +1,45 @@
+"""DocumentPipeline concurrency limits (OCR replaced by a stub)"""
+
+import asyncio
+from types import SimpleNamespace
+
+from services.document_pipeline import DocumentPipeline
+
+
+def test_batch_shares_process_slots_created_outside_the_loop():
+    # Built like main.py does at import, before any event loop runs
+    pipeline = DocumentPipeline(SimpleNamespace(), max_per_request=4, max_per_process=1)
+    running = []
+
+    async def process_file(path, file_sha256=None):
+        running.append(pipeline.in_flight)
+        await asyncio.sleep(0.01)
+        if path == "bad":
+            raise ValueError("unreadable")
+        return {"path": path}
+
+    pipeline.process_file = process_file
+    stored = [{"path": path} for path in ("a", "bad", "c")]
+    results = asyncio.run(pipeline.process_batch(stored))
+
+    assert results == [{"path": "a"}, {"error": "unreadable"}, {"path": "c"}]
+    # One process slot: the three documents ran one at a time
+    assert running == [1, 1, 1]
+    assert pipeline.in_flight == 0
+    assert pipeline.avg_seconds is not None
+
+
+def test_classification_never_runs_tesseract_itself(tmp_path, monkeypatch):
+    from PIL import Image
+    from services import ocr_service
+
+    def run_tesseract(path):
+        raise AssertionError("Tesseract must run through OCRService.run_ocr (CPU pool)")
+
+    monkeypatch.setattr(ocr_service, "run_tesseract", run_tesseract)
+    page = tmp_path / "page.png"
+    Image.new("L", (600, 850), 255).save(page)
+
+    # Local OCR failed or found nothing: the page shape alone decides
+    document_type = asyncio.run(ocr_service.classify_document(str(page), None))
+    assert document_type != "unknown"
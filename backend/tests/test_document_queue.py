@@ -0,0 +1,215 @@
+"""
+DocumentQueue admission control and stats, then processing against the
+scratch database: backlog, retries, dead-letter, duplicates, leases
+"""
+
+import json
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.document_queue import DocumentQueue, QueueFullError
+
+
+@pytest.fixture
+def queue(pipeline):
+    return DocumentQueue(
+        pipeline, session_factory=None, document_model=None,
+        max_depth=2, max_per_user=3, max_backlog_per_user=5
+    )
+
+
+def test_capacity_is_running_slots_plus_depth(queue):
+    assert queue.capacity == 8 + 2
+
+
+def test_stats_are_serializable(queue):
+    stats = json.loads(json.dumps(queue.stats()))
+    assert stats["capacity"] == 10
+    assert stats["backlog"] == 0
+
+
+def test_admit_reserves_the_whole_batch(queue):
+    queue.admit(1, 7)
+    assert queue.queued_for(1) == 7
+    queue.release(1, 2)
+    assert queue.queued_for(1) == 5
+
+
+def test_batch_beyond_limit_and_backlog_never_fits(queue):
+    with pytest.raises(QueueFullError) as error:
+        queue.admit(1, 9)
+    assert error.value.scope == "batch"
+    assert error.value.limit == 8
+    assert error.value.retry_after is None
+    assert queue.rejected["batch"] == 1
+
+
+def test_user_at_limit_gets_retry_after(queue):
+    queue.admit(1, 8)
+    with pytest.raises(QueueFullError) as error:
+        queue.admit(1, 1)
+    assert error.value.scope == "user"
+    assert error.value.retry_after >= 1
+    # Other users are not affected
+    queue.admit(2, 1)
+
+
+def test_full_queue_rejects_documents_that_would_start(queue):
+    queue.pending = queue.capacity
+    with pytest.raises(QueueFullError) as error:
+        queue.admit(1, 1)
+    assert error.value.scope == "global"
+    assert 1 <= error.value.retry_after <= DocumentQueue.MAX_RETRY_AFTER
+    assert queue.queued_for(1) == 0
+
+
+def test_retry_after_uses_measured_drain_rate(queue, pipeline):
+    pipeline.avg_seconds = 10.0
+    # 9 documents ahead, 4 drain at a time: 3 rounds of 10 s
+    assert queue._retry_after(9, 4) == 30
+    pipeline.avg_seconds = 1000.0
+    assert queue._retry_after(9, 4) == DocumentQueue.MAX_RETRY_AFTER
+
+
+# Processing against the scratch database (main's models, OCR replaced)
+
+
+def invoice_result(number, total=100):
+    return {
+        "document_type": "invoice",
+        "extracted_data": {
+            "supplier_ico": "12345678", "invoice_number": number,
+            "total_amount": total, "total_tax": total / 5, "raw_text": "OCR text"
+        },
+        "confidence": 90
+    }
+
+
+@pytest.fixture
+def db_queue(app_module, pipeline):
+    """Queue on the scratch database; set pipeline.result = fn(job, call) -> result"""
+    calls = []
+
+    async def process_batch(jobs):
+        calls.append([job["document_id"] for job in jobs])
+        return [pipeline.result(job, len(calls)) for job in jobs]
+
+    pipeline.process_batch = process_batch
+    pipeline.calls = calls
+    return DocumentQueue(
+        pipeline, app_module.SessionLocal, app_module.Document,
+        ocr_output_model=app_module.DocumentOCROutput, totals_model=app_module.TaxYearTotals,
+        max_attempts=2, retry_backoff=0.001, max_per_user=2, max_backlog_per_user=10
+    )
+
+
+def run(queue, user_id, document_ids):
+    async def drain():
+        queue.enqueue([{"document_id": document_id, "user_id": user_id} for document_id in document_ids])
+        while queue._tasks:
+            await asyncio.gather(*list(queue._tasks))
+
+    asyncio.run(drain())
+
+
+def document(app_module, document_id):
+    db = app_module.SessionLocal()
+    try:
+        return db.get(app_module.Document, document_id)
+    finally:
+        db.close()
+
+
+def test_backlog_starts_at_most_max_per_user_at_once(app_module, db_queue, pipeline, make_user, add_document, totals):
+    user_id, _ = make_user("backlog@example.com")
+    ids = [add_document(user_id, status="processing") for _ in range(5)]
+    pipeline.result = lambda job, call: invoice_result(f"N{job['document_id']}")
+
+    run(db_queue, user_id, ids)
+
+    assert all(len(batch) <= 2 for batch in pipeline.calls)
+    assert sorted(sum(pipeline.calls, [])) == ids
+    assert db_queue.pending == 0 and not db_queue.backlog
+    stored = document(app_module, ids[0])
+    assert stored.status == "processed"
+    # Raw OCR text goes to document_ocr_output, not extracted_data
+    assert "raw_text" not in stored.extracted_data
+    rows = totals.checked(user_id)
+    assert rows[0]["income"] == 500 and rows[0]["invoice_count"] == 5
+
+
+def test_failure_is_retried_then_dead_lettered(app_module, db_queue, pipeline, make_user, add_document, totals):
+    user_id, _ = make_user("deadletter@example.com")
+    document_id = add_document(user_id, status="processing")
+    pipeline.result = lambda job, call: {"error": "provider down"}
+
+    run(db_queue, user_id, [document_id])
+
+    assert pipeline.calls == [[document_id], [document_id]]
+    failed = document(app_module, document_id)
+    assert (failed.status, failed.attempts, failed.last_error) == ("failed", 2, "provider down")
+    assert db_queue.pending == 0
+
+
+def test_retry_succeeds(app_module, db_queue, pipeline, make_user, add_document, totals):
+    user_id, _ = make_user("retry@example.com")
+    document_id = add_document(user_id, status="processing")
+    pipeline.result = lambda job, call: {"error": "timeout"} if call == 1 else invoice_result("R1")
+
+    run(db_queue, user_id, [document_id])
+
+    stored = document(app_module, document_id)
+    assert (stored.status, stored.attempts, stored.last_error) == ("processed", 1, None)
+    totals.checked(user_id)
+
+
+def test_same_invoice_twice_is_flagged_and_counted_once(app_module, db_queue, pipeline, make_user, add_document, totals):
+    user_id, _ = make_user("twice@example.com")
+    first, second = add_document(user_id, status="processing"), add_document(user_id, status="processing")
+    pipeline.result = lambda job, call: invoice_result("FV-1", total=250)
+
+    run(db_queue, user_id, [first, second])
+
+    assert document(app_module, second).duplicate_of_id == first
+    assert db_queue.duplicates == 1
+    rows = totals.checked(user_id)
+    assert (rows[0]["income"], rows[0]["duplicate_count"]) == (250, 1)
+
+
+def test_dead_lettered_original_hands_over_to_its_copy(app_module, db_queue, pipeline, make_user, add_document, totals):
+    user_id, _ = make_user("handover@example.com")
+    original = add_document(user_id, status="processing", file_sha256="e" * 64)
+    copy = add_document(
+        user_id, duplicate_of_id=original, file_sha256="e" * 64,
+        extracted_data={"total_amount": 80, "total_tax": 16}
+    )
+    totals.rebuild(user_id)
+    pipeline.result = lambda job, call: {"error": "unreadable"}
+
+    run(db_queue, user_id, [original])
+
+    assert document(app_module, copy).duplicate_of_id is None
+    rows = totals.checked(user_id)
+    assert (rows[0]["income"], rows[0]["duplicate_count"]) == (80, 0)
+
+
+def test_leases_are_claimed_once(app_module, db_queue, pipeline, make_user, add_document, totals):
+    user_id, _ = make_user("lease@example.com")
+    other_worker = DocumentQueue(pipeline, app_module.SessionLocal, app_module.Document)
+    now = datetime.utcnow()
+    unleased = add_document(user_id, status="processing")
+    expired = add_document(user_id, status="processing", claimed_by="gone:1:x", claimed_at=now - timedelta(hours=1))
+    live = add_document(user_id, status="processing", claimed_by="alive:2:y", claimed_at=now)
+    finished = add_document(user_id, status="processed")
+    mine = {unleased, expired, live, finished}
+
+    claimed = {row.id for row in db_queue._claim_orphans()} & mine
+    assert claimed == {unleased, expired}
+    # A second worker starting at the same time finds nothing left
+    assert not {row.id for row in other_worker._claim_orphans()} & mine
+    assert document(app_module, unleased).claimed_by == db_queue.worker_id
+
+    db_queue._release_leases()
+    assert {row.id for row in other_worker._claim_orphans()} & mine == {unleased, expired}
@@ -0,0 +1,154 @@
+"""ISDOC/UBL e-invoices read without OCR, credit notes with negative amounts"""
+
+import pytest
+
+from services.einvoice import EInvoiceError, detect_format, parse_einvoice
+
+UBL_INVOICE = """<?xml version="1.0" encoding="UTF-8"?>
+<Invoice xmlns="urn:oasis:names:specification:ubl:schema:xsd:Invoice-2"
+         xmlns:cac="urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2"
+         xmlns:cbc="urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2">
+  <cbc:CustomizationID>urn:cen.eu:en16931:2017#compliant#urn:fdc:peppol.eu:2017:poacc:billing:3.0</cbc:CustomizationID>
+  <cbc:ID>FV-2025-0042</cbc:ID>
+  <cbc:IssueDate>2025-03-14</cbc:IssueDate>
+  <cbc:DueDate>2025-03-28</cbc:DueDate>
+  <cbc:InvoiceTypeCode>{type_code}</cbc:InvoiceTypeCode>
+  <cbc:DocumentCurrencyCode>EUR</cbc:DocumentCurrencyCode>
+  <cac:AccountingSupplierParty><cac:Party>
+    <cac:PartyName><cbc:Name>Dodávateľ s.r.o.</cbc:Name></cac:PartyName>
+    <cac:PostalAddress>
+      <cbc:StreetName>Hlavná</cbc:StreetName><cbc:BuildingNumber>1</cbc:BuildingNumber>
+      <cbc:CityName>Bratislava</cbc:CityName><cbc:PostalZone>81101</cbc:PostalZone>
+      <cac:Country><cbc:IdentificationCode>SK</cbc:IdentificationCode></cac:Country>
+    </cac:PostalAddress>
+    <cac:PartyTaxScheme><cbc:CompanyID>SK2020123456</cbc:CompanyID></cac:PartyTaxScheme>
+    <cac:PartyLegalEntity><cbc:CompanyID>12345678</cbc:CompanyID></cac:PartyLegalEntity>
+  </cac:Party></cac:AccountingSupplierParty>
+  <cac:AccountingCustomerParty><cac:Party>
+    <cac:PartyName><cbc:Name>Odberateľ</cbc:Name></cac:PartyName>
+  </cac:Party></cac:AccountingCustomerParty>
+  <cac:TaxTotal>
+    <cbc:TaxAmount currencyID="EUR">20.00</cbc:TaxAmount>
+    <cac:TaxSubtotal>
+      <cbc:TaxableAmount currencyID="EUR">100.00</cbc:TaxableAmount>
+      <cbc:TaxAmount currencyID="EUR">20.00</cbc:TaxAmount>
+      <cac:TaxCategory><cbc:Percent>20.00</cbc:Percent></cac:TaxCategory>
+    </cac:TaxSubtotal>
+  </cac:TaxTotal>
+  <cac:LegalMonetaryTotal>
+    <cbc:TaxExclusiveAmount currencyID="EUR">100.00</cbc:TaxExclusiveAmount>
+    <cbc:TaxInclusiveAmount currencyID="EUR">120.00</cbc:TaxInclusiveAmount>
+    <cbc:PayableAmount currencyID="EUR">120.00</cbc:PayableAmount>
+  </cac:LegalMonetaryTotal>
+  <cac:InvoiceLine>
+    <cbc:ID>1</cbc:ID>
+    <cbc:InvoicedQuantity unitCode="H87">2</cbc:InvoicedQuantity>
+    <cbc:LineExtensionAmount currencyID="EUR">100.00</cbc:LineExtensionAmount>
+    <cac:Item><cbc:Name>Konzultácia</cbc:Name>
+      <cac:ClassifiedTaxCategory><cbc:Percent>20</cbc:Percent></cac:ClassifiedTaxCategory>
+    </cac:Item>
+    <cac:Price><cbc:PriceAmount currencyID="EUR">50.00</cbc:PriceAmount></cac:Price>
+  </cac:InvoiceLine>
+</Invoice>
+"""
+
+ISDOC_INVOICE = """<?xml version="1.0" encoding="UTF-8"?>
+<Invoice xmlns="http://isdoc.cz/namespace/2013" version="6.0.2">
+  <DocumentType>{document_type}</DocumentType>
+  <ID>2025001</ID>
+  <IssueDate>2025-05-02</IssueDate>
+  <LocalCurrencyCode>EUR</LocalCurrencyCode>
+  <AccountingSupplierParty><Party>
+    <PartyIdentification><ID>87654321</ID></PartyIdentification>
+    <PartyName><Name>Firma a.s.</Name></PartyName>
+    <PartyTaxScheme><CompanyID>2020876543</CompanyID></PartyTaxScheme>
+  </Party></AccountingSupplierParty>
+  <TaxTotal>
+    <TaxSubTotal>
+      <TaxableAmount>50.00</TaxableAmount>
+      <TaxAmount>10.00</TaxAmount>
+      <TaxCategory><Percent>20</Percent></TaxCategory>
+    </TaxSubTotal>
+    <TaxAmount>10.00</TaxAmount>
+  </TaxTotal>
+  <LegalMonetaryTotal>
+    <TaxExclusiveAmount>50.00</TaxExclusiveAmount>
+    <TaxInclusiveAmount>60.00</TaxInclusiveAmount>
+    <PayableAmount>60.00</PayableAmount>
+  </LegalMonetaryTotal>
+</Invoice>
+"""
+
+
+def write(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_text(content, encoding="utf-8")
+    return str(path)
+
+
+def test_peppol_invoice(tmp_path):
+    path = write(tmp_path, "invoice.xml", UBL_INVOICE.format(type_code="380"))
+    assert detect_format(path) == "peppol"
+
+    data = parse_einvoice(path)
+    assert data["invoice_type"] == "invoice"
+    assert data["invoice_number"] == "FV-2025-0042"
+    assert data["supplier_ico"] == "12345678"
+    assert data["supplier_vat_id"] == "SK2020123456"
+    assert data["supplier_address"] == "Hlavná 1, 81101 Bratislava, SK"
+    assert (data["total_amount"], data["total_net"], data["total_tax"]) == (120.0, 100.0, 20.0)
+    assert data["vat_breakdown"] == {"20": {"base": 100.0, "vat": 20.0}}
+    assert data["line_items"] == [
+        {"description": "Konzultácia", "quantity": 2.0, "unit_price": 50.0, "total_amount": 100.0, "tax_rate": 20.0}
+    ]
+    assert data["confidence"] == 1.0
+
+
+def test_ubl_credit_note_type_code_negates_amounts(tmp_path):
+    data = parse_einvoice(write(tmp_path, "credit.xml", UBL_INVOICE.format(type_code="381")))
+    assert data["invoice_type"] == "credit_note"
+    assert (data["total_amount"], data["total_net"], data["total_tax"]) == (-120.0, -100.0, -20.0)
+    assert data["vat_breakdown"] == {"20": {"base": -100.0, "vat": -20.0}}
+    assert data["line_items"][0]["total_amount"] == -100.0
+    # Quantities and unit prices keep their sign
+    assert data["line_items"][0]["unit_price"] == 50.0
+
+
+@pytest.mark.parametrize("document_type, invoice_type, total", [
+    ("1", "invoice", 60.0),
+    ("2", "credit_note", -60.0),
+    ("3", "debit_note", 60.0),
+])
+def test_isdoc_document_types(tmp_path, document_type, invoice_type, total):
+    path = write(tmp_path, "invoice.isdoc", ISDOC_INVOICE.format(document_type=document_type))
+    assert detect_format(path) == "isdoc"
+    data = parse_einvoice(path)
+    assert data["invoice_type"] == invoice_type
+    assert data["total_amount"] == total
+    assert data["supplier_ico"] == "87654321"
+    assert data["currency"] == "EUR"
+
+
+def test_other_xml_is_not_an_einvoice(tmp_path):
+    path = write(tmp_path, "export.xml", "<?xml version='1.0'?><orders><order id='1'/></orders>")
+    assert detect_format(path) is None
+    with pytest.raises(EInvoiceError):
+        parse_einvoice(path)
+
+
+def test_doctype_is_rejected(tmp_path):
+    path = write(
+        tmp_path, "bomb.xml",
+        '<?xml version="1.0"?><!DOCTYPE lolz [<!ENTITY lol "lol">]>'
+        '<Invoice xmlns="http://isdoc.cz/namespace/2013">&lol;</Invoice>'
+    )
+    with pytest.raises(EInvoiceError):
+        detect_format(path)
+
+
+def test_invoice_without_total_is_rejected(tmp_path):
+    content = ISDOC_INVOICE.format(document_type="1")
+    start = content.index("<LegalMonetaryTotal>")
+    end = content.index("</LegalMonetaryTotal>") + len("</LegalMonetaryTotal>")
+    with pytest.raises(EInvoiceError):
+        parse_einvoice(write(tmp_path, "no-total.isdoc", content[:start] + content[end:]))
@@ -0,0 +1,90 @@
+"""Amount/date parsing and the single-scan field extraction engine"""
+
+from decimal import Decimal
+
+import pytest
+
+from services.field_extraction import extract_fields, is_valid_iban, parse_amount, parse_date
+
+
+@pytest.mark.parametrize("text, amount", [
+    ("1 234,56", "1234.56"),
+    ("1 234,56", "1234.56"),
+    ("1.234,56", "1234.56"),
+    ("1234,56", "1234.56"),
+    ("1,234.56", "1234.56"),
+    ("1234.56", "1234.56"),
+    ("1,234,567", "1234567"),
+    ("1.234.567", "1234567"),
+    # A lone comma is always the decimal separator
+    ("0,123", "0.123"),
+    ("12,500", "12.500"),
+    ("12,5", "12.5"),
+    # A lone dot after a 1-3 digit group is a Slovak thousands separator
+    ("1.234", "1234"),
+    ("12.50", "12.50"),
+    ("0.500", "0.500"),
+    ("-45,90", "-45.90"),
+])
+def test_parse_amount(text, amount):
+    assert parse_amount(text) == Decimal(amount)
+
+
+@pytest.mark.parametrize("text", ["", "abc", "1,2,3.4.5"])
+def test_parse_amount_rejects_non_numbers(text):
+    assert parse_amount(text) is None
+
+
+@pytest.mark.parametrize("text, iso", [
+    ("31.12.2024", "2024-12-31"),
+    ("31. 12. 24", "2024-12-31"),
+    ("1/2/2025", "2025-02-01"),
+    ("31.02.2024", None),
+    ("2024", None),
+])
+def test_parse_date(text, iso):
+    assert parse_date(text) == iso
+
+
+def test_iban_checksum():
+    assert is_valid_iban("SK31 1200 0000 1987 4263 7541")
+    assert not is_valid_iban("SK31 1200 0000 1987 4263 7542")
+
+
+INVOICE_TEXT = """FAKTÚRA č. 2025/0042
+IČO: 12 345 678  DIČ: 2020123456  IČ DPH: SK2020123456
+Dátum vystavenia: 14.03.2025
+Dátum splatnosti: 28. 03. 2025
+IBAN: SK31 1200 0000 1987 4263 7541
+Základ dane 20%: 1 000,00 €
+DPH 20%: 200,00 €
+Spolu: 1 200,00
+Celkom k úhrade: 1 200,00 EUR
+"""
+
+
+def test_invoice_fields():
+    fields = extract_fields(INVOICE_TEXT)
+    assert fields["ico"] == "12345678"
+    assert fields["ic_dph"] == "SK2020123456"
+    assert fields["issue_date"] == fields["date"] == "2025-03-14"
+    assert fields["due_date"] == "2025-03-28"
+    assert fields["iban"] == "SK3112000000198742637541"
+    assert fields["total_amount"] == Decimal("1200.00")
+    assert fields["vat_breakdown"] == {"20": {"base": Decimal("1000.00"), "vat": Decimal("200.00")}}
+    assert fields["total_vat"] == Decimal("200.00")
+
+
+def test_labels_match_in_any_case_and_keep_original_values():
+    fields = extract_fields("faktúra č. FV-2025/a7\nCELKOM K ÚHRADE: 99,90 €")
+    assert fields["invoice_number"] == "FV-2025/a7"
+    assert fields["total_amount"] == Decimal("99.90")
+
+
+def test_last_plain_total_wins_on_receipts():
+    fields = extract_fields("Medzisúčet 10,00\nSpolu: 10,00\nZľava -1,00\nSpolu: 9,00")
+    assert fields["total_amount"] == Decimal("9.00")
+
+
+def test_text_without_fields():
+    assert extract_fields("Ďakujeme za nákup") == {}
@@ -0,0 +1,132 @@
+"""Alembic revisions: fresh databases, pre-migration databases, models in sync"""
+
+from datetime import datetime
+
+import pytest
+import sqlalchemy as sa
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+from services.database import ALEMBIC_INI, upgrade_database
+
+
+def migrate(engine, action, revision):
+    config = Config(ALEMBIC_INI)
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        action(config, revision)
+
+
+def schema(engine):
+    inspector = sa.inspect(engine)
+    return {
+        table: (
+            sorted(column["name"] for column in inspector.get_columns(table)),
+            sorted(index["name"] for index in inspector.get_indexes(table))
+        )
+        for table in inspector.get_table_names()
+    }
+
+
+@pytest.fixture
+def database(tmp_path):
+    engines = []
+
+    def create(name):
+        engine = sa.create_engine(f"sqlite:///{tmp_path / name}")
+        engines.append(engine)
+        return engine
+
+    yield create
+    for engine in engines:
+        engine.dispose()
+
+
+def test_head_matches_the_models(app_module, database):
+    engine = database("fresh.db")
+    upgrade_database(engine, app_module.Base.metadata)
+    with engine.connect() as connection:
+        assert compare_metadata(MigrationContext.configure(connection), app_module.Base.metadata) == []
+
+
+def test_database_created_by_create_all_upgrades_to_head(database):
+    """
+    Deployments before the migrations (create_all() only) have no
+    alembic_version; a database created by one of the later pre-Alembic
+    revisions already has the queue/dedup columns and the OCR output table
+    """
+    fresh, old = database("fresh.db"), database("create_all.db")
+    upgrade_database(fresh)
+    migrate(old, command.upgrade, "0002")
+    with old.begin() as connection:
+        connection.execute(sa.text("DROP TABLE alembic_version"))
+
+    upgrade_database(old)
+
+    assert schema(old) == schema(fresh)
+
+
+def test_downgrade_to_base_and_up_again(database):
+    engine = database("roundtrip.db")
+    upgrade_database(engine)
+    migrate(engine, command.downgrade, "base")
+    assert set(sa.inspect(engine).get_table_names()) == {"alembic_version"}
+    upgrade_database(engine)
+    with engine.connect() as connection:
+        head = ScriptDirectory.from_config(Config(ALEMBIC_INI)).get_current_head()
+        assert MigrationContext.configure(connection).get_current_revision() == head
+
+
+def test_migrated_tax_year_totals_match_a_rebuild(database):
+    """0004/0006/0007 fill the totals with their own frozen rules; at head they agree with the service"""
+    from services.tax_totals import rebuild
+
+    engine = database("totals.db")
+    migrate(engine, command.upgrade, "0003")
+    documents = sa.Table("documents", sa.MetaData(), autoload_with=engine)
+    with engine.begin() as connection:
+        connection.execute(sa.text(
+            "INSERT INTO users (id, name, email, hashed_password) VALUES (1, 'a', 'a@example.com', '-')"
+        ))
+        common = {
+            "user_id": 1, "filename": "doc.pdf", "file_path": "uploads/doc.pdf", "status": "processed",
+            "file_sha256": None, "duplicate_of_id": None
+        }
+        connection.execute(documents.insert(), [
+            {**common, "id": 1, "uploaded_at": datetime(2025, 3, 1), "document_type": "invoice",
+             "file_sha256": "same", "extracted_data": {"total_amount": "100.00", "total_tax": "20.00"}},
+            {**common, "id": 2, "uploaded_at": datetime(2025, 4, 1), "document_type": "invoice",
+             "extracted_data": {"total_amount": "30", "total_vat": "6", "invoice_type": "credit_note"}},
+            {**common, "id": 3, "uploaded_at": datetime(2025, 5, 1), "document_type": "receipt",
+             "extracted_data": {"extracted_data": {"total_amount": "12.50"}}},
+            {**common, "id": 4, "uploaded_at": datetime(2025, 5, 2), "document_type": "invoice",
+             "file_sha256": "same", "duplicate_of_id": 1, "extracted_data": {}},
+            {**common, "id": 5, "uploaded_at": datetime(2026, 1, 1), "document_type": "contract",
+             "extracted_data": {}},
+            {**common, "id": 6, "uploaded_at": datetime(2026, 1, 2), "status": "failed",
+             "document_type": "invoice", "extracted_data": {"total_amount": "999"}},
+        ])
+
+    upgrade_database(engine)
+
+    columns = "user_id, year, income, expenses, income_vat, expense_vat, " \
+              "invoice_count, receipt_count, other_count, duplicate_count"
+    query = sa.text(f"SELECT {columns} FROM tax_year_totals ORDER BY user_id, year")
+    with engine.connect() as connection:
+        migrated = connection.execute(query).fetchall()
+        metadata = sa.MetaData()
+        rebuild(
+            connection,
+            sa.Table("documents", metadata, autoload_with=connection),
+            sa.Table("tax_year_totals", metadata, autoload_with=connection)
+        )
+        assert connection.execute(query).fetchall() == migrated
+        connection.rollback()
+
+    assert [tuple(row) for row in migrated] == [
+        (1, 2025, 70, 12.5, 14, 0, 2, 1, 0, 1),
+        (1, 2026, 0, 0, 0, 0, 0, 0, 1, 0),
+    ]
@@ -0,0 +1,59 @@
+"""OCRResultCache: lookups grouped by file digest, purge, LRU eviction"""
+
+import asyncio
+
+from services.ocr_cache import OCRResultCache
+
+DIGEST_A = "a" * 64
+DIGEST_B = "b" * 64
+
+
+def test_put_get_and_purge_by_file(tmp_path):
+    cache = OCRResultCache(directory=str(tmp_path))
+    key = OCRResultCache.make_key(DIGEST_A, "tesseract", "invoice", 1)
+    cache.put(key, {"total_amount": 12.5}, DIGEST_A)
+    cache.put(OCRResultCache.make_key(DIGEST_A, "classification", 1), {"document_type": "invoice"}, DIGEST_A)
+    cache.put(OCRResultCache.make_key(DIGEST_B, "classification", 1), {"document_type": "receipt"}, DIGEST_B)
+
+    assert cache.get(key, DIGEST_A) == {"total_amount": 12.5}
+    assert cache.get(key, DIGEST_B) is None
+
+    assert cache.purge(DIGEST_A) == 2
+    assert cache.get(key, DIGEST_A) is None
+    assert cache.stats()["entries"] == 1
+    assert [path.name.split(".")[0] for path in tmp_path.iterdir()] == [DIGEST_B]
+
+
+def test_async_methods_run_off_the_loop(tmp_path):
+    cache = OCRResultCache(directory=str(tmp_path))
+
+    async def roundtrip():
+        await cache.aput("key", {"text": "Faktúra"}, DIGEST_A)
+        value = await cache.aget("key", DIGEST_A)
+        removed = await cache.apurge(DIGEST_A)
+        return value, removed
+
+    assert asyncio.run(roundtrip()) == ({"text": "Faktúra"}, 1)
+    assert cache.stats()["hits"] == 1
+
+
+def test_index_survives_restart_and_drops_ungrouped_entries(tmp_path):
+    cache = OCRResultCache(directory=str(tmp_path))
+    cache.put("key", {"text": "x"}, DIGEST_A)
+    # Written before entries were grouped by file: no digest to purge it by
+    (tmp_path / f"{'c' * 64}.json").write_text("{}")
+
+    reopened = OCRResultCache(directory=str(tmp_path))
+    assert reopened.stats()["entries"] == 1
+    assert not (tmp_path / f"{'c' * 64}.json").exists()
+    assert reopened.get("key", DIGEST_A) == {"text": "x"}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = OCRResultCache(directory=str(tmp_path), max_bytes=60)
+    cache.put("old", {"text": "x" * 20}, DIGEST_A)
+    cache.put("new", {"text": "y" * 20}, DIGEST_B)
+    cache.put("newest", {"text": "z" * 20}, DIGEST_B)
+    assert cache.get("old", DIGEST_A) is None
+    assert cache.get("newest", DIGEST_B) is not None
+    assert cache.evictions >= 1
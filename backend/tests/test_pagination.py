@@ -0,0 +1,49 @@
+"""Keyset cursors and GET /api/documents paging"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_roundtrip():
+    uploaded_at = datetime(2025, 3, 14, 9, 30, 15, 123456)
+    cursor = encode_cursor(uploaded_at, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (uploaded_at, 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", encode_cursor(datetime(2025, 1, 1), 1)[:-3] + "@@@"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_pages_cover_every_document_once(client, make_user, add_document):
+    user_id, headers = make_user("pages@example.com")
+    uploaded_at = datetime(2025, 6, 1)
+    ids = [
+        # Pairs share a timestamp: the id breaks the tie
+        add_document(user_id, uploaded_at=uploaded_at + timedelta(minutes=number // 2))
+        for number in range(7)
+    ]
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/api/documents", params=params, headers=headers).json()
+        seen += [document["id"] for document in page["documents"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+        assert page["total"] == (7 if len(seen) == 3 else None)
+
+    newest_first = sorted(ids, key=lambda document_id: (ids.index(document_id) // 2, document_id), reverse=True)
+    assert seen == newest_first
+
+
+def test_bad_cursor_is_400(client, make_user):
+    _, headers = make_user("badcursor@example.com")
+    response = client.get("/api/documents", params={"cursor": "garbage"}, headers=headers)
+    assert response.status_code == 400
@@ -0,0 +1,29 @@
+"""
+Hot-path queries use their composite indexes (benchmarks/query_plan_check.py)
+
+Runs on a temporary SQLite database; set QUERY_PLAN_DATABASE_URL to an empty
+PostgreSQL database to check the production planner as well.
+"""
+
+import os
+
+import pytest
+
+import query_plan_check
+
+
+def assert_plans(results):
+    failures = {name: (problems, plan) for name, problems, plan in results if problems}
+    assert not failures, "\n".join(
+        f"{name}: {'; '.join(problems)}\n{plan}" for name, (problems, plan) in failures.items()
+    )
+    assert len(results) == len(query_plan_check.HOT_QUERIES)
+
+
+def test_hot_queries_use_their_index_sqlite(tmp_path):
+    assert_plans(query_plan_check.check(f"sqlite:///{tmp_path / 'plan.db'}"))
+
+
+@pytest.mark.skipif(not os.getenv("QUERY_PLAN_DATABASE_URL"), reason="QUERY_PLAN_DATABASE_URL not set")
+def test_hot_queries_use_their_index_postgresql():
+    assert_plans(query_plan_check.check(os.environ["QUERY_PLAN_DATABASE_URL"]))
@@ -0,0 +1,88 @@
+"""Per-user tax year totals: contributions, deltas and the upsert"""
+
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from services.tax_totals import apply_changes, changes, document_contribution
+
+
+def doc(**columns):
+    values = {
+        "uploaded_at": datetime(2025, 4, 1), "status": "processed", "duplicate_of_id": None,
+        "document_type": "invoice", "extracted_data": {"total_amount": "120.00", "total_tax": "20.00"}
+    }
+    values.update(columns)
+    return SimpleNamespace(**values)
+
+
+def test_invoice_is_income_receipt_is_expense():
+    assert document_contribution(doc()) == (2025, {"income": Decimal("120.00"), "income_vat": Decimal("20.00"), "invoice_count": 1})
+    receipt = doc(document_type="receipt", extracted_data={"extracted_data": {"total_amount": 9.9, "total_vat": 1.65}})
+    assert document_contribution(receipt) == (2025, {"expenses": Decimal("9.90"), "expense_vat": Decimal("1.65"), "receipt_count": 1})
+
+
+@pytest.mark.parametrize("total, tax", [("-120.00", "-20.00"), ("120.00", "20.00")])
+def test_credit_note_is_subtracted_whatever_its_sign(total, tax):
+    credit_note = doc(extracted_data={"invoice_type": "credit_note", "total_amount": total, "total_tax": tax})
+    assert document_contribution(credit_note) == (
+        2025, {"income": Decimal("-120.00"), "income_vat": Decimal("-20.00"), "invoice_count": 1}
+    )
+
+
+@pytest.mark.parametrize("columns, expected", [
+    ({"status": "processing"}, None),
+    ({"status": "failed"}, None),
+    ({"status": None, "document_type": "contract"}, (2025, {"other_count": 1})),
+    ({"duplicate_of_id": 7}, (2025, {"duplicate_count": 1})),
+    ({"extracted_data": {"total_amount": "n/a"}}, (2025, {"income": Decimal("0"), "income_vat": Decimal("0"), "invoice_count": 1})),
+])
+def test_documents_that_do_not_add_money(columns, expected):
+    assert document_contribution(doc(**columns)) == expected
+
+
+def test_changes_are_differences_per_year():
+    before = document_contribution(doc())
+    after = document_contribution(doc(extracted_data={"total_amount": "150.00", "total_tax": "20.00"}))
+    assert changes(before, after) == {2025: {"income": Decimal("30.00")}}
+    assert changes(before, before) == {}
+    assert changes(None, document_contribution(doc(duplicate_of_id=1))) == {2025: {"duplicate_count": 1}}
+    moved = changes(before, document_contribution(doc(uploaded_at=datetime(2026, 1, 2))))
+    assert moved[2025]["income"] == Decimal("-120.00") and moved[2026]["income"] == Decimal("120.00")
+
+
+def test_upsert_adds_to_the_existing_row(app_module, make_user):
+    user_id, _ = make_user("upsert@example.com")
+    table = app_module.TaxYearTotals.__table__
+    with app_module.engine.begin() as connection:
+        apply_changes(connection, table, user_id, {2025: {"income": Decimal("100.10"), "invoice_count": 1}})
+        apply_changes(connection, table, user_id, {2025: {"income": Decimal("-0.10"), "expenses": Decimal("5")}, 2024: {"other_count": 2}})
+
+    db = app_module.SessionLocal()
+    try:
+        row = db.get(app_module.TaxYearTotals, (user_id, 2025))
+        assert (row.income, row.expenses, row.invoice_count) == (Decimal("100.00"), Decimal("5.00"), 1)
+        assert db.get(app_module.TaxYearTotals, (user_id, 2024)).other_count == 2
+    finally:
+        db.close()
+
+
+def test_upload_of_an_einvoice_is_counted_right_away(app_module, client, make_user, totals):
+    user_id, headers = make_user("einvoice-upload@example.com")
+    isdoc = (
+        '<?xml version="1.0" encoding="UTF-8"?><Invoice xmlns="http://isdoc.cz/namespace/2013">'
+        "<DocumentType>2</DocumentType><ID>D1</ID>"
+        "<TaxTotal><TaxAmount>5.00</TaxAmount></TaxTotal>"
+        "<LegalMonetaryTotal><TaxInclusiveAmount>30.00</TaxInclusiveAmount></LegalMonetaryTotal></Invoice>"
+    )
+    response = client.post(
+        "/api/documents/upload", headers=headers,
+        files=[("files", ("dobropis.isdoc", isdoc.encode("utf-8"), "application/xml"))]
+    )
+    assert response.status_code == 202, response.text
+    assert response.json()["files"][0]["status"] == "processed"
+
+    [year] = totals.checked(user_id)
+    assert (year["income"], year["income_vat"], year["invoice_count"]) == (Decimal("-30.00"), Decimal("-5.00"), 1)
@@ -0,0 +1,63 @@
+"""POST /api/documents/upload: admission control in front of storing files"""
+
+import pytest
+
+
+@pytest.fixture
+def queued(app_module, monkeypatch):
+    """Jobs handed to the OCR queue (not run); the queue's limits reset per test"""
+    queue = app_module.document_queue
+    jobs = []
+
+    def enqueue(batch, admitted=False):
+        for job in batch:
+            queue.release(job["user_id"], 1)
+        jobs.extend(batch)
+
+    monkeypatch.setattr(queue, "enqueue", enqueue)
+    monkeypatch.setattr(queue, "max_per_user", 2)
+    monkeypatch.setattr(queue, "max_backlog_per_user", 1)
+    monkeypatch.setattr(queue, "pending", 0)
+    return jobs
+
+
+def upload(client, headers, count):
+    files = [("files", (f"receipt-{number}.png", b"\x89PNG fake image", "image/png")) for number in range(count)]
+    return client.post("/api/documents/upload", files=files, headers=headers)
+
+
+def test_upload_is_admitted_and_queued(client, make_user, queued):
+    user_id, headers = make_user("upload@example.com")
+    response = upload(client, headers, 2)
+    assert response.status_code == 202, response.text
+    files = response.json()["files"]
+    assert [file["status"] for file in files] == ["processing", "processing"]
+    assert [job["document_id"] for job in queued] == [file["document_id"] for file in files]
+    assert all(job["user_id"] == user_id for job in queued)
+
+
+def test_batch_over_user_limit_is_413(client, make_user, queued):
+    _, headers = make_user("batch@example.com")
+    response = upload(client, headers, 4)
+    assert response.status_code == 413
+    assert "max 3" in response.json()["detail"]
+    assert queued == []
+
+
+def test_full_queue_is_503_with_retry_after(app_module, client, make_user, queued, monkeypatch):
+    _, headers = make_user("busy@example.com")
+    monkeypatch.setattr(app_module.document_queue, "pending", app_module.document_queue.capacity)
+    response = upload(client, headers, 1)
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert queued == []
+
+
+def test_status_poll_reports_queue_capacity(app_module, client, make_user, queued):
+    _, headers = make_user("status@example.com")
+    document_id = upload(client, headers, 1).json()["files"][0]["document_id"]
+    response = client.get("/api/documents/status", params={"ids": [document_id, 0]}, headers=headers)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert [document["status"] for document in body["documents"]] == ["processing", "not_found"]
+    assert body["queue"]["capacity"] == app_module.document_queue.capacity
@@ -15,6 +15,8 @@ export default function DocumentsPage() {
     const { t } = useLanguage();
     const [user, setUser] = useState<any>(null);
     const [documents, setDocuments] = useState<any[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [counts, setCounts] = useState({ total: 0, month: 0, year: 0 });
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
@@ -37,20 +39,64 @@ export default function DocumentsPage() {
         loadDocuments();
     }, []);
 
+    // GET /api/documents returns one page ({ documents, next_cursor, total }) - total only on the first page
+    const fetchDocuments = async (params: Record<string, string>) => {
+        const token = localStorage.getItem('token');
+        const response = await fetch(`${API_BASE_URL}/api/documents?${new URLSearchParams(params)}`, {
+            headers: { 'Authorization': `Bearer ${token}` }
+        });
+        return response.ok ? response.json() : null;
+    };
+
     const loadDocuments = async () => {
+        try {
+            const now = new Date();
+            const isoDate = (d: Date) => `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, '0')}-${String(d.getDate()).padStart(2, '0')}`;
+            const [data, month, year] = await Promise.all([
+                fetchDocuments({ limit: '50' }),
+                fetchDocuments({ limit: '1', date_from: isoDate(new Date(now.getFullYear(), now.getMonth(), 1)) }),
+                fetchDocuments({ limit: '1', date_from: isoDate(new Date(now.getFullYear(), 0, 1)) }),
+            ]);
+            if (data) {
+                setDocuments(data.documents);
+                setNextCursor(data.next_cursor);
+                setCounts({ total: data.total ?? 0, month: month?.total ?? 0, year: year?.total ?? 0 });
+            }
+        } catch (err) {
+            console.error('Error loading documents:', err);
+        } finally {
+            setLoading(false);
+        }
+    };
+
+    const loadMore = async () => {
+        if (!nextCursor) return;
+        try {
+            const data = await fetchDocuments({ limit: '50', cursor: nextCursor });
+            if (data) {
+                setDocuments(prev => [...prev, ...data.documents]);
+                setNextCursor(data.next_cursor);
+            }
+        } catch (err) {
+            console.error('Error loading documents:', err);
+        }
+    };
+
+    // Likely duplicates are left out of the tax totals until the user says otherwise
+    const dismissDuplicate = async (id: number) => {
         try {
             const token = localStorage.getItem('token');
-            const response = await fetch(`${API_BASE_URL}/api/documents`, {
+            const response = await fetch(`${API_BASE_URL}/api/documents/${id}/not-duplicate`, {
+                method: 'POST',
                 headers: { 'Authorization': `Bearer ${token}` }
             });
             if (response.ok) {
-                const data = await response.json();
-                setDocuments(data);
+                setDocuments(prev => prev.map(doc =>
+                    doc.id === id ? { ...doc, duplicate_of_id: null, similar_to_id: null } : doc
+                ));
             }
         } catch (err) {
-            console.error('Error loading documents:', err);
-        } finally {
-            setLoading(false);
+            console.error('Error updating document:', err);
         }
     };
 
@@ -160,7 +206,7 @@ export default function DocumentsPage() {
                                 </div>
                                 <div>
                                     <p className="text-text-light text-sm">Celkom dokladov</p>
-                                    <p className="text-3xl font-bold text-primary">{documents.length}</p>
+                                    <p className="text-3xl font-bold text-primary">{counts.total}</p>
                                 </div>
                             </div>
                         </div>
@@ -172,14 +218,7 @@ export default function DocumentsPage() {
                                 </div>
                                 <div>
                                     <p className="text-text-light text-sm">Tento mesiac</p>
-                                    <p className="text-3xl font-bold text-primary">
-                                        {documents.filter(doc => {
-                                            const docDate = new Date(doc.uploaded_at);
-                                            const now = new Date();
-                                            return docDate.getMonth() === now.getMonth() && 
-                                                   docDate.getFullYear() === now.getFullYear();
-                                        }).length}
-                                    </p>
+                                    <p className="text-3xl font-bold text-primary">{counts.month}</p>
                                 </div>
                             </div>
                         </div>
@@ -191,13 +230,7 @@ export default function DocumentsPage() {
                                 </div>
                                 <div>
                                     <p className="text-text-light text-sm">Tento rok</p>
-                                    <p className="text-3xl font-bold text-primary">
-                                        {documents.filter(doc => {
-                                            const docDate = new Date(doc.uploaded_at);
-                                            const now = new Date();
-                                            return docDate.getFullYear() === now.getFullYear();
-                                        }).length}
-                                    </p>
+                                    <p className="text-3xl font-bold text-primary">{counts.year}</p>
                                 </div>
                             </div>
                         </div>
@@ -224,9 +257,9 @@ export default function DocumentsPage() {
                     ) : (
                         <div className="bg-bg-card rounded-3xl p-8 shadow-[8px_8px_16px_#A3B1C6,-8px_-8px_16px_#FFFFFF]">
                             <div className="space-y-4">
-                                {documents.map((doc, idx) => (
+                                {documents.map((doc) => (
                                     <div
-                                        key={idx}
+                                        key={doc.id}
                                         className="flex items-center justify-between p-6 bg-bg-main rounded-xl shadow-[inset_2px_2px_4px_#A3B1C6,inset_-2px_-2px_4px_#FFFFFF] hover:shadow-[inset_3px_3px_6px_#A3B1C6,inset_-3px_-3px_6px_#FFFFFF] transition-all"
                                     >
                                         <div className="flex items-center space-x-4 flex-1">
@@ -250,15 +283,26 @@ export default function DocumentsPage() {
                                                             Presnosť: {doc.confidence}%
                                                         </span>
                                                     )}
+                                                    {(doc.duplicate_of_id || doc.similar_to_id) && (
+                                                        <span className="px-3 py-1 bg-error/10 text-error text-xs rounded-full font-medium">
+                                                            {doc.duplicate_of_id ? 'Duplikát (nezapočítaný)' : 'Možný duplikát'}
+                                                            <button
+                                                                onClick={() => dismissDuplicate(doc.id)}
+                                                                className="ml-2 underline"
+                                                            >
+                                                                Nie je duplikát
+                                                            </button>
+                                                        </span>
+                                                    )}
                                                 </div>
                                             </div>
                                         </div>
                                         <div className="flex items-center space-x-2">
-                                            {doc.extracted_data && doc.extracted_data.total_amount && (
+                                            {doc.total_amount != null && (
                                                 <div className="text-right mr-4">
                                                     <p className="text-sm text-text-light">Suma</p>
                                                     <p className="text-xl font-bold text-primary">
-                                                        {doc.extracted_data.total_amount} €
+                                                        {doc.total_amount} {doc.currency || '€'}
                                                     </p>
                                                 </div>
                                             )}
@@ -272,6 +316,16 @@ export default function DocumentsPage() {
                                     </div>
                                 ))}
                             </div>
+                            {nextCursor && (
+                                <div className="mt-6 text-center">
+                                    <button
+                                        onClick={loadMore}
+                                        className="px-6 py-3 bg-accent text-white rounded-xl shadow-[4px_4px_8px_#A3B1C6,-4px_-4px_8px_#FFFFFF] hover:shadow-[6px_6px_12px_#A3B1C6,-6px_-6px_12px_#FFFFFF] transition-all"
+                                    >
+                                        Načítať ďalšie
+                                    </button>
+                                </div>
+                            )}
                         </div>
                     )}
                 </div>
@@ -15,6 +15,7 @@ export default function DashboardPage() {
     const { t } = useLanguage();
     const [user, setUser] = useState<any>(null);
     const [documents, setDocuments] = useState<any[]>([]);
+    const [documentCount, setDocumentCount] = useState(0);
 
     useEffect(() => {
         const token = localStorage.getItem('token');
@@ -40,12 +41,14 @@ export default function DashboardPage() {
     const loadDocuments = async () => {
         try {
             const token = localStorage.getItem('token');
-            const response = await fetch(`${API_BASE_URL}/api/documents`, {
+            // Latest three for the card; the first page carries the total
+            const response = await fetch(`${API_BASE_URL}/api/documents?limit=3`, {
                 headers: { 'Authorization': `Bearer ${token}` }
             });
             if (response.ok) {
                 const data = await response.json();
-                setDocuments(data);
+                setDocuments(data.documents);
+                setDocumentCount(data.total ?? data.documents.length);
             }
         } catch (err) {
             console.error('Error loading documents:', err);
@@ -181,7 +184,7 @@ export default function DashboardPage() {
                             </div>
                             <h3 className="text-2xl font-bold text-primary mb-3">{t('dashboard.documents_card.title')}</h3>
                             <p className="text-text-light mb-4">
-                                {t('dashboard.documents_card.count').replace('{{count}}', documents.length.toString())}
+                                {t('dashboard.documents_card.count').replace('{{count}}', documentCount.toString())}
                             </p>
                             <div className="space-y-2 flex-1">
                                 {documents.slice(0, 3).map((doc, idx) => (
@@ -202,7 +205,7 @@ export default function DashboardPage() {
                 <div className="grid md:grid-cols-3 gap-6">
                     <div className="bg-bg-card rounded-2xl p-6 shadow-[inset_4px_4px_8px_#A3B1C6,inset_-4px_-4px_8px_#FFFFFF]">
                         <p className="text-text-light text-sm mb-1">{t('dashboard.stats.documents_month')}</p>
-                        <p className="text-3xl font-bold text-primary">{documents.length}</p>
+                        <p className="text-3xl font-bold text-primary">{documentCount}</p>
                     </div>
                     <div className="bg-bg-card rounded-2xl p-6 shadow-[inset_4px_4px_8px_#A3B1C6,inset_-4px_-4px_8px_#FFFFFF]">
                         <p className="text-text-light text-sm mb-1">{t('dashboard.stats.ai_consultations')}</p>
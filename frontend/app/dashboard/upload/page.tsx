@@ -16,6 +16,7 @@ export default function UploadPage() {
     const [user, setUser] = useState<any>(null);
     const [files, setFiles] = useState<File[]>([]);
     const [uploading, setUploading] = useState(false);
+    const [error, setError] = useState('');
     const [dragActive, setDragActive] = useState(false);
 
     useEffect(() => {
@@ -75,6 +76,7 @@ export default function UploadPage() {
         if (files.length === 0) return;
 
         setUploading(true);
+        setError('');
         const formData = new FormData();
         files.forEach(file => formData.append('files', file));
 
@@ -88,9 +90,14 @@ export default function UploadPage() {
 
             if (response.ok) {
                 router.push('/dashboard');
+            } else {
+                // 413 (batch too large), 429/503 (queue full, see Retry-After)
+                const data = await response.json().catch(() => null);
+                setError(data?.detail || t('onboarding.error_upload'));
             }
         } catch (err) {
             console.error('Upload error:', err);
+            setError(t('onboarding.error_upload'));
         } finally {
             setUploading(false);
         }
@@ -187,7 +194,7 @@ export default function UploadPage() {
                                 multiple
                                 onChange={handleFileChange}
                                 className="hidden"
-                                accept=".pdf,.doc,.docx,.jpg,.jpeg,.png"
+                                accept=".pdf,.doc,.docx,.jpg,.jpeg,.png,.xml,.isdoc"
                             />
                             {t('upload.button')}
                         </label>
@@ -222,6 +229,11 @@ export default function UploadPage() {
                                 ))}
                             </div>
 
+                            {error && (
+                                <div className="mt-6 bg-error/10 border border-error/30 text-error px-4 py-3 rounded-xl">
+                                    {error}
+                                </div>
+                            )}
                             <button
                                 onClick={handleUpload}
                                 disabled={uploading}
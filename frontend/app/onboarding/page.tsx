@@ -131,10 +131,11 @@ export default function OnboardingPage() {
                 });
 
                 if (!response.ok) {
-                    throw new Error('Upload failed');
+                    const data = await response.json().catch(() => null);
+                    throw new Error(data?.detail || t('onboarding.error_upload'));
                 }
             } catch (err) {
-                setError(t('onboarding.error_upload'));
+                setError(err instanceof Error && err.message ? err.message : t('onboarding.error_upload'));
                 setLoading(false);
                 return;
             }